@@ -0,0 +1,50 @@
+"""Time writing the instance diagrams of many IRIs from one loaded store.
+
+run with: python -m benchmarks.batch
+"""
+
+import logging
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from benchmarks.common import EX, synthetic_graph, timer
+from rdfdig.batch import write_batch
+from rdfdig.core import Diagram
+
+
+def main():
+    logging.getLogger("rdfdig.batch").setLevel(logging.ERROR)
+    n_resources, n_iris = 8_000, 2_000
+    with TemporaryDirectory() as tmp:
+        source = Path(tmp) / "data.ttl"
+        synthetic_graph(n_resources).serialize(source, format="turtle")
+        results = {}
+        with timer(results, "load"):
+            diagram = Diagram()
+            diagram.parse(sources=[source])
+        print(f"loading {n_resources:,} resources takes {results['load']:.2f} s")
+        print(
+            f"so {n_iris:,} separate runs would spend "
+            f"{results['load'] * n_iris / 60:.0f} minutes loading"
+        )
+        iris = [str(EX[f"r{i}"]) for i in range(n_iris)]
+        print(f"{'workers':>8} {'format':>8} {'time (s)':>9} {'diagrams/s':>11}")
+        for jobs in sorted({1, 2, os.cpu_count() or 1}):
+            for format in ("json", "visjs"):
+                stats = write_batch(
+                    diagram,
+                    iris,
+                    Path(tmp) / f"{format}-{jobs}",
+                    format=format,
+                    jobs=jobs,
+                    depth=1,
+                    manifest=None,
+                )
+                print(
+                    f"{jobs:>8} {format:>8} {stats.seconds:>9.2f} {stats.rate:>11.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Compare parsing a Turtle file with loading it from the parse cache.
+
+run with: python -m benchmarks.cache
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rdflib import Graph
+
+from benchmarks.common import synthetic_graph, timer
+from rdfdig.cache import ParseCache
+
+
+def main():
+    print(f"{'triples':>10} {'parse (s)':>10} {'cached (s)':>11} {'entry (MB)':>11}")
+    with TemporaryDirectory() as tmp:
+        for n in (5_000, 20_000, 80_000):
+            data = Path(tmp) / f"data{n}.ttl"
+            synthetic_graph(n).serialize(data, format="turtle")
+            cache = ParseCache(Path(tmp) / f"cache{n}")
+            results = {}
+            with timer(results, "parse"):
+                graph = Graph().parse(data)
+            cache.parse(data)
+            with timer(results, "cached"):
+                cached = cache.parse(data)
+            assert len(cached) == len(graph)
+            entry_size = sum(
+                entry.stat().st_size for entry in cache.path.glob("entries/*.bin")
+            )
+            print(
+                f"{len(graph):>10,} {results['parse']:>10.2f} {results['cached']:>11.2f}"
+                f" {entry_size / 1024**2:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compare the index driven class summarizer with the previous nested loop implementation.
+
+run with: python -m benchmarks.classes
+"""
+
+from rdflib import BNode, Graph, Literal
+from rdflib.namespace import RDF, XSD
+
+from benchmarks.common import synthetic_graph, timer
+from rdfdig.core import Diagram
+from rdfdig.summarizers import BNODE_KLASS
+
+
+def legacy_parse_classes(store: Graph) -> tuple[set, set]:
+    """the class diagram implementation as of v0.3.0, kept for comparison"""
+    nodes, edges = set(), set()
+    nm = store.namespace_manager
+    for klass in store.objects(None, RDF.type, unique=True):
+        klass_id = hash(klass)
+        nodes.add((klass_id, klass.n3(nm), False, False))
+        for instance in store.subjects(RDF.type, klass, unique=True):
+            for pred, obj in store.predicate_objects(instance, unique=True):
+                if pred == RDF.type:
+                    continue
+                isliteral = isblank = False
+                obj_klass = store.value(obj, RDF.type, None)
+                if isinstance(obj, Literal):
+                    isliteral = True
+                    obj_klass = obj.datatype if obj.datatype else XSD.string
+                elif isinstance(obj, BNode) and not obj_klass:
+                    obj_klass = BNODE_KLASS
+                    isblank = True
+                if isblank or isliteral:
+                    nodes.add((hash(obj_klass), obj_klass.n3(nm), isliteral, isblank))
+                edges.add((klass_id, hash(obj_klass), pred.n3(nm)))
+            for subj, pred in store.subject_predicates(instance, unique=True):
+                isblank = False
+                subj_klass = store.value(subj, RDF.type, None)
+                if isinstance(subj, BNode) and not subj_klass:
+                    subj_klass = BNODE_KLASS
+                    isblank = True
+                    nodes.add((hash(subj_klass), subj_klass.n3(nm), False, isblank))
+                edges.add((hash(subj_klass), klass_id, pred.n3(nm)))
+    return nodes, edges
+
+
+def labelled(nodes, edges) -> tuple[set, set]:
+    """replace node ids with labels, as the legacy implementation used hash() ids"""
+    labels = {node[0]: node[1] for node in nodes}
+    return (
+        {tuple(node[1:]) for node in nodes},
+        {(labels.get(f), labels.get(t), label) for f, t, label in edges},
+    )
+
+
+def main():
+    print(f"{'resources':>10} {'triples':>10} {'legacy (s)':>12} {'indexed (s)':>12}")
+    for n in (2_000, 4_000, 8_000, 16_000, 32_000):
+        store = synthetic_graph(n)
+        results = {}
+        with timer(results, "legacy"):
+            nodes, edges = legacy_parse_classes(store)
+        diagram = Diagram()
+        diagram._store = store
+        with timer(results, "indexed"):
+            diagram._parse_classes()
+        assert labelled(nodes, edges) == labelled(diagram.nodes, diagram.edges)
+        print(
+            f"{n:>10,} {len(store):>10,} {results['legacy']:>12.3f} {results['indexed']:>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
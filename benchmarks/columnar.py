@@ -0,0 +1,46 @@
+"""Compare the python class summarizer with the numpy backend.
+
+run with: python -m benchmarks.columnar
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from benchmarks.common import synthetic_graph, timer
+from rdfdig.columnar import Columns, graph_triples, summarize_columns
+from rdfdig.summarizers import summarize_files, summarize_graph
+
+
+def main():
+    print(
+        f"{'triples':>10} {'graph (s)':>10} {'numpy (s)':>10} {'encode (s)':>11}"
+        f" {'stream (s)':>11} {'numpy (s)':>10}"
+    )
+    for n in (8_000, 32_000, 64_000):
+        store = synthetic_graph(n)
+        results = {}
+        with timer(results, "graph"):
+            expected = summarize_graph(store)
+        with timer(results, "encode"):
+            columns = Columns(graph_triples(store))
+        with timer(results, "summarize"):
+            summary = summarize_columns(columns)
+        assert summary.connections == expected.connections
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "data.nt"
+            store.serialize(path, format="nt", encoding="utf-8")
+            with timer(results, "stream"):
+                expected = summarize_files([path])
+            with timer(results, "stream numpy"):
+                summary = summarize_files([path], backend="numpy")
+        assert summary.connections == expected.connections
+        numpy = results["encode"] + results["summarize"]
+        print(
+            f"{len(store):>10,} {results['graph']:>10.3f} {numpy:>10.3f}"
+            f" {results['encode']:>11.3f} {results['stream']:>11.3f}"
+            f" {results['stream numpy']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
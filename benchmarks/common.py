@@ -0,0 +1,50 @@
+import random
+import time
+from contextlib import contextmanager
+
+from rdflib import BNode, Graph, Literal, Namespace
+from rdflib.namespace import RDF, XSD
+
+EX = Namespace("http://example.org/")
+SCHEMA = Namespace("https://schema.org/")
+
+
+def synthetic_triples(n_resources: int, n_classes: int = 20, seed: int = 0):
+    """yield a reproducible stream of triples describing n_resources resources.
+
+    resources have one or two types, literal properties, links to other
+    resources and some (sometimes typed) blank node children.
+    """
+    rnd = random.Random(seed)
+    klasses = [SCHEMA[f"Class{i}"] for i in range(n_classes)]
+    preds = [SCHEMA[f"prop{i}"] for i in range(10)]
+    for i in range(n_resources):
+        subj = EX[f"r{i}"]
+        yield subj, RDF.type, rnd.choice(klasses)
+        if rnd.random() < 0.2:
+            yield subj, RDF.type, rnd.choice(klasses)
+        yield subj, SCHEMA.name, Literal(f"resource {i}")
+        yield subj, SCHEMA.size, Literal(i, datatype=XSD.integer)
+        for _ in range(3):
+            yield subj, rnd.choice(preds), EX[f"r{rnd.randrange(n_resources)}"]
+        if rnd.random() < 0.3:
+            child = BNode()
+            yield subj, SCHEMA.child, child
+            if rnd.random() < 0.5:
+                yield child, RDF.type, rnd.choice(klasses)
+            yield child, SCHEMA.name, Literal(f"child of {i}", lang="en")
+
+
+def synthetic_graph(n_resources: int, **kwargs) -> Graph:
+    graph = Graph()
+    graph.bind("schema", SCHEMA)
+    for triple in synthetic_triples(n_resources, **kwargs):
+        graph.add(triple)
+    return graph
+
+
+@contextmanager
+def timer(results: dict, key):
+    start = time.perf_counter()
+    yield
+    results[key] = time.perf_counter() - start
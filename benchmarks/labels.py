@@ -0,0 +1,55 @@
+"""Compare labelling terms with rdflib's n3() against the memoized Labeller.
+
+run with: python -m benchmarks.labels
+"""
+
+from rdflib import URIRef
+
+from benchmarks.common import EX, synthetic_graph, timer
+from rdfdig.core import Diagram
+from rdfdig.labels import Labeller
+
+
+def label_triples(triples, label):
+    """label every term of every triple, as the per-triple class diagram did"""
+    for subj, pred, obj in triples:
+        label(subj), label(pred), label(obj)
+
+
+def instance_diagram(store, labeller):
+    diagram = Diagram()
+    diagram._store = store
+    diagram._labeller = lambda: labeller
+    diagram._parse_instances(URIRef(EX["r0"]), depth=4)
+    return diagram
+
+
+def main():
+    print(f"{'triples':>10} {'':>24} {'n3 (s)':>8} {'labeller (s)':>13}")
+    for n in (8_000, 32_000):
+        store = synthetic_graph(n)
+        nm = store.namespace_manager
+        triples = list(store)
+        results = {}
+        with timer(results, "n3"):
+            label_triples(triples, lambda term: term.n3(nm))
+        with timer(results, "labeller"):
+            label_triples(triples, Labeller(nm))
+        print(
+            f"{len(store):>10,} {'label every triple':>24} "
+            f"{results['n3']:>8.3f} {results['labeller']:>13.3f}"
+        )
+        with timer(results, "n3"):
+            before = instance_diagram(store, lambda term: term.n3(nm))
+        with timer(results, "labeller"):
+            after = instance_diagram(store, Labeller(nm))
+        assert list(before.nodes) == list(after.nodes)
+        assert list(before.edges) == list(after.edges)
+        print(
+            f"{len(store):>10,} {'instance diagram, 4 hops':>24} "
+            f"{results['n3']:>8.3f} {results['labeller']:>13.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
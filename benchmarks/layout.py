@@ -0,0 +1,40 @@
+"""Time laying out large diagrams before they are rendered.
+
+run with: python -m benchmarks.layout
+"""
+
+import random
+
+from benchmarks.common import timer
+from rdfdig.layout import force_layout, layered_layout
+
+
+def random_diagram(n_nodes: int, seed: int = 0):
+    """node ids and about two edges per node, linking each node to an earlier one"""
+    rnd = random.Random(seed)
+    node_ids = list(range(n_nodes))
+    edges = [(i, rnd.randrange(i)) for i in node_ids[1:]]
+    edges += [(rnd.randrange(n_nodes), rnd.randrange(n_nodes)) for _ in node_ids]
+    return node_ids, edges
+
+
+def main():
+    print(
+        f"{'nodes':>8} {'layered (s)':>12} {'force 50 (s)':>13} {'force 100 (s)':>14}"
+    )
+    for n in (1_000, 3_000, 10_000):
+        node_ids, edges = random_diagram(n)
+        results = {}
+        with timer(results, "layered"):
+            layered_layout(node_ids, edges)
+        for iterations in (50, 100):
+            with timer(results, iterations):
+                force_layout(node_ids, edges, iterations=iterations)
+        print(
+            f"{n:>8,} {results['layered']:>12.3f} {results[50]:>13.3f} "
+            f"{results[100]:>14.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare the peak memory and time of loading many files, copying each parsed
+file into the store as before, against parsing straight into the store.
+
+run with: python -m benchmarks.loading
+"""
+
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rdflib import Graph
+
+from benchmarks.common import synthetic_triples
+from rdfdig.loaders import load_dir
+from rdfdig.store import open_store
+
+
+def copied(folder: Path, store: Graph):
+    """parse each file into its own graph then add it to the store, as before"""
+    for file in sorted(folder.iterdir()):
+        part = Graph()
+        part.parse(file)
+        store += part
+        for prefix, namespace in part.namespace_manager.namespaces():
+            store.namespace_manager.bind(prefix=prefix, namespace=namespace)
+
+
+def measure(mode: str, folder: Path, store_path: Path):
+    """load folder in this process and print the time taken and peak RSS"""
+    store = Graph() if store_path.name == "memory" else open_store(store_path)
+    start = time.perf_counter()
+    if mode == "copied":
+        copied(folder, store)
+    else:
+        load_dir(folder, graph=store)
+    seconds = time.perf_counter() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"statements": len(store), "seconds": seconds, "rss": rss}))
+
+
+def main():
+    with TemporaryDirectory() as tmp:
+        folder = Path(tmp) / "data"
+        folder.mkdir()
+        triples = list(synthetic_triples(40_000))
+        files = 8
+        for i in range(files):
+            part = Graph()
+            part.bind("schema", "https://schema.org/")
+            for triple in triples[i::files]:
+                part.add(triple)
+            part.serialize(folder / f"{i}.ttl", format="turtle")
+        print(
+            f"{'store':>8} {'load':>8} {'statements':>11} {'time (s)':>9}"
+            f" {'peak RSS (MB)':>14}"
+        )
+        for store in ("memory", "disk"):
+            for mode in ("copied", "direct"):
+                store_path = Path(tmp) / f"{mode}.db"
+                if store == "memory":
+                    store_path = Path("memory")
+                result = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.loading", mode, str(folder)]
+                    + [str(store_path)],
+                    capture_output=True,
+                    check=True,
+                )
+                stats = json.loads(result.stdout)
+                print(
+                    f"{store:>8} {mode:>8} {stats['statements']:>11,}"
+                    f" {stats['seconds']:>9.2f} {stats['rss']:>14.0f}"
+                )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        measure(sys.argv[1], Path(sys.argv[2]), Path(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,42 @@
+"""Time rendering a large instance diagram with and without reducing it first.
+
+run with: python -m benchmarks.reduction
+"""
+
+import json
+
+from rdflib import URIRef
+
+from benchmarks.common import EX, synthetic_graph, timer
+from rdfdig.core import Diagram
+from rdfdig.reduction import reduce_diagram
+from rdfdig.renderers import mermaid_html, visjs_html
+
+
+def main():
+    store = synthetic_graph(20_000)
+    diagram = Diagram()
+    diagram._store = store
+    diagram._parse_instances(
+        URIRef(EX["r0"]), depth=4, max_nodes=100_000, max_edges=1_000_000
+    )
+    full = json.loads(diagram.serialize())
+    results = {}
+    with timer(results, "reduce"):
+        reduced = reduce_diagram(full)
+    print(f"reduced in {results['reduce']:.2f} s")
+    print(f"{'':>8} {'nodes':>8} {'edges':>8} {'visjs (s)':>10} {'mermaid (s)':>12}")
+    for name, serialization in (("full", full), ("reduced", reduced)):
+        with timer(results, "visjs"):
+            visjs_html(serialization, {})
+        with timer(results, "mermaid"):
+            mermaid_html(serialization, {})
+        print(
+            f"{name:>8} {len(serialization['nodes']):>8,} "
+            f"{len(serialization['edges']):>8,} {results['visjs']:>10.2f} "
+            f"{results['mermaid']:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
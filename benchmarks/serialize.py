@@ -0,0 +1,48 @@
+"""Compare serialize() with the streamed json and compact formats, and gzip.
+
+run with: python -m benchmarks.serialize
+"""
+
+import tracemalloc
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rdflib import URIRef
+
+from benchmarks.common import EX, synthetic_graph, timer
+from rdfdig.core import Diagram
+
+
+def main():
+    diagram = Diagram()
+    diagram._store = synthetic_graph(20_000)
+    diagram._parse_instances(
+        URIRef(EX["r0"]), depth=4, max_nodes=100_000, max_edges=1_000_000
+    )
+    print(f"{len(diagram.nodes):,} nodes, {len(diagram.edges):,} edges")
+    print(f"{'method':>16} {'time (s)':>9} {'peak (MiB)':>11} {'size (MiB)':>11}")
+    with TemporaryDirectory() as tmp:
+        methods = {
+            "serialize": lambda path: path.write_text(diagram.serialize()),
+            "json": lambda path: diagram.write("json", path),
+            "compact": lambda path: diagram.write("compact", path),
+            "json gzip": lambda path: diagram.write("json", path, compress=True),
+            "compact gzip": lambda path: diagram.write("compact", path, compress=True),
+        }
+        for name, method in methods.items():
+            path = Path(tmp) / name
+            diagram.serialization = {}
+            results = {}
+            tracemalloc.start()
+            with timer(results, name):
+                method(path)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(
+                f"{name:>16} {results[name]:>9.2f} {peak / 2**20:>11.1f} "
+                f"{path.stat().st_size / 2**20:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Measure the throughput of rdfdig serve against running the CLI per request.
+
+run with: python -m benchmarks.serve
+"""
+
+import subprocess
+import sys
+import threading
+from http.client import HTTPConnection
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from benchmarks.common import synthetic_graph, timer
+from rdfdig.core import Diagram
+from rdfdig.server import ViewServer
+
+VIEWS = ["/json", "/visjs", "/mermaid"] + [
+    f"/json?iri=http://example.org/r{i}&depth=2" for i in range(20)
+]
+
+
+def client(port: int, paths: list[str], requests: int):
+    """request paths in turn over one kept alive connection"""
+    connection = HTTPConnection("127.0.0.1", port)
+    for i in range(requests):
+        connection.request("GET", paths[i % len(paths)])
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 200
+    connection.close()
+
+
+def main():
+    with TemporaryDirectory() as tmp:
+        data = Path(tmp) / "data.ttl"
+        synthetic_graph(5_000).serialize(data, format="turtle")
+        results = {}
+        with timer(results, "cli"):
+            subprocess.run(
+                [sys.executable, "-m", "rdfdig", str(data), "-q", "--no-cache"],
+                check=True,
+                capture_output=True,
+            )
+
+        def load() -> Diagram:
+            diagram = Diagram()
+            diagram.parse(sources=[data])
+            return diagram
+
+        server = ViewServer(("127.0.0.1", 0), load)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_address[1]
+        with timer(results, "cold"):
+            client(port, VIEWS, len(VIEWS))
+        clients, requests = 8, 500
+        with timer(results, "warm"):
+            threads = [
+                threading.Thread(target=client, args=(port, VIEWS, requests))
+                for _ in range(clients)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        server.shutdown()
+        server.server_close()
+    print(f"cli, one process per request: {1 / results['cli']:>8.1f} requests/s")
+    print(
+        f"serve, first request per view: {len(VIEWS) / results['cold']:>7.1f} requests/s"
+    )
+    print(
+        f"serve, cached views: {clients * requests / results['warm']:>17.1f} requests/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
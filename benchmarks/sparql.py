@@ -0,0 +1,127 @@
+"""Time load_sparql against a local stand-in SPARQL endpoint with injected latency.
+
+compares fetching pages one at a time and concurrently, and the JSON-LD and
+N-Triples wire formats.
+
+the stand-in runs in its own process. it answers the COUNT query and serves
+CONSTRUCT pages by slicing a synthetic dataset on the query's limit and
+offset, so only the client side is measured.
+
+run with: python -m benchmarks.sparql
+"""
+
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Process
+
+from rdflib import Graph
+
+from benchmarks.common import synthetic_triples, timer
+from rdfdig.loaders import load_sparql
+
+PORT = 8765
+ENDPOINT = f"http://127.0.0.1:{PORT}/sparql"
+LATENCY = 0.1
+N_RESOURCES = 3000
+LIMIT = 1000
+
+
+def serve(latency: float, n_resources: int, formats: dict[str, str]):
+    """serve a synthetic dataset as pages of serialized triples
+
+    :param formats: maps the media types served to rdflib serializer names.
+    """
+    triples = list(dict.fromkeys(synthetic_triples(n_resources)))
+    pages: dict[tuple, bytes] = {}
+
+    def page(limit: int, offset: int, fmt: str) -> bytes:
+        if (limit, offset, fmt) not in pages:
+            graph = Graph()
+            for triple in triples[offset : offset + limit]:
+                graph.add(triple)
+            pages[(limit, offset, fmt)] = graph.serialize(format=fmt, encoding="utf-8")
+        return pages[(limit, offset, fmt)]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            query = self.rfile.read(int(self.headers["Content-Length"])).decode()
+            time.sleep(latency)
+            if "count(" in query:
+                media_type = "application/sparql-results+json"
+                body = json.dumps(
+                    {"results": {"bindings": [{"n": {"value": str(len(triples))}}]}}
+                ).encode()
+            else:
+                limit = int(re.search(r"limit (\d+)", query).group(1))
+                offset = int(re.search(r"offset (\d+)", query).group(1))
+                media_type = next(
+                    (m for m in formats if m in self.headers["Accept"]),
+                    next(iter(formats)),
+                )
+                body = page(limit, offset, formats[media_type])
+            self.send_response(200)
+            self.send_header("Content-Type", media_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        def handle_error(self, request, client_address):
+            pass  # cancelled pages close their connection mid response
+
+    Server(("127.0.0.1", PORT), Handler).serve_forever()
+
+
+def start_server(formats: dict[str, str], latency: float = LATENCY) -> Process:
+    server = Process(target=serve, args=(latency, N_RESOURCES, formats), daemon=True)
+    server.start()
+    time.sleep(1)
+    return server
+
+
+def fetch(**kwargs) -> Graph:
+    return load_sparql(
+        ENDPOINT,
+        iri=None,
+        graph=None,
+        username=None,
+        password=None,
+        limit=LIMIT,
+        cutoff=10**9,
+        timeout=60,
+        **kwargs,
+    )
+
+
+def main():
+    print(f"{N_RESOURCES:,} resources, {LIMIT} triples per page, {LATENCY}s latency")
+    print(f"{'format':>10} {'concurrency':>12} {'triples':>10} {'seconds':>10}")
+    servers = {
+        "json-ld": {"application/ld+json": "json-ld"},
+        "n-triples": {"application/n-triples": "nt", "application/ld+json": "json-ld"},
+    }
+    for name, formats in servers.items():
+        server = start_server(formats)
+        try:
+            fetch(concurrency=8)  # warm the stand-in's page cache
+            for concurrency in (1, 2, 4, 8):
+                results = {}
+                with timer(results, "fetch"):
+                    graph = fetch(concurrency=concurrency)
+                print(
+                    f"{name:>10} {concurrency:>12} {len(graph):>10,} {results['fetch']:>10.2f}"
+                )
+        finally:
+            server.terminate()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
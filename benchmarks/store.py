@@ -0,0 +1,39 @@
+"""Compare diagrams from the in memory store with the SQLite store on disk.
+
+run with: python -m benchmarks.store
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from benchmarks.common import synthetic_graph, timer
+from rdfdig.core import Diagram
+
+
+def main():
+    with TemporaryDirectory() as tmp:
+        data = Path(tmp) / "data.nt"
+        synthetic_graph(50_000).serialize(data, format="nt", encoding="utf-8")
+        store_path = Path(tmp) / "store.db"
+        results = {}
+        for name, kwargs in (
+            ("memory", {}),
+            ("disk load", {"store_path": store_path}),
+        ):
+            with timer(results, name):
+                diagram = Diagram()
+                diagram.parse(sources=[data], **kwargs)
+        with timer(results, "disk reopen"):
+            Diagram().parse(sources=[], store_path=store_path)
+        with timer(results, "disk instance"):
+            Diagram().parse(
+                sources=[], store_path=store_path, iri="http://example.org/r0", depth=3
+            )
+        print(f"statements: {len(diagram._store):,}")
+        print(f"database size: {store_path.stat().st_size / 1024**2:.1f} MB")
+        for name, seconds in results.items():
+            print(f"{name + ' (s)':>20} {seconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
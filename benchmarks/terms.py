@@ -0,0 +1,61 @@
+"""Compare the memory used by sets of Node/Edge tuples with the column tables.
+
+run with: python -m benchmarks.terms
+"""
+
+import tracemalloc
+
+from rdflib import BNode, Literal
+
+from benchmarks.common import synthetic_graph
+from rdfdig.terms import Edge, EdgeTable, Node, NodeTable, TermIds
+
+
+def tuple_sets(triples, nm) -> tuple[set, set]:
+    """nodes and edges as stored before, with hash() ids"""
+    nodes, edges = set(), set()
+    for subj, pred, obj in triples:
+        nodes.add(Node(hash(subj), subj.n3(nm), False, isinstance(subj, BNode)))
+        isliteral, isblank = isinstance(obj, Literal), isinstance(obj, BNode)
+        nodes.add(Node(hash(obj), obj.n3(nm), isliteral, isblank))
+        edges.add(Edge(hash(subj), hash(obj), pred.n3(nm)))
+    return nodes, edges
+
+
+def tables(triples, nm) -> tuple[TermIds, NodeTable, EdgeTable]:
+    ids, nodes, edges = TermIds(), NodeTable(), EdgeTable()
+    for subj, pred, obj in triples:
+        for term in (subj, obj):
+            if ids[term] not in nodes:
+                nodes.add(
+                    ids[term],
+                    term.n3(nm),
+                    isinstance(term, Literal),
+                    isinstance(term, BNode),
+                )
+        edges.add(ids[subj], ids[obj], pred.n3(nm))
+    return ids, nodes, edges
+
+
+def measure(build, *args) -> tuple[object, int]:
+    tracemalloc.start()
+    result = build(*args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    print(f"{'edges':>10} {'tuple sets (MB)':>16} {'tables (MB)':>12}")
+    for n in (5_000, 20_000):
+        store = synthetic_graph(n)
+        triples = list(store)
+        nm = store.namespace_manager
+        (nodes, edges), before = measure(tuple_sets, triples, nm)
+        (_, node_table, edge_table), after = measure(tables, triples, nm)
+        assert len(edges) == len(edge_table) and len(nodes) == len(node_table)
+        print(f"{len(edges):>10,} {before / 1024**2:>16.1f} {after / 1024**2:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Time writing a large diagram in each format, with the peak memory it takes.
+
+run with: python -m benchmarks.writers
+"""
+
+import tracemalloc
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rdflib import URIRef
+
+from benchmarks.common import EX, synthetic_graph, timer
+from rdfdig.core import Diagram
+from rdfdig.writers import WRITE_FORMATS, format_chunks, write_chunks
+
+
+def main():
+    diagram = Diagram()
+    diagram._store = synthetic_graph(20_000)
+    diagram._parse_instances(
+        URIRef(EX["r0"]), depth=4, max_nodes=100_000, max_edges=1_000_000
+    )
+    diagram.serialize()
+    serialization = diagram.serialization
+    print(
+        f"{len(serialization['nodes']):,} nodes, "
+        f"{len(serialization['edges']):,} edges"
+    )
+    print(f"{'format':>14} {'time (s)':>9} {'peak (MiB)':>11} {'size (MiB)':>11}")
+    with TemporaryDirectory() as tmp:
+        for format in WRITE_FORMATS:
+            path = Path(tmp) / format
+            results = {}
+            tracemalloc.start()
+            with timer(results, format):
+                chunks = format_chunks(serialization, format, layout_name="browser")
+                write_chunks(chunks, path)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(
+                f"{format:>14} {results[format]:>9.2f} {peak / 2**20:>11.1f} "
+                f"{path.stat().st_size / 2**20:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,51 @@
 import argparse
 import logging
+import os
+import sys
+from pathlib import Path
 from textwrap import dedent
 
 from rdfdig import __version__
+from rdfdig.batch import read_iris, write_batch
 from rdfdig.core import Diagram
+from rdfdig.layout import AUTO_NODES, ITERATIONS, LAYOUTS
+from rdfdig.loaders import sparql_password
 from rdfdig.logs import setup_logging
-from rdfdig.utils import format_help_message, formats
+from rdfdig.reduction import Thresholds
+from rdfdig.server import explore, serve
+from rdfdig.summarizers import BACKENDS
+from rdfdig.utils import (
+    default_cache_dir,
+    format_help_message,
+    formats,
+    write_format_help_message,
+)
+from rdfdig.writers import WRITE_FORMATS
 
 setup_logging()
 logger = logging.getLogger(__name__)
 root_logger = logging.getLogger()
 
+# the defaults of the --reduce-above, --keep-top and --fold-min options
+DEFAULT_THRESHOLDS = Thresholds()
 
-def main():
-    """The command line entrypoint for RDFDig"""
+
+def positive_int(value: str) -> int:
+    """an argparse type for integers of at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {number}")
+    return number
+
+
+def build_parser(
+    prog: str = "rdfdig",
+    description: str = "A command line tool for creating diagrams from RDF data.",
+) -> argparse.ArgumentParser:
+    """the arguments shared by rdfdig and rdfdig serve"""
     parser = argparse.ArgumentParser(
-        prog="rdfdig",
-        description="A command line tool for creating diagrams from RDF data.",
+        prog=prog,
+        description=description,
         formatter_class=argparse.RawTextHelpFormatter,
     )
     format_group = parser.add_argument_group("OUTPUT FORMATS")
@@ -26,7 +55,7 @@ def main():
         "sources",
         action="store",
         type=str,
-        nargs="+",
+        nargs="*",
         help="One or more data sources. Allowed sources are files, folders, and sparql endpoint.",
     )
     parser.add_argument(
@@ -44,6 +73,34 @@ def main():
         """
         ),
     )
+    parser.add_argument(
+        "-d",
+        "--depth",
+        action="store",
+        type=int,
+        default=1,
+        dest="depth",
+        help=dedent(
+            """
+            number of hops from {--iri} to expand. blank nodes are always
+            expanded and do not count as a hop.
+        """
+        ),
+    )
+    parser.add_argument(
+        "--max-nodes",
+        action="store",
+        type=int,
+        dest="max_nodes",
+        help="stop expanding {--iri} once the diagram has this many nodes.",
+    )
+    parser.add_argument(
+        "--max-edges",
+        action="store",
+        type=int,
+        dest="max_edges",
+        help="stop expanding {--iri} once the diagram has this many edges.",
+    )
     parser.add_argument(
         "-g",
         "--graph",
@@ -54,7 +111,121 @@ def main():
         help=dedent(
             """
             A named graph to limit the scope of the diagram. Can only be
-            enforced if {source} is a SPARQL endpoint.
+            enforced if {source} is a SPARQL endpoint, or for N-Quads
+            sources with the {--stream} flag.
+        """
+        ),
+    )
+    parser.add_argument(
+        "-s",
+        "--stream",
+        action="store_true",
+        default=False,
+        dest="stream",
+        help=dedent(
+            """
+            summarize N-Triples (.nt) or N-Quads (.nq) sources one line at
+            a time without loading them into memory. Only available for
+            class diagrams. with N-Quads {--graph} limits the statements read.
+        """
+        ),
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        action="store",
+        type=int,
+        default=1,
+        dest="jobs",
+        help=dedent(
+            """
+            number of processes used to parse the files in folder sources,
+            or to summarize sources with the {--stream} flag.
+        """
+        ),
+    )
+    parser.add_argument(
+        "--backend",
+        action="store",
+        choices=BACKENDS,
+        default="python",
+        dest="backend",
+        help=dedent(
+            """
+            implementation of class diagrams. numpy encodes the statements
+            into integer arrays and summarizes them a column at a time,
+            which is faster for large data. requires numpy to be installed.
+        """
+        ),
+    )
+    parser.add_argument(
+        "--cache",
+        "--cache-dir",
+        action="store",
+        type=Path,
+        default=None,
+        dest="cache_dir",
+        help=dedent(
+            f"""
+            folder to cache parsed files in, such as
+            {default_cache_dir() / "parsed"}. files that have not changed
+            since they were cached are loaded without being parsed again.
+            files are not cached by default.
+        """
+        ),
+    )
+    parser.add_argument(
+        "--cache-size",
+        action="store",
+        type=int,
+        default=1024,
+        dest="cache_size",
+        help="maximum size of each cache in MB. least recently used entries are removed first.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_const",
+        const=None,
+        dest="cache_dir",
+        help="do not cache parsed files, the default",
+    )
+    parser.add_argument(
+        "--sample",
+        action="store",
+        type=positive_int,
+        dest="sample",
+        help=dedent(
+            """
+            for class diagrams, look at no more than this many instances of
+            each class. gives a sketch of large data quickly. each edge is
+            serialized with its estimated support, the number of statements
+            behind it, and whether it is exhaustive or sampled.
+        """
+        ),
+    )
+    parser.add_argument(
+        "--store",
+        action="store",
+        type=Path,
+        dest="store_path",
+        help=dedent(
+            """
+            load the sources into a SQLite database at this path instead of
+            memory, for data larger than RAM. the database is kept, so
+            giving --store without sources diagrams the data loaded before.
+        """
+        ),
+    )
+    parser.add_argument(
+        "--deterministic-ids",
+        action="store_true",
+        default=False,
+        dest="deterministic_ids",
+        help=dedent(
+            """
+            derive node ids from the content of each term so that they, and
+            the serialized diagram, are the same in every run. blank node ids
+            still change between runs.
         """
         ),
     )
@@ -66,6 +237,97 @@ def main():
         dest="preview",
         help="render the diagram in the browser after serializing it.",
     )
+    parser.add_argument(
+        "--layout",
+        action="store",
+        choices=LAYOUTS,
+        default="auto",
+        dest="layout",
+        help=dedent(
+            f"""
+            how visjs diagrams are laid out. browser leaves it to the physics
+            of visjs, which can take minutes to settle for large diagrams.
+            force and layered compute the positions before the page is
+            rendered, with physics turned off. force requires numpy to be
+            installed. auto uses force, or layered without numpy, for
+            diagrams of {AUTO_NODES} or more nodes and browser otherwise.
+        """
+        ),
+    )
+    parser.add_argument(
+        "--layout-iterations",
+        action="store",
+        type=int,
+        default=ITERATIONS,
+        dest="layout_iterations",
+        help=dedent(
+            """
+            number of iterations of the force layout. the time it takes grows
+            with the iterations, fewer gives a rougher layout sooner.
+        """
+        ),
+    )
+    parser.add_argument(
+        "--reduce-above",
+        action="store",
+        type=int,
+        default=DEFAULT_THRESHOLDS.max_nodes,
+        dest="reduce_above",
+        help=dedent(
+            """
+            reduce rendered diagrams with more nodes than this. the literals
+            of each resource are collapsed by datatype, leaves are folded
+            into "+N more" nodes, only the {--keep-top} best connected nodes
+            are kept and parallel edges are bundled, stopping once the
+            diagram is small enough. double click a collapsed or folded node
+            in a visjs diagram to show what it stands for. the serialized
+            JSON is never reduced.
+        """
+        ),
+    )
+    parser.add_argument(
+        "--keep-top",
+        action="store",
+        type=int,
+        default=DEFAULT_THRESHOLDS.top_k,
+        dest="keep_top",
+        help="number of resource or class nodes kept when reducing a diagram",
+    )
+    parser.add_argument(
+        "--fold-min",
+        action="store",
+        type=int,
+        default=DEFAULT_THRESHOLDS.fold_min,
+        dest="fold_min",
+        help="fewest leaves of a node to fold into one node when reducing a diagram",
+    )
+    parser.add_argument(
+        "-x",
+        "--explore",
+        action="store_true",
+        default=False,
+        dest="explore",
+        help=dedent(
+            """
+            serve an instance diagram from this process and open it in the
+            browser with visjs. double click a node to add its neighbourhood.
+            Only available with {--iri}.
+        """
+        ),
+    )
+    parser.add_argument(
+        "--port",
+        action="store",
+        type=int,
+        default=0,
+        dest="port",
+        help=dedent(
+            """
+            port to serve diagrams on. any free port by default with
+            {--explore}, 8000 with rdfdig serve.
+        """
+        ),
+    )
     parser.add_argument(
         "-v",
         "--verbose",
@@ -91,6 +353,34 @@ def main():
         dest="format",
         help=format_help_message,
     )
+    format_group.add_argument(
+        "-w",
+        "--write",
+        action="store",
+        choices=WRITE_FORMATS,
+        default="json",
+        dest="write_format",
+        help=write_format_help_message,
+    )
+    format_group.add_argument(
+        "--output",
+        action="store",
+        type=Path,
+        dest="output",
+        help=dedent(
+            """
+            path to write the diagram to, in the format given by {--write}.
+            stdout by default.
+        """
+        ),
+    )
+    format_group.add_argument(
+        "--gzip",
+        action="store_true",
+        default=False,
+        dest="gzip",
+        help="gzip the diagram written by {--write}",
+    )
     sparql_group.add_argument(
         "-u",
         "--username",
@@ -118,7 +408,12 @@ def main():
         type=int,
         default=1000,
         dest="limit",
-        help="SPARQL limit clause",
+        help=dedent(
+            """
+            SPARQL limit clause. the initial page size, which grows or
+            shrinks to suit the response times of the endpoint.
+        """
+        ),
     )
     sparql_group.add_argument(
         "-o",
@@ -147,16 +442,98 @@ def main():
         dest="timeout",
         help="HTTP timeout duration (in seconds) for SPARQL queries",
     )
-    args = parser.parse_args()
-    if args.quiet:
-        root_logger.setLevel(logging.CRITICAL)
-    else:
-        root_logger.setLevel(
-            max([10, (30 - (args.verbosity * 10))])
-        )  # logging.WARNING = 30, logging.DEBUG = 10. each -v decreases the log level by 10
-    logging.info(f"starting program with args:\n{args}")
-    diagram = Diagram()
-    diagram.parse(
+    sparql_group.add_argument(
+        "--concurrency",
+        action="store",
+        type=int,
+        default=4,
+        dest="concurrency",
+        help="number of SPARQL pages to fetch at once",
+    )
+    sparql_group.add_argument(
+        "--retries",
+        action="store",
+        type=int,
+        default=3,
+        dest="retries",
+        help="number of times to retry SPARQL requests that fail with transient errors",
+    )
+    sparql_group.add_argument(
+        "--checkpoint-dir",
+        action="store",
+        type=Path,
+        default=default_cache_dir() / "checkpoints",
+        dest="checkpoint_dir",
+        help=dedent(
+            """
+            folder to save the progress of SPARQL fetches in. an interrupted
+            fetch is resumed when rdfdig is run again with the same arguments.
+        """
+        ),
+    )
+    sparql_group.add_argument(
+        "--no-checkpoint",
+        action="store_const",
+        const=None,
+        dest="checkpoint_dir",
+        help="do not save or resume the progress of SPARQL fetches",
+    )
+    sparql_group.add_argument(
+        "-a",
+        "--aggregate",
+        action="store_true",
+        default=False,
+        dest="aggregate",
+        help=dedent(
+            """
+            build class diagrams with aggregate queries run by the endpoint
+            rather than fetching triples. the whole dataset is summarized,
+            {--limit}, {--offset} and {--cutoff} are ignored.
+        """
+        ),
+    )
+    sparql_group.add_argument(
+        "--http-cache-dir",
+        action="store",
+        type=Path,
+        default=None,
+        dest="http_cache_dir",
+        help=dedent(
+            f"""
+            folder to cache SPARQL responses in, such as
+            {default_cache_dir() / "http"}. responses are cached per
+            endpoint, query and {{--username}}. responses are not cached by
+            default.
+        """
+        ),
+    )
+    sparql_group.add_argument(
+        "--http-cache-ttl",
+        action="store",
+        type=float,
+        default=600,
+        dest="http_cache_ttl",
+        help=dedent(
+            """
+            seconds a cached SPARQL response is used for before it is
+            revalidated with the endpoint, or fetched again if the endpoint
+            does not send ETag or Last-Modified headers.
+        """
+        ),
+    )
+    sparql_group.add_argument(
+        "--no-http-cache",
+        action="store_const",
+        const=None,
+        dest="http_cache_dir",
+        help="do not cache SPARQL responses, the default",
+    )
+    return parser
+
+
+def parse_kwargs(args: argparse.Namespace) -> dict:
+    """the keyword arguments for Diagram.parse from the parsed command line"""
+    return dict(
         sources=args.sources,
         iri=args.iri,
         graph=args.graph,
@@ -166,11 +543,195 @@ def main():
         offset=args.offset,
         cutoff=args.cutoff,
         timeout=args.timeout,
+        stream=args.stream,
+        jobs=args.jobs,
+        aggregate=args.aggregate,
+        concurrency=args.concurrency,
+        retries=args.retries,
+        checkpoint_dir=args.checkpoint_dir,
+        cache_dir=args.cache_dir,
+        cache_size=args.cache_size * 1024**2,
+        http_cache_dir=args.http_cache_dir,
+        http_cache_ttl=args.http_cache_ttl,
+        depth=args.depth,
+        max_nodes=args.max_nodes,
+        max_edges=args.max_edges,
+        backend=args.backend,
+        store_path=args.store_path,
+        sample=args.sample,
     )
-    print(diagram.serialize())
-    if args.preview:
+
+
+def configure(diagram: Diagram, args: argparse.Namespace):
+    """set how diagram is reduced and laid out when it is rendered"""
+    diagram.layout, diagram.layout_iterations = args.layout, args.layout_iterations
+    diagram.thresholds = Thresholds(args.reduce_above, args.keep_top, args.fold_min)
+
+
+def set_verbosity(args: argparse.Namespace):
+    if args.quiet:
+        root_logger.setLevel(logging.CRITICAL)
+    else:
+        root_logger.setLevel(
+            max([10, (30 - (args.verbosity * 10))])
+        )  # logging.WARNING = 30, logging.DEBUG = 10. each -v decreases the log level by 10
+    logging.info(f"starting program with args:\n{args}")
+
+
+def main():
+    """The command line entrypoint for RDFDig"""
+    if sys.argv[1:2] == ["serve"]:
+        serve_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["batch"]:
+        batch_main(sys.argv[2:])
+        return
+    parser = build_parser()
+    args = parser.parse_args()
+    if not args.sources and not args.store_path:
+        parser.error("give one or more sources, or a --store to reopen")
+    if args.explore and not args.iri:
+        parser.error("--explore requires --iri")
+    if args.stream and args.store_path:
+        parser.error("--stream cannot be used with --store")
+    set_verbosity(args)
+    diagram = Diagram(deterministic_ids=args.deterministic_ids)
+    configure(diagram, args)
+    diagram.parse(**parse_kwargs(args))
+    diagram.write(args.write_format, args.output, compress=args.gzip)
+    if args.explore:
+        explore(diagram, port=args.port)
+    elif args.preview:
         diagram.render(format=args.format)
 
 
+def serve_main(argv: list[str]):
+    """The entrypoint for rdfdig serve
+
+    loads the sources once and serves class and instance views of them over
+    HTTP. see rdfdig.server.ViewHandler for the requests that are answered.
+    """
+    parser = build_parser(
+        prog="rdfdig serve",
+        description=dedent(
+            """
+            Load RDF data once and serve diagrams of it over HTTP.
+
+            GET /json, /visjs or /mermaid for the class diagram, add
+            ?iri=...&depth=... for an instance diagram. POST /reload to
+            load the sources again.
+        """
+        ),
+    )
+    server_group = parser.add_argument_group("SERVER OPTIONS")
+    server_group.add_argument(
+        "--host",
+        action="store",
+        default="127.0.0.1",
+        dest="host",
+        help="address to serve diagrams on",
+    )
+    server_group.add_argument(
+        "--max-views",
+        action="store",
+        type=int,
+        default=256,
+        dest="max_views",
+        help="number of rendered diagrams to keep in memory",
+    )
+    parser.set_defaults(port=8000)
+    args = parser.parse_args(argv)
+    if not args.sources and not args.store_path:
+        parser.error("give one or more sources, or a --store to reopen")
+    if args.iri:
+        parser.error("give the iri as a query parameter of each request instead")
+    if args.stream:
+        parser.error("--stream is not supported by rdfdig serve")
+    set_verbosity(args)
+    kwargs = parse_kwargs(args)
+    # prompt for a missing password once, not on every reload
+    kwargs["password"] = sparql_password(args.username, args.password)
+
+    def load() -> Diagram:
+        diagram = Diagram(deterministic_ids=args.deterministic_ids)
+        configure(diagram, args)
+        diagram.parse(**kwargs)
+        return diagram
+
+    serve(load, host=args.host, port=args.port, max_views=args.max_views)
+
+
+def batch_main(argv: list[str]):
+    """The entrypoint for rdfdig batch
+
+    loads the sources once and writes an instance diagram of each IRI read
+    from a file or stdin to a file of its own. see rdfdig.batch.
+    """
+    parser = build_parser(
+        prog="rdfdig batch",
+        description=dedent(
+            """
+            Load RDF data once and write an instance diagram of each of many
+            IRIs, one file per IRI, in the format given by {--write}.
+
+            the IRIs are read one to a line from {--iris} or stdin. a line of
+            each IRI and the path of its diagram, separated by a tab, is
+            printed as each diagram is written.
+        """
+        ),
+    )
+    batch_group = parser.add_argument_group("BATCH OPTIONS")
+    batch_group.add_argument(
+        "--iris",
+        action="store",
+        type=Path,
+        dest="iris",
+        help="file of the IRIs to diagram, one to a line. stdin by default.",
+    )
+    batch_group.add_argument(
+        "--out-dir",
+        action="store",
+        type=Path,
+        required=True,
+        dest="out_dir",
+        help="folder to write the diagrams to",
+    )
+    batch_group.add_argument(
+        "--workers",
+        action="store",
+        type=int,
+        default=os.cpu_count() or 1,
+        dest="workers",
+        help="number of processes making diagrams, one per core by default",
+    )
+    args = parser.parse_args(argv)
+    if not args.sources and not args.store_path:
+        parser.error("give one or more sources, or a --store to reopen")
+    if args.iri:
+        parser.error("give the IRIs with --iris or on stdin instead")
+    if args.stream:
+        parser.error("--stream is not supported by rdfdig batch")
+    if args.output:
+        parser.error("each diagram is written to --out-dir instead of --output")
+    set_verbosity(args)
+    diagram = Diagram(deterministic_ids=args.deterministic_ids)
+    configure(diagram, args)
+    # only the neighbourhoods of the IRIs are needed, not a class diagram
+    diagram.parse(**parse_kwargs(args), load_only=True)
+    iris = open(args.iris) if args.iris else sys.stdin
+    with iris:
+        write_batch(
+            diagram,
+            read_iris(iris),
+            args.out_dir,
+            format=args.write_format,
+            jobs=args.workers,
+            depth=args.depth,
+            max_nodes=args.max_nodes,
+            max_edges=args.max_edges,
+            compress=args.gzip,
+        )
+
+
 if __name__ == "__main__":
     main()
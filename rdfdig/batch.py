@@ -0,0 +1,180 @@
+"""Write an instance diagram of each of many IRIs from data loaded once.
+
+the sources are loaded once into a Diagram, without making a class
+diagram of them, see the load_only parameter of Diagram.parse. then each
+IRI is given to a worker process that makes its instance diagram with
+Diagram.focus and writes it to a file of its own. workers are forked from
+this process so they share the loaded store rather than loading or copying
+it. where fork is not available the diagrams are made in this process.
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, TextIO
+
+from rdfdig.core import Diagram
+from rdfdig.store import SQLiteStore, open_store
+
+logger = logging.getLogger(__name__)
+
+# the file extension of each of rdfdig.writers.WRITE_FORMATS
+EXTENSIONS = {
+    "json": ".json",
+    "compact": ".json",
+    "visjs": ".html",
+    "mermaid": ".html",
+    "mermaid-text": ".mmd",
+    "dot": ".dot",
+    "graphml": ".graphml",
+}
+
+
+class BatchStats(NamedTuple):
+    written: int
+    failed: int
+    seconds: float
+
+    @property
+    def rate(self) -> float:
+        """diagrams made each second"""
+        return (self.written + self.failed) / self.seconds if self.seconds else 0.0
+
+
+def read_iris(file: TextIO) -> Iterator[str]:
+    """the IRIs in file, one to a line. blank lines and # comments are skipped"""
+    for line in file:
+        iri = line.strip()
+        if iri and not iri.startswith("#"):
+            yield iri
+
+
+def iri_filename(iri: str, format: str, compress: bool = False) -> str:
+    """a file name for the diagram of iri
+
+    the IRI, without its scheme and with unsafe characters replaced, and a
+    64 bit hash of the whole IRI so that IRIs that differ only in the
+    replaced or truncated characters are kept apart. two IRIs are only given
+    the same name if their hashes collide, the chance of which among a
+    million IRIs is about one in 40 million.
+
+    :param compress: the diagram is gzipped, the name ends with .gz.
+    """
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", iri.split("://", 1)[-1]).strip("_.")
+    digest = hashlib.blake2b(iri.encode(), digest_size=8).hexdigest()
+    extension = EXTENSIONS[format] + (".gz" if compress else "")
+    return f"{name[:80]}-{digest}{extension}"
+
+
+# the number of IRIs sent to a worker process at a time
+CHUNK_SIZE = 16
+
+# the loaded diagram, handed to each worker process by _init_worker
+_worker_diagram: Diagram | None = None
+
+
+def _init_worker(diagram: Diagram):
+    global _worker_diagram
+    store = diagram._store.store
+    if isinstance(store, SQLiteStore):
+        # a SQLite connection must not be used by more than one process
+        diagram._store = open_store(store.path)
+        diagram._labels = None
+    _worker_diagram = diagram
+
+
+def _write_diagram(
+    iri: str,
+    out_dir: Path,
+    format: str,
+    depth: int,
+    max_nodes: int | None,
+    max_edges: int | None,
+    compress: bool = False,
+) -> tuple[str, Path | None]:
+    """write the instance diagram of iri, the path is None if it failed"""
+    path = out_dir / iri_filename(iri, format, compress)
+    try:
+        diagram = _worker_diagram.focus(
+            iri, depth=depth, max_nodes=max_nodes, max_edges=max_edges
+        )
+        diagram.write(format, path, compress)
+    except Exception as error:
+        logger.warning(f"could not write the diagram of {iri}: {error}")
+        return iri, None
+    return iri, path
+
+
+def write_batch(
+    diagram: Diagram,
+    iris: Iterable[str],
+    out_dir: Path,
+    format: str = "json",
+    jobs: int = 1,
+    depth: int = 1,
+    max_nodes: int | None = None,
+    max_edges: int | None = None,
+    manifest: TextIO | None = sys.stdout,
+    compress: bool = False,
+) -> BatchStats:
+    """write the instance diagram of each of iris to a file in out_dir
+
+    :param diagram: the diagram the sources have been parsed into.
+    :param format: one of rdfdig.writers.WRITE_FORMATS.
+    :param jobs: number of worker processes.
+    :param manifest: a line of the IRI and the path of its diagram, separated
+        by a tab, is written here as each diagram is written.
+    :param compress: gzip each diagram.
+    :returns: the number of diagrams written and failed, and the time taken.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # label terms in the workers with a labeller made once, here
+    diagram._labeller()
+    write = partial(
+        _write_diagram,
+        out_dir=out_dir,
+        format=format,
+        depth=depth,
+        max_nodes=max_nodes,
+        max_edges=max_edges,
+        compress=compress,
+    )
+    start = time.perf_counter()
+    written = failed = 0
+
+    def record(results: Iterable[tuple[str, Path | None]]):
+        nonlocal written, failed
+        for iri, path in results:
+            if path is None:
+                failed += 1
+                continue
+            written += 1
+            if manifest is not None:
+                manifest.write(f"{iri}\t{path}\n")
+
+    if jobs > 1 and "fork" in multiprocessing.get_all_start_methods():
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(diagram,),
+        ) as executor:
+            record(executor.map(write, iris, chunksize=CHUNK_SIZE))
+    else:
+        if jobs > 1:
+            logger.warning("fork is not available, writing diagrams in one process")
+        global _worker_diagram
+        _worker_diagram = diagram
+        record(map(write, iris))
+    stats = BatchStats(written, failed, time.perf_counter() - start)
+    logger.warning(
+        f"wrote {stats.written:,} diagrams, {stats.failed:,} failed, in "
+        f"{stats.seconds:.1f} s, {stats.rate:.1f} diagrams a second"
+    )
+    return stats
@@ -0,0 +1,293 @@
+import hashlib
+import json
+import logging
+import marshal
+import os
+import time
+from array import array
+from pathlib import Path
+from typing import NamedTuple
+
+import httpx
+from rdflib import BNode, Graph, Literal, URIRef
+
+logger = logging.getLogger(__name__)
+
+# bump to invalidate entries written in an older layout
+CACHE_VERSION = 1
+
+URIREF, BNODE, LITERAL = 0, 1, 2
+
+# the most bytes of recorded file stats a ParseCache keeps, some 100,000 files
+STATS_MAX_SIZE = 8 * 1024**2
+
+
+def file_digest(path: Path) -> str:
+    """hash the content of path"""
+    digest = hashlib.blake2b(digest_size=20)
+    with path.open("rb") as file:
+        while chunk := file.read(1024**2):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_graph(graph: Graph) -> bytes:
+    """encode the triples and namespace bindings of graph to a compact binary form
+
+    each distinct term is stored once and the triples are stored as an array
+    of term indexes. only basic types are used so it can be read with marshal.
+    """
+    ids: dict = {}
+    terms: list[tuple] = []
+    triples = array("Q")
+    for triple in graph:
+        for term in triple:
+            term_id = ids.get(term)
+            if term_id is None:
+                term_id = ids[term] = len(terms)
+                if isinstance(term, Literal):
+                    datatype = str(term.datatype) if term.datatype else None
+                    terms.append((LITERAL, str(term), term.language, datatype))
+                elif isinstance(term, BNode):
+                    terms.append((BNODE, str(term), None, None))
+                else:
+                    terms.append((URIREF, str(term), None, None))
+            triples.append(term_id)
+    namespaces = [
+        (prefix, str(namespace))
+        for prefix, namespace in graph.namespace_manager.namespaces()
+    ]
+    return marshal.dumps((CACHE_VERSION, namespaces, terms, triples.tobytes()))
+
+
+def decode_graph(data: bytes, graph: Graph | None = None) -> Graph:
+    """decode the output of encode_graph, with fresh blank nodes
+
+    :param graph: the graph to add the statements and namespace bindings to,
+        a new one if None.
+    """
+    version, namespaces, terms, triples_bytes = marshal.loads(data)
+    if version != CACHE_VERSION:
+        raise ValueError(f"unsupported cache version {version}")
+    nodes = []
+    for kind, value, lang, datatype in terms:
+        if kind == LITERAL:
+            nodes.append(Literal(value, lang=lang, datatype=datatype))
+        elif kind == BNODE:
+            nodes.append(BNode())
+        else:
+            nodes.append(URIRef(value))
+    triples = array("Q")
+    triples.frombytes(triples_bytes)
+    if graph is None:
+        graph = Graph()
+    for prefix, namespace in namespaces:
+        graph.namespace_manager.bind(prefix=prefix, namespace=namespace)
+    graph.addN(
+        (nodes[triples[i]], nodes[triples[i + 1]], nodes[triples[i + 2]], graph)
+        for i in range(0, len(triples), 3)
+    )
+    return graph
+
+
+class ParseCache:
+    """An on disk cache of parsed RDF files.
+
+    Files are looked up by path. If the size and modification time of the
+    file are unchanged since it was last seen its recorded content hash is
+    reused, otherwise the content is hashed again. Parsed files are stored
+    under their content hash, in the form written by encode_graph, so a
+    file that is touched or copied without being changed is still a hit.
+
+    When the entries grow past max_size the least recently used are removed.
+    The recorded stats of files are bounded by STATS_MAX_SIZE in the same way.
+
+    :param path: the folder to keep the cache in.
+    :param max_size: the maximum total size, in bytes, of the cached entries.
+    """
+
+    def __init__(self, path: Path, max_size: int = 1024**3):
+        self.path = path
+        self.max_size = max_size
+
+    def parse(self, path: Path, graph: Graph | None = None) -> Graph:
+        """parse the RDF file at path, from the cache if possible
+
+        :param graph: the graph to add the statements and namespace bindings
+            to, a new one if None. a cached file is decoded straight into it,
+            as is a file that is not cached if graph is empty. otherwise
+            the file is parsed into a graph of its own to be cached, and
+            then added to graph.
+        """
+        entry = self._entry(path)
+        if entry.exists():
+            try:
+                decoded = decode_graph(entry.read_bytes(), graph)
+            except Exception as e:
+                logger.warning(f"ignoring unreadable cache entry for {path.name}: {e}")
+            else:
+                os.utime(entry)
+                logger.info(f"loaded rdf for {path.name} from cache")
+                return decoded
+        logger.info(f"parsing rdf from {path.name}")
+        if graph is None or len(graph) == 0:
+            # nothing else is in graph, so the cache entry is written from it
+            graph = Graph() if graph is None else graph
+            graph.parse(path)
+            self._write(entry, encode_graph(graph))
+            self.evict()
+            return graph
+        # the file is parsed on its own so that it can be cached on its own
+        parsed = Graph()
+        parsed.parse(path)
+        self._write(entry, encode_graph(parsed))
+        self.evict()
+        graph += parsed
+        for prefix, namespace in parsed.namespace_manager.namespaces():
+            graph.namespace_manager.bind(prefix=prefix, namespace=namespace)
+        return graph
+
+    def _entry(self, path: Path) -> Path:
+        """the cache entry for the current content of path"""
+        path = path.resolve()
+        stat = path.stat()
+        key = hashlib.sha256(str(path).encode()).hexdigest()
+        stat_path = self.path / "stats" / f"{key}.json"
+        seen = {}
+        if stat_path.exists():
+            seen = json.loads(stat_path.read_text())
+        if seen.get("size") == stat.st_size and seen.get("mtime") == stat.st_mtime_ns:
+            digest = seen["digest"]
+            # keep the stats of files that are still loaded, see evict()
+            os.utime(stat_path)
+        else:
+            digest = file_digest(path)
+            self._write(
+                stat_path,
+                json.dumps(
+                    {"size": stat.st_size, "mtime": stat.st_mtime_ns, "digest": digest}
+                ).encode(),
+            )
+        return self.path / "entries" / f"{digest}-{CACHE_VERSION}.bin"
+
+    @staticmethod
+    def _write(path: Path, data: bytes):
+        """write data to path atomically, other processes may be reading it"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+    def evict(self):
+        """remove the least recently used entries until the cache fits in max_size
+
+        the recorded stats of files are removed in the same way once they
+        pass STATS_MAX_SIZE, a file whose stats are removed is hashed again.
+        """
+        evict(self.path / "entries", max_size=self.max_size)
+        evict(self.path / "stats", max_size=STATS_MAX_SIZE)
+
+
+def evict(path: Path, max_size: int):
+    """remove the least recently modified files in path until they fit in max_size"""
+    files = []
+    for file in path.glob("*"):
+        try:
+            stat = file.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, file))
+    total = sum(size for _, size, _ in files)
+    for _, size, file in sorted(files, key=lambda file: file[0]):
+        if total <= max_size:
+            break
+        file.unlink(missing_ok=True)
+        total -= size
+        logger.debug(f"evicted {file.name} from {path}")
+
+
+class CachedResponse(NamedTuple):
+    key: str
+    response: httpx.Response
+    fresh: bool
+    validators: dict[str, str]
+
+
+class ResponseCache:
+    """An on disk cache of SPARQL responses.
+
+    Responses are keyed by endpoint, query text (which includes any named
+    graph), requested media types and the identity the requests are made as.
+    A response younger than ttl seconds is used as is. An older response is
+    revalidated with the endpoint using its ETag or Last-Modified header,
+    if it had one, and otherwise fetched again.
+
+    When the cached responses grow past max_size the least recently used are
+    removed.
+
+    :param path: the folder to keep the cache in.
+    :param ttl: seconds a response is used for without asking the endpoint.
+    :param max_size: the maximum total size, in bytes, of the cached responses.
+    :param identity: who the requests are made as, e.g. the HTTP username.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: float = 600,
+        max_size: int = 1024**3,
+        identity: str | None = None,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.identity = identity
+
+    def get(self, endpoint: str, query: str, accept: str) -> CachedResponse | None:
+        """the cached response to a request, or None if there is not one"""
+        key = self.key(endpoint, query, accept)
+        entry = self.path / f"{key}.response"
+        try:
+            meta_bytes, body = entry.read_bytes().split(b"\n", 1)
+            meta = json.loads(meta_bytes)
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(entry)
+        response = httpx.Response(
+            status_code=200,
+            headers=meta["headers"],
+            content=body,
+            request=httpx.Request("POST", endpoint),
+        )
+        validators = {}
+        if "etag" in response.headers:
+            validators["If-None-Match"] = response.headers["etag"]
+        if "last-modified" in response.headers:
+            validators["If-Modified-Since"] = response.headers["last-modified"]
+        fresh = time.time() - meta["stored"] < self.ttl
+        if fresh:
+            logger.info("using cached SPARQL response")
+        return CachedResponse(key, response, fresh, validators)
+
+    def put(self, key: str, response: httpx.Response):
+        """store a successful response"""
+        headers = {
+            name: response.headers[name]
+            for name in ("content-type", "etag", "last-modified")
+            if name in response.headers
+        }
+        meta = json.dumps({"stored": time.time(), "headers": headers}).encode()
+        entry = self.path / f"{key}.response"
+        ParseCache._write(entry, meta + b"\n" + response.content)
+        evict(self.path, max_size=self.max_size)
+
+    def refresh(self, cached: CachedResponse):
+        """mark a cached response as fresh after the endpoint revalidated it"""
+        logger.info("cached SPARQL response revalidated by the endpoint")
+        self.put(cached.key, cached.response)
+
+    def key(self, endpoint: str, query: str, accept: str) -> str:
+        """the cache key of a request"""
+        return hashlib.sha256(
+            json.dumps([endpoint, query, accept, self.identity]).encode()
+        ).hexdigest()
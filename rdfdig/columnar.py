@@ -0,0 +1,167 @@
+"""A NumPy backend for class summaries.
+
+statements are dictionary encoded into integer columns and the type join
+and aggregation of rdfdig.summarizers.ClassSummary are done with sorts and
+searches over whole columns instead of one statement at a time. the
+result is the same ClassSummary, so the same nodes and edges.
+
+numpy is an optional dependency, install it with pip install rdfdig[numpy].
+"""
+
+from array import array
+from itertools import chain
+from typing import Iterable
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.namespace import RDF, XSD
+from rdflib.term import Node as Term
+
+from rdfdig.summarizers import BNODE_KLASS, ClassSummary
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# the ids of None, which stands for an untyped resource, of BNODE_KLASS and of rdf:type
+NONE_ID, BNODE_ID, TYPE_ID = 0, 1, 2
+
+
+class Columns:
+    """Statements dictionary encoded into integer columns.
+
+    the objects of statements with a literal object, other than rdf:type
+    statements, are encoded as the id of the literal's datatype, as only
+    the datatype is shown in a class diagram. so the dictionary holds the
+    resources and datatypes rather than every distinct literal.
+    """
+
+    def __init__(self, triples: Iterable[tuple[Term, URIRef, Term]]):
+        ids: dict[Term | None, int] = {None: NONE_ID, BNODE_KLASS: BNODE_ID}
+        ids[RDF.type] = TYPE_ID
+        encode = ids.setdefault
+        subjects, predicates, objects = array("q"), array("q"), array("q")
+        literal = bytearray()
+        for subj, pred, obj in triples:
+            subjects.append(encode(subj, len(ids)))
+            pred_id = encode(pred, len(ids))
+            predicates.append(pred_id)
+            if pred_id != TYPE_ID and isinstance(obj, Literal):
+                obj = obj.datatype or XSD.string
+                literal.append(True)
+            else:
+                literal.append(False)
+            objects.append(encode(obj, len(ids)))
+        self.subjects = np.frombuffer(subjects, dtype=np.int64)
+        self.predicates = np.frombuffer(predicates, dtype=np.int64)
+        self.objects = np.frombuffer(objects, dtype=np.int64)
+        self.literal = np.frombuffer(literal, dtype=np.bool_)
+        self.isblank = np.array([isinstance(t, BNode) for t in ids], dtype=np.bool_)
+        self.terms: list[Term | None] = list(ids)
+
+
+def _join(keys, sorted_keys, values):
+    """for each of keys every value whose key in sorted_keys is equal to it
+
+    :returns: the positions in keys and the values, one row per match.
+    """
+    start = np.searchsorted(sorted_keys, keys, side="left")
+    counts = np.searchsorted(sorted_keys, keys, side="right") - start
+    rows = np.repeat(np.arange(len(keys)), counts)
+    # the offset of each match from the start of its run of equal keys
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return rows, values[np.repeat(start, counts) + offsets]
+
+
+def _unique_rows(columns: list, size: int):
+    """the distinct rows of equal length id columns, as a two dimensional array
+
+    :param size: the number of ids. rows are packed into one integer each
+        to be sorted when the ids are small enough, which is much faster.
+    """
+    rows = np.stack(columns, axis=1)
+    bits = max(size - 1, 1).bit_length()
+    if bits * len(columns) > 63:
+        return np.unique(rows, axis=0)
+    keys = np.zeros(len(rows), dtype=np.int64)
+    for column in columns:
+        keys = keys << bits | column
+    keys = np.unique(keys)
+    mask = (1 << bits) - 1
+    shifts = range(bits * (len(columns) - 1), -1, -bits)
+    return np.stack([keys >> shift & mask for shift in shifts], axis=1)
+
+
+def summarize_columns(columns: Columns) -> ClassSummary:
+    """summarize encoded statements as ClassSummary.add would, column at a time"""
+    subjects, predicates = columns.subjects, columns.predicates
+    objects = columns.objects
+    size = len(columns.terms)
+    is_type = predicates == TYPE_ID
+    # the distinct (resource, type) pairs, sorted by resource for the joins
+    pairs = _unique_rows([subjects[is_type], objects[is_type]], size)
+    typed, types = pairs[:, 0], pairs[:, 1]
+    # the first type of each resource is the object of its first rdf:type statement
+    first_type = np.full(size, -1, dtype=np.int64)
+    resources, first = np.unique(subjects[is_type], return_index=True)
+    first_type[resources] = objects[is_type][first]
+
+    def klass_of(term_ids):
+        """the class a resource is shown as when it is not the focus of a statement"""
+        klass = first_type[term_ids]
+        untyped = klass < 0
+        klass[untyped] = np.where(columns.isblank[term_ids[untyped]], BNODE_ID, NONE_ID)
+        return klass
+
+    # outgoing connection from each class of the subject
+    rows, from_klass = _join(subjects[~is_type], typed, types)
+    out_objects = objects[~is_type][rows]
+    out_literal = columns.literal[~is_type][rows]
+    to_klass = out_objects.copy()
+    to_klass[~out_literal] = klass_of(out_objects[~out_literal])
+    outgoing = [from_klass, predicates[~is_type][rows], to_klass]
+    # incoming connection to each class of the object
+    rows, to_klass = _join(objects[~columns.literal], typed, types)
+    from_klass = klass_of(subjects[~columns.literal][rows])
+    incoming = [from_klass, predicates[~columns.literal][rows], to_klass]
+
+    connections = _unique_rows(
+        [np.concatenate(pair) for pair in zip(outgoing, incoming)], size
+    )
+    terms = columns.terms
+    summary = ClassSummary()
+    summary.klasses = {terms[i] for i in np.unique(objects[is_type])}
+    summary.datatypes = {terms[i] for i in np.unique(out_objects[out_literal])}
+    summary.connections = {
+        (terms[f], terms[p], terms[t]) for f, p, t in connections.tolist()
+    }
+    summary.blank = bool((connections[:, [0, 2]] == BNODE_ID).any())
+    return summary
+
+
+def summarize_columnar(triples: Iterable[tuple[Term, URIRef, Term]]) -> ClassSummary:
+    """summarize triples to class level connections with numpy
+
+    :raises ImportError: if numpy is not installed.
+    """
+    if np is None:
+        raise ImportError(
+            "the numpy backend needs numpy, install it with pip install rdfdig[numpy]"
+        )
+    return summarize_columns(Columns(triples))
+
+
+def graph_triples(graph: Graph) -> Iterable[tuple[Term, URIRef, Term]]:
+    """the triples of graph, with the rdf:type statements of each resource first
+
+    a store yields all of its triples in no particular order, so the types of
+    each resource are yielded in the order graph.objects() gives them, as
+    rdfdig.summarizers.build_type_index does.
+    """
+    return chain(
+        chain.from_iterable(
+            graph.triples((subj, RDF.type, None))
+            for subj in graph.subjects(RDF.type, unique=True)
+        ),
+        (triple for triple in graph if triple[1] != RDF.type),
+    )
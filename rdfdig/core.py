@@ -1,29 +1,44 @@
+import asyncio
 import json
+import logging
+from collections import deque
+from concurrent.futures import Executor
+from functools import partial
 from pathlib import Path
-from typing import NamedTuple
+from typing import Iterable, Iterator
 from urllib.parse import urlparse
 
 from rdflib import BNode, Graph, Literal, URIRef
-from rdflib.namespace import RDF, XSD
-
-from rdfdig.loaders import load_dir, load_file, load_sparql
+from rdflib.term import Identifier
+
+from rdfdig.cache import ParseCache, ResponseCache
+from rdfdig.labels import Labeller
+from rdfdig.layout import ITERATIONS
+from rdfdig.loaders import (
+    aload_sparql,
+    find_line_files,
+    load_dir,
+    load_file,
+    load_sparql,
+    sparql_password,
+)
+from rdfdig.reduction import Thresholds, reduce_diagram
 from rdfdig.renderers import render_mermaid, render_visjs
+from rdfdig.store import open_store
+from rdfdig.summarizers import (
+    BNODE_KLASS,
+    ClassSummary,
+    Support,
+    asummarize_sparql,
+    summarize_files,
+    summarize_graph,
+    summarize_sparql,
+)
+from rdfdig.terms import Edge, EdgeTable, Node, NodeTable, TermIds
 from rdfdig.utils import expand_uri
+from rdfdig.writers import HTML_FORMATS, format_chunks, write_chunks
 
-BNODE_KLASS = URIRef("bnode")
-
-
-class Node(NamedTuple):
-    id: int
-    label: str
-    isliteral: bool = False
-    isblank: bool = False
-
-
-class Edge(NamedTuple):
-    from_id: int
-    to_id: int
-    label: str
+logger = logging.getLogger(__name__)
 
 
 class Diagram:
@@ -43,17 +58,35 @@ class Diagram:
         This is a more typical display of RDF data, focused around a given node,
         this method will show all direct incoming and outgoing statements about
         that resource. Blank nodes will be recursively evaluated such that indirect
-        blank node statements are not orphaned.
+        blank node statements are not orphaned. Further nodes can be added
+        afterwards with the expand() method.
 
     For more details about each method refer to their respective _parse_*() method.
+
+    Node ids come from a rdfdig.terms.TermIds dictionary. they are dense and
+    only meaningful within the diagram, or with deterministic_ids derived
+    from the content of each term, so the same in every run.
     """
 
-    def __init__(self):
-        self.nodes: set[Node] = set()
-        self.edges: set[Edge] = set()
+    def __init__(self, deterministic_ids: bool = False):
+        self.nodes = NodeTable()
+        self.edges = EdgeTable()
         self.serialization: dict = {}
         self.overrides: dict = {}
+        # how visjs diagrams are laid out, see rdfdig.layout.layout
+        self.layout = "auto"
+        self.layout_iterations = ITERATIONS
+        # when and how far diagrams are reduced to be rendered
+        self.thresholds = Thresholds()
         self._store: Graph = Graph()
+        self._ids = TermIds(deterministic=deterministic_ids)
+        # arguments for load_sparql when the source is a SPARQL endpoint, so
+        # the neighbourhood of a resource can be fetched when it is expanded
+        self._sparql: dict | None = None
+        self._fetched: set[Identifier] = set()
+        self._labels: Labeller | None = None
+        # the support of each edge of a sampled class diagram
+        self.support: dict[Edge, Support] = {}
 
     def parse(
         self,
@@ -66,6 +99,23 @@ class Diagram:
         offset: int = 0,
         cutoff: int = 10000,
         timeout: int = 5,
+        stream: bool = False,
+        jobs: int = 1,
+        aggregate: bool = False,
+        concurrency: int = 4,
+        retries: int = 3,
+        checkpoint_dir: Path | None = None,
+        cache_dir: Path | None = None,
+        cache_size: int = 1024**3,
+        http_cache_dir: Path | None = None,
+        http_cache_ttl: float = 600,
+        depth: int = 1,
+        max_nodes: int | None = None,
+        max_edges: int | None = None,
+        backend: str = "python",
+        store_path: Path | None = None,
+        sample: int | None = None,
+        load_only: bool = False,
     ):
         """load data from the specified source and reduce it to nodes and edges.
 
@@ -74,51 +124,441 @@ class Diagram:
         :param graph: URI like. restrict the diagram to the specifed graph.
         :param username: username for HTTP basic authentication if required.
         :param password: password. if left blank then the user will be prompted.
-        :param limit: SPARQL limit.
+        :param limit: SPARQL limit. the initial page size, which then adapts to the endpoint.
         :param offset: SPARQL offset.
         :param cutoff: cutoff for SPARQL queries. Only retrieve this many triples.
         :param timeout: HTTP timeout (in seconds) for SPARQL queries.
+        :param stream: summarize N-Triples or N-Quads sources one statement at a
+            time instead of loading them into memory. only for class diagrams.
+        :param jobs: number of processes used to parse the files in folder
+            sources, or to summarize streamed sources.
+        :param aggregate: summarize SPARQL endpoints for class diagrams with
+            aggregate queries run by the endpoint instead of fetching triples.
+        :param concurrency: number of SPARQL pages to fetch at once.
+        :param retries: number of times to retry transient SPARQL failures.
+        :param checkpoint_dir: save the progress of SPARQL fetches here so
+            that an interrupted fetch can be resumed by calling parse again.
+        :param cache_dir: keep parsed files in a cache in this folder, so
+            unchanged files are not parsed again. see rdfdig.cache.ParseCache.
+        :param cache_size: the maximum size of each cache in bytes.
+        :param http_cache_dir: keep SPARQL responses in a cache in this folder.
+            see rdfdig.cache.ResponseCache.
+        :param http_cache_ttl: seconds a cached SPARQL response is used for
+            before it is revalidated with the endpoint.
+        :param depth: for instance diagrams, the number of hops from iri to expand.
+        :param max_nodes: for instance diagrams, stop expanding at this many nodes.
+        :param max_edges: for instance diagrams, stop expanding at this many edges.
+        :param backend: the implementation of class diagrams, "python" or
+            "numpy". see rdfdig.columnar, numpy must be installed to use it.
+        :param store_path: keep the loaded statements in a SQLite database at
+            this path instead of in memory, see rdfdig.store. the database
+            is emptied before the sources are loaded into it, and parsing
+            with no sources reopens the data loaded before. not for streams.
+        :param sample: for class diagrams, look at no more than this many
+            instances of each class. each edge is then serialized with its
+            estimated support and whether it is exhaustive. not for streams.
+        :param load_only: load the files, and remember the SPARQL endpoints
+            to fetch statements from, without making a diagram. for making
+            many instance diagrams with focus(). not for streams.
         """
 
-        self._store = Graph()
-        sparql_endpoints = 0
-        for source in sources:
-            if not isinstance(source, Path) and urlparse(source).netloc:
-                if sparql_endpoints > 0:
-                    raise ValueError(
-                        "Loading from multiple SPARQL endpoints is not supported"
-                    )
-                graph = load_sparql(
-                    endpoint=source,
-                    iri=iri,
+        if stream and sample is not None:
+            raise ValueError("Sampling is not supported when streaming")
+        if stream and load_only:
+            raise ValueError("Streamed sources cannot be loaded without a diagram")
+        if stream and store_path is not None:
+            raise ValueError("Streamed sources cannot be kept in a store")
+        self._reset(store_path, clear=bool(sources))
+        summaries: list[ClassSummary] = []
+        if stream:
+            self._parse_stream(
+                sources, iri=iri, graph=graph, jobs=jobs, backend=backend
+            )
+            return
+        cache, http_cache = self._caches(
+            cache_dir, cache_size, http_cache_dir, http_cache_ttl, username
+        )
+        for source, is_endpoint in self._classify_sources(sources):
+            if is_endpoint:
+                self._remember_sparql(
+                    source,
                     graph=graph,
                     username=username,
-                    password=password,
+                    password=sparql_password(username, password),
                     limit=limit,
-                    offset=offset,
                     cutoff=cutoff,
                     timeout=timeout,
+                    concurrency=concurrency,
+                    retries=retries,
+                    cache=http_cache,
+                    iri=iri,
+                )
+                if load_only:
+                    # statements are fetched as they are needed, see focus()
+                    continue
+                if aggregate and not iri:
+                    summary = summarize_sparql(**self._summary_kwargs(), sample=sample)
+                    summaries.append(summary)
+                    continue
+                load_sparql(
+                    iri=iri,
+                    offset=offset,
+                    checkpoint_dir=checkpoint_dir,
+                    into=self._store,
+                    **self._sparql,
                 )
-                sparql_endpoints += 1
-            elif Path(source).is_dir():
-                graph = load_dir(Path(source))
-            elif Path(source).is_file():
-                graph = load_file(Path(source))
             else:
-                raise FileNotFoundError("Could not find source data at: {source}")
+                self._load_path(source, jobs=jobs, cache=cache)
+        if load_only:
+            # write out statements a disk store is still holding
+            self._store.commit()
+            return
+        self._finish(iri, summaries, depth, max_nodes, max_edges, backend, sample)
+
+    async def aparse(
+        self,
+        sources: list[str | Path],
+        iri: str | None = None,
+        graph: str | None = None,
+        username: str | None = None,
+        password: str | None = None,
+        limit: int = 1000,
+        offset: int = 0,
+        cutoff: int = 10000,
+        timeout: int = 5,
+        stream: bool = False,
+        jobs: int = 1,
+        aggregate: bool = False,
+        concurrency: int = 4,
+        retries: int = 3,
+        checkpoint_dir: Path | None = None,
+        cache_dir: Path | None = None,
+        cache_size: int = 1024**3,
+        http_cache_dir: Path | None = None,
+        http_cache_ttl: float = 600,
+        depth: int = 1,
+        max_nodes: int | None = None,
+        max_edges: int | None = None,
+        backend: str = "python",
+        store_path: Path | None = None,
+        sample: int | None = None,
+        load_only: bool = False,
+        executor: Executor | None = None,
+    ):
+        """load data from the specified sources without blocking the event loop.
+
+        the asynchronous counterpart of parse(), which takes the same parameters.
+        SPARQL endpoints are fetched with an httpx.AsyncClient on the running
+        loop and files are parsed, and the diagram built, in executor. the
+        user is never prompted for a password.
+
+        aparse can be cancelled, or given a deadline with asyncio.wait_for.
+        requests in flight are cancelled straight away. work already started
+        in the executor cannot be interrupted, it finishes in the background
+        and its result is discarded. the diagram is only changed once aparse
+        has completed, so a cancelled aparse leaves it as it was. a
+        store_path database is emptied before the sources are loaded into it
+        though, and is left with what was added before it was cancelled.
+
+        :param executor: the executor for parsing and summarizing. the loop's
+            default thread pool if None.
+        :raises ValueError: if a username is given without a password.
+        """
+        if username and not password:
+            raise ValueError("a password is required with a username")
+        if stream and load_only:
+            raise ValueError("Streamed sources cannot be loaded without a diagram")
+        if stream and store_path is not None:
+            raise ValueError("Streamed sources cannot be kept in a store")
+        loop = asyncio.get_running_loop()
+
+        def run(func, *args, **kwargs):
+            return loop.run_in_executor(executor, partial(func, *args, **kwargs))
+
+        staged = Diagram()
+        staged._reset(store_path, clear=bool(sources))
+        staged.overrides = self.overrides
+        staged.layout = self.layout
+        staged.layout_iterations = self.layout_iterations
+        staged.thresholds = self.thresholds
+        staged.nodes, staged.edges = self.nodes.copy(), self.edges.copy()
+        staged.support = dict(self.support)
+        staged._ids = self._ids
+        summaries: list[ClassSummary] = []
+        if stream:
+            await run(
+                staged._parse_stream,
+                sources,
+                iri=iri,
+                graph=graph,
+                jobs=jobs,
+                backend=backend,
+            )
+        else:
+            cache, http_cache = self._caches(
+                cache_dir, cache_size, http_cache_dir, http_cache_ttl, username
+            )
+            for source, is_endpoint in self._classify_sources(sources):
+                if is_endpoint:
+                    staged._remember_sparql(
+                        source,
+                        graph=graph,
+                        username=username,
+                        password=password,
+                        limit=limit,
+                        cutoff=cutoff,
+                        timeout=timeout,
+                        concurrency=concurrency,
+                        retries=retries,
+                        cache=http_cache,
+                        iri=iri,
+                    )
+                    if load_only:
+                        # statements are fetched as they are needed, see focus()
+                        continue
+                    if aggregate and not iri:
+                        summary = await asummarize_sparql(
+                            **staged._summary_kwargs(), sample=sample
+                        )
+                        summaries.append(summary)
+                        continue
+                    await aload_sparql(
+                        iri=iri,
+                        offset=offset,
+                        checkpoint_dir=checkpoint_dir,
+                        into=staged._store,
+                        **staged._sparql,
+                    )
+                else:
+                    await run(staged._load_path, source, jobs=jobs, cache=cache)
+            if load_only:
+                # write out statements a disk store is still holding
+                await run(staged._store.commit)
+            else:
+                await run(
+                    staged._finish,
+                    iri,
+                    summaries,
+                    depth,
+                    max_nodes,
+                    max_edges,
+                    backend,
+                    sample,
+                )
+        previous = self._store
+        self.__dict__.update(staged.__dict__)
+        if previous is not self._store:
+            previous.close()
+
+    def close(self):
+        """close the store the parsed data is kept in, see rdfdig.store"""
+        self._store.close()
 
-            self._store += graph
-            [
-                self._store.namespace_manager.bind(prefix=prefix, namespace=namespace)
-                for prefix, namespace in graph.namespace_manager.namespaces()
-            ]
+    def _reset(self, store_path: Path | None = None, clear: bool = False):
+        """forget any previously parsed data, closing the store it was kept in
 
+        :param store_path: open the store in a SQLite database at this path.
+        :param clear: remove the statements already in the database.
+        """
+        self.close()
+        if store_path is None:
+            self._store = Graph()
+        else:
+            self._store = open_store(store_path, clear=clear)
+        self._sparql = None
+        self._fetched = set()
+
+    @staticmethod
+    def _caches(
+        cache_dir: Path | None,
+        cache_size: int,
+        http_cache_dir: Path | None,
+        http_cache_ttl: float,
+        username: str | None,
+    ) -> tuple[ParseCache | None, ResponseCache | None]:
+        """the parse and response caches to use, if any"""
+        cache = ParseCache(cache_dir, max_size=cache_size) if cache_dir else None
+        http_cache = None
+        if http_cache_dir:
+            http_cache = ResponseCache(
+                http_cache_dir,
+                ttl=http_cache_ttl,
+                max_size=cache_size,
+                identity=username,
+            )
+        return cache, http_cache
+
+    @staticmethod
+    def _classify_sources(sources: list[str | Path]) -> list[tuple[str | Path, bool]]:
+        """pair each source with True if it is a SPARQL endpoint
+
+        :raises ValueError: if there is more than one SPARQL endpoint.
+        """
+        classified = [
+            (source, not isinstance(source, Path) and bool(urlparse(source).netloc))
+            for source in sources
+        ]
+        if sum(is_endpoint for _, is_endpoint in classified) > 1:
+            raise ValueError("Loading from multiple SPARQL endpoints is not supported")
+        return classified
+
+    def _remember_sparql(self, endpoint: str, iri: str | None, **kwargs):
+        """keep the arguments for load_sparql, see _fetch_neighbourhood"""
+        self._sparql = dict(endpoint=endpoint, **kwargs)
         if iri:
-            self._parse_instances(expand_uri(iri, self._store.namespace_manager))
+            self._fetched.add(URIRef(iri))
+
+    def _summary_kwargs(self) -> dict:
+        """the arguments for summarize_sparql from the remembered SPARQL source"""
+        return {
+            key: self._sparql[key]
+            for key in (
+                "endpoint",
+                "graph",
+                "username",
+                "password",
+                "timeout",
+                "cache",
+                "retries",
+                "concurrency",
+            )
+        }
+
+    def _load_path(self, source: str | Path, jobs: int, cache: ParseCache | None):
+        """load a file, or every file in a folder, straight into the store"""
+        if Path(source).is_dir():
+            load_dir(Path(source), graph=self._store, jobs=jobs, cache=cache)
+        elif Path(source).is_file():
+            load_file(Path(source), cache=cache, graph=self._store)
         else:
-            self._parse_classes()
+            raise FileNotFoundError(f"Could not find source data at: {source}")
 
-    def _parse_classes(self):
+    def _finish(
+        self,
+        iri: str | None,
+        summaries: list[ClassSummary],
+        depth: int,
+        max_nodes: int | None,
+        max_edges: int | None,
+        backend: str = "python",
+        sample: int | None = None,
+    ):
+        """reduce the loaded data to nodes and edges"""
+        # write out statements a disk store is still holding, see rdfdig.store
+        self._store.commit()
+        if iri:
+            self._parse_instances(
+                expand_uri(iri, self._store.namespace_manager),
+                depth=depth,
+                max_nodes=max_nodes,
+                max_edges=max_edges,
+            )
+        else:
+            self._parse_classes(backend, sample)
+            for summary in summaries:
+                self._add_summary(summary)
+
+    def focus(
+        self,
+        iri: str,
+        depth: int = 1,
+        max_nodes: int | None = None,
+        max_edges: int | None = None,
+    ) -> "Diagram":
+        """a new instance diagram of iri from the data loaded by this diagram
+
+        the store is shared rather than copied, so any number of instance
+        diagrams can be made from one parse(). for a SPARQL source the
+        statements fetched for the new diagram are kept for later ones.
+        see _parse_instances for the parameters.
+        """
+        diagram = Diagram()
+        diagram.overrides = self.overrides
+        diagram.layout = self.layout
+        diagram.layout_iterations = self.layout_iterations
+        diagram.thresholds = self.thresholds
+        diagram._ids = self._ids
+        diagram._store = self._store
+        diagram._sparql = self._sparql
+        diagram._fetched = self._fetched
+        diagram._labels = self._labeller()
+        diagram._parse_instances(
+            expand_uri(iri, self._store.namespace_manager),
+            depth=depth,
+            max_nodes=max_nodes,
+            max_edges=max_edges,
+        )
+        return diagram
+
+    def _labeller(self) -> Labeller:
+        """the memoized labeller of the store's terms"""
+        if (
+            self._labels is None
+            or self._labels.namespace_manager is not self._store.namespace_manager
+        ):
+            self._labels = Labeller(self._store.namespace_manager)
+        return self._labels
+
+    def _fetch_neighbourhood(self, term: Identifier):
+        """load the statements about term from the SPARQL source, once"""
+        if self._sparql is None or not isinstance(term, URIRef):
+            return
+        if term in self._fetched:
+            return
+        self._fetched.add(term)
+        load_sparql(iri=term, into=self._store, **self._sparql)
+        if self._labels is not None:
+            self._labels.refresh()
+
+    def expand(self, node_id: int, depth: int = 1) -> dict:
+        """add the neighbourhood of an instance node to the diagram
+
+        the statements come from the loaded store, or for a SPARQL source are
+        fetched from the endpoint the first time a resource is expanded.
+
+        :param node_id: the id of a node added by an instance diagram.
+        :param depth: number of hops from the node to expand.
+        :returns: the nodes and edges that were not already in the diagram,
+            in the form returned by serialize().
+        :raises KeyError: if there is no instance node with node_id.
+        """
+        term = self._ids.term(node_id)
+        if node_id not in self.nodes or isinstance(term, Literal):
+            raise KeyError(node_id)
+        new_nodes, new_edges = self._parse_instances(term, depth=depth)
+        return {
+            "nodes": list(self._serialize_nodes(new_nodes)),
+            "edges": list(self._serialize_edges(new_edges)),
+        }
+
+    def _parse_stream(
+        self,
+        sources: list[str | Path],
+        iri: str | None,
+        graph: str | None,
+        jobs: int = 1,
+        backend: str = "python",
+    ):
+        """parse class nodes and edges from line oriented files without loading them.
+
+        gives the same nodes and edges as _parse_classes() but memory use is
+        bounded by the number of typed resources rather than the size of the data.
+        with more than one job the files are split into shards and summarized
+        in parallel. see rdfdig.summarizers.summarize_files for details.
+        """
+        if iri:
+            raise ValueError("Streaming is only supported for class diagrams")
+        paths = []
+        for source in sources:
+            if not isinstance(source, Path) and urlparse(source).netloc:
+                raise ValueError("Streaming from a SPARQL endpoint is not supported")
+            if not Path(source).exists():
+                raise FileNotFoundError(f"Could not find source data at: {source}")
+            paths += find_line_files(Path(source))
+        summary = summarize_files(paths, graph=graph, jobs=jobs, backend=backend)
+        self._add_summary(summary)
+
+    def _parse_classes(self, backend: str = "python", sample: int | None = None):
         """parse class nodes and edges from the loaded RDF.
 
         only cares about classes (i.e., declarations of rdf:type).
@@ -142,70 +582,44 @@ class Diagram:
         The above information is very useful when constructing SPARQL
         queries or just generally trying to inspect the form of an
         RDF model.
-        """
-        klasses = self._store.objects(None, RDF.type, unique=True)
-        for klass in klasses:
-            klass_id = hash(klass)
-            klass_label = klass.n3(self._store.namespace_manager)
-            self.nodes.add(Node(id=klass_id, label=klass_label))
-            instances = self._store.subjects(RDF.type, klass, unique=True)
-            for instance in instances:
-                # get outgoing connections
-                pred_obs = self._store.predicate_objects(instance, unique=True)
-                for pred, obj in pred_obs:
-                    if pred == RDF.type:
-                        continue
-                    isliteral = False
-                    isblank = False
-                    obj_klass = self._store.value(obj, RDF.type, None)
-                    if isinstance(obj, Literal):
-                        isliteral = True
-                        obj_klass = obj.datatype if obj.datatype else XSD.string
-                    elif isinstance(obj, BNode):
-                        if not obj_klass:
-                            obj_klass = BNODE_KLASS
-                            isblank = True
-                    obj_id = hash(obj_klass)
-                    if isblank or isliteral:
-                        obj_label = obj_klass.n3(self._store.namespace_manager)
-                        self.nodes.add(
-                            Node(
-                                id=obj_id,
-                                label=obj_label,
-                                isliteral=isliteral,
-                                isblank=isblank,
-                            )
-                        )
-                    pred_label = pred.n3(self._store.namespace_manager)
-                    self.edges.add(
-                        Edge(from_id=klass_id, to_id=obj_id, label=pred_label)
-                    )
-                # get incoming connections
-                subj_preds = self._store.subject_predicates(instance, unique=True)
-                for subj, pred in subj_preds:
-                    isblank = False
-                    subj_klass = self._store.value(subj, RDF.type, None)
-                    if isinstance(subj, BNode):
-                        if not subj_klass:
-                            subj_klass = BNODE_KLASS
-                            isblank = True
-                    subj_id = hash(subj_klass)
-                    if isblank:
-                        subj_label = subj_klass.n3(self._store.namespace_manager)
-                        self.nodes.add(
-                            Node(id=subj_id, label=subj_label, isblank=isblank)
-                        )
-                    pred_label = pred.n3(self._store.namespace_manager)
-                    self.edges.add(
-                        Edge(from_id=subj_id, to_id=klass_id, label=pred_label)
-                    )
 
-    def _parse_instances(self, iri: URIRef):
+        A type index of every typed resource is built first so that the
+        statements only need to be visited once, see rdfdig.summarizers.
+        with the numpy backend the statements are encoded into integer
+        columns and summarized with numpy instead, see rdfdig.columnar.
+        with a sample only the statements about that many instances of
+        each class are visited, see rdfdig.summarizers.summarize_sample.
+        """
+        summary = summarize_graph(self._store, backend=backend, sample=sample)
+        self._add_summary(summary)
+
+    def _add_summary(self, summary: ClassSummary):
+        """label the classes and connections of summary and add them as nodes and edges"""
+        label = self._labeller()
+        ids = self._ids
+        for klass in summary.klasses:
+            self.nodes.add(ids[klass], label(klass))
+        for datatype in summary.datatypes:
+            self.nodes.add(ids[datatype], label(datatype), isliteral=True)
+        if summary.blank:
+            self.nodes.add(ids[BNODE_KLASS], label(BNODE_KLASS), isblank=True)
+        for from_klass, pred, to_klass in summary.connections:
+            self.edges.add(ids[from_klass], ids[to_klass], label(pred))
+        for (from_klass, pred, to_klass), support in summary.support.items():
+            self.support[Edge(ids[from_klass], ids[to_klass], label(pred))] = support
+
+    def _parse_instances(
+        self,
+        iri: URIRef,
+        depth: int = 1,
+        max_nodes: int | None = None,
+        max_edges: int | None = None,
+    ) -> tuple[list[Node], list[Edge]]:
         """parse instance nodes and edges from the loaded RDF.
 
         for a given resource idntifier (iri) parses the direct incoming
-        and outgoing statements. recursively evaluating blank nodes so that
-        statements about blank nodes are not orphaned.
+        and outgoing statements. blank node objects are always expanded so
+        that statements about blank nodes are not orphaned.
 
         for example, with <uluru> as the given iri
         the following statements
@@ -227,37 +641,82 @@ class Diagram:
             _:1230409549305 -- a -- > geo:Geometry
             _:1230409549305 -- geo:asWKT --> "POINT(-25.20426 131.02110)"^^geo:wktLiteral
 
+        resources are expanded breadth first, each at most once, so cyclic
+        or deeply nested data costs time linear in the statements visited.
+        with a SPARQL source the statements about each named resource are
+        fetched from the endpoint before it is expanded.
+
+        :param depth: number of hops through named resources to expand. with
+            a depth of 1 only the statements about iri (and its blank nodes)
+            are shown, with 2 the statements about its neighbours as well.
+        :param max_nodes: stop expanding once this many nodes are shown.
+        :param max_edges: stop expanding once this many edges are shown.
+        :returns: the nodes and edges that were not already in the diagram.
         """
-        iri_id = hash(iri)
-        iri_label = iri.n3(self._store.namespace_manager)
-        isblank = isinstance(iri, BNode)
-        self.nodes.add(Node(id=iri_id, label=iri_label, isblank=isblank))
-        # outgoing relations
-        pred_obs = self._store.predicate_objects(iri)
-        for pred, obj in pred_obs:
-            obj_id = hash(obj)
-            obj_label = obj.n3(self._store.namespace_manager)
-            isliteral = isinstance(obj, Literal)
-            isblank = isinstance(obj, BNode)
-            self.nodes.add(
-                Node(id=obj_id, label=obj_label, isliteral=isliteral, isblank=isblank)
-            )
-            pred_label = pred.n3(self._store.namespace_manager)
-            self.edges.add(Edge(from_id=iri_id, to_id=obj_id, label=pred_label))
-            if isblank:
-                self._parse_instances(iri=obj)
-        # incoming relations
-        subj_preds = self._store.subject_predicates(iri)
-        for subj, pred in subj_preds:
-            subj_id = hash(subj)
-            subj_label = subj.n3(self._store.namespace_manager)
-            isliteral = isinstance(subj, Literal)
-            isblank = isinstance(subj, BNode)
-            self.nodes.add(
-                Node(id=subj_id, label=subj_label, isliteral=isliteral, isblank=isblank)
+        label = self._labeller()
+        new_nodes: list[Node] = []
+        new_edges: list[Edge] = []
+
+        def add_node(term) -> int:
+            term_id = self._ids[term]
+            if term_id not in self.nodes:
+                node = Node(
+                    id=term_id,
+                    label=label(term),
+                    isliteral=isinstance(term, Literal),
+                    isblank=isinstance(term, BNode),
+                )
+                self.nodes.add(*node)
+                new_nodes.append(node)
+            return term_id
+
+        def add_edge(edge: Edge):
+            if self.edges.add(*edge):
+                new_edges.append(edge)
+
+        def over_budget() -> bool:
+            return (max_nodes is not None and len(self.nodes) >= max_nodes) or (
+                max_edges is not None and len(self.edges) >= max_edges
             )
-            pred_label = pred.n3(self._store.namespace_manager)
-            self.edges.add(Edge(from_id=subj_id, to_id=iri_id, label=pred_label))
+
+        add_node(iri)
+        # (resource, hops taken to reach it). following a blank node object is not a hop
+        queue: deque[tuple[Identifier, int]] = deque([(iri, 0)])
+        visited = {iri}
+
+        def enqueue(term, hops: int):
+            if term not in visited and hops < depth:
+                visited.add(term)
+                queue.append((term, hops))
+
+        while queue:
+            term, hops = queue.popleft()
+            self._fetch_neighbourhood(term)
+            term_id = self._ids[term]
+            # outgoing relations
+            for pred, obj in self._store.predicate_objects(term):
+                if over_budget():
+                    break
+                obj_id = add_node(obj)
+                add_edge(Edge(from_id=term_id, to_id=obj_id, label=label(pred)))
+                if isinstance(obj, BNode):
+                    enqueue(obj, hops)
+                elif not isinstance(obj, Literal):
+                    enqueue(obj, hops + 1)
+            # incoming relations
+            for subj, pred in self._store.subject_predicates(term):
+                if over_budget():
+                    break
+                subj_id = add_node(subj)
+                add_edge(Edge(from_id=subj_id, to_id=term_id, label=label(pred)))
+                enqueue(subj, hops + 1)
+            if over_budget():
+                logger.warning(
+                    f"stopped expanding {label(iri)} at {len(self.nodes):,} nodes and "
+                    f"{len(self.edges):,} edges, {len(queue):,} resources not expanded"
+                )
+                break
+        return new_nodes, new_edges
 
     def serialize(self) -> str:
         """serialize the parsed nodes and edges to JSON
@@ -276,20 +735,78 @@ class Diagram:
             where each node is a JSON serialization of a Node object and each edge is
             a serialization of an Edge object.
         """
-        self.serialization["nodes"] = [
-            {
+        self._update_serialization()
+        return json.dumps(self.serialization)
+
+    def _update_serialization(self):
+        """set self.serialization to the parsed nodes and edges"""
+        self.serialization["nodes"] = list(self._serialize_nodes(self.nodes.sorted()))
+        self.serialization["edges"] = list(
+            self._serialize_edges(self.edges.sorted(), self.support)
+        )
+
+    @staticmethod
+    def _serialize_nodes(nodes: Iterable[Node]) -> Iterator[dict]:
+        for node in nodes:
+            yield {
                 "id": node.id,
                 "label": node.label,
                 "isliteral": node.isliteral,
                 "isblank": node.isblank,
             }
-            for node in self.nodes
-        ]
-        self.serialization["edges"] = [
-            {"from": edge.from_id, "to": edge.to_id, "label": edge.label}
-            for edge in self.edges
-        ]
-        return json.dumps(self.serialization)
+
+    @staticmethod
+    def _serialize_edges(
+        edges: Iterable[Edge], support: dict[Edge, Support] | None = None
+    ) -> Iterator[dict]:
+        """serialize edges, with their support if it is known"""
+        for edge in edges:
+            item = {"from": edge.from_id, "to": edge.to_id, "label": edge.label}
+            if support and edge in support:
+                item["support"], item["exhaustive"] = support[edge]
+            yield item
+
+    def reduced(self) -> dict:
+        """the serialization, reduced if it is too large to render
+
+        see rdfdig.reduction.reduce_diagram, diagrams with more nodes than
+        self.thresholds.max_nodes are reduced.
+        """
+        if not self.serialization:
+            self._update_serialization()
+        return reduce_diagram(self.serialization, self.thresholds)
+
+    def chunks(self, format: str = "json") -> Iterator[str]:
+        """the diagram in format, a piece at a time
+
+        the html formats are reduced first, see reduced(). the others are
+        written in full, straight from the parsed nodes and edges, so that
+        they are never all serialized at once.
+
+        :param format: one of rdfdig.writers.WRITE_FORMATS.
+        :raises ValueError: if format is not one of WRITE_FORMATS.
+        """
+        if format in HTML_FORMATS:
+            serialization = self.reduced()
+        else:
+            serialization = {
+                "nodes": self._serialize_nodes(self.nodes.sorted()),
+                "edges": self._serialize_edges(self.edges.sorted(), self.support),
+            }
+        return format_chunks(
+            serialization, format, self.overrides, self.layout, self.layout_iterations
+        )
+
+    def write(
+        self, format: str = "json", path: Path | None = None, compress: bool = False
+    ):
+        """write the diagram to path, or to stdout, a piece at a time
+
+        see chunks() for the format.
+
+        :param compress: gzip what is written.
+        """
+        write_chunks(self.chunks(format), path, compress)
 
     def render(self, format: str):
         """render the parsed rdf as a diagram and display it.
@@ -302,11 +819,12 @@ class Diagram:
         :param format: The format to use when rendering. Available formats are
             visjs, ...
         """
-        if not self.serialization:
-            self.serialize()
+        serialization = self.reduced()
         if format == "visjs":
-            render_visjs(self.serialization, self.overrides)
+            render_visjs(
+                serialization, self.overrides, self.layout, self.layout_iterations
+            )
         elif format == "mermaid":
-            render_mermaid(self.serialization, self.overrides)
+            render_mermaid(serialization, self.overrides)
         else:
             raise NotImplementedError
@@ -0,0 +1,111 @@
+import re
+
+from rdflib import BNode, Literal, URIRef
+from rdflib.namespace import NamespaceManager
+from rdflib.term import Node as Term
+
+# local names that rdflib's split_uri always splits in front of, when they
+# follow a namespace ending in / or #. only these take the fast path.
+SIMPLE_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_-]*")
+
+# the width renderers truncate labels to
+LABEL_WIDTH = 45
+
+
+class PrefixTrie:
+    """A character trie of namespace IRIs, to find the bound namespace of an IRI
+
+    :param namespaces: (prefix, namespace) pairs, as given by a namespace manager.
+    """
+
+    def __init__(self, namespaces):
+        self.root: dict = {}
+        self.prefixes: set[str] = set()
+        for prefix, namespace in namespaces:
+            node = self.root
+            for char in str(namespace):
+                node = node.setdefault(char, {})
+            # the first binding of a namespace wins, as in the namespace manager
+            node.setdefault("", (prefix, str(namespace)))
+            self.prefixes.add(prefix)
+
+    def longest(self, iri: str) -> tuple[str, str] | None:
+        """the (prefix, namespace) of the longest namespace that iri starts with"""
+        node = self.root
+        match = None
+        for char in iri:
+            node = node.get(char)
+            if node is None:
+                break
+            match = node.get("", match)
+        return match
+
+
+class Labeller:
+    """Memoized n3 labels of terms, the same as term.n3(namespace_manager).
+
+    IRIs are looked up in a prefix trie of the namespace bindings first. an IRI
+    that is not in a bound namespace, or has a simple local name after a
+    namespace ending in / or #, is labelled without calling rdflib, which is
+    slow as it splits every IRI it is given. other IRIs fall back to rdflib.
+    IRI labels are kept for the life of the labeller. literal labels are kept
+    up to max_literals, after which the oldest are evicted.
+
+    :param namespace_manager: the namespace bindings to label with.
+    :param max_literals: the number of literal labels to keep.
+    """
+
+    def __init__(
+        self, namespace_manager: NamespaceManager, max_literals: int = 100_000
+    ):
+        self.namespace_manager = namespace_manager
+        self.max_literals = max_literals
+        self.iris: dict[URIRef, str] = {}
+        self.literals: dict[Literal, str] = {}
+        self._namespaces: list | None = None
+        self.refresh()
+
+    def refresh(self):
+        """rebuild the trie and forget the labels if the bindings have changed"""
+        namespaces = list(self.namespace_manager.namespaces())
+        if namespaces != self._namespaces:
+            self._namespaces = namespaces
+            self.trie = PrefixTrie(namespaces)
+            self.iris.clear()
+            self.literals.clear()
+
+    def __call__(self, term: Term) -> str:
+        if isinstance(term, URIRef):
+            label = self.iris.get(term)
+            if label is None:
+                label = self.iris[term] = self._iri_label(term)
+            return label
+        if isinstance(term, Literal):
+            label = self.literals.get(term)
+            if label is None:
+                if len(self.literals) >= self.max_literals:
+                    del self.literals[next(iter(self.literals))]
+                label = self.literals[term] = term.n3(self.namespace_manager)
+            return label
+        if isinstance(term, BNode):
+            return f"_:{term}"
+        return term.n3(self.namespace_manager)
+
+    def _iri_label(self, iri: URIRef) -> str:
+        match = self.trie.longest(iri)
+        if match is None:
+            return f"<{iri}>"
+        prefix, namespace = match
+        local = iri[len(namespace) :]
+        if namespace[-1] in "/#" and SIMPLE_NAME.fullmatch(local):
+            return f"{prefix}:{local}"
+        label = iri.n3(self.namespace_manager)
+        # rdflib binds a generated prefix when it cannot find one
+        if not label.startswith("<") and label.split(":")[0] not in self.trie.prefixes:
+            self.refresh()
+        return label
+
+
+def truncate(label: str, width: int = LABEL_WIDTH) -> str:
+    """shorten label to width characters followed by an ellipsis"""
+    return label if len(label) < width else label[:width] + "..."
@@ -0,0 +1,175 @@
+"""Node positions for visjs diagrams, computed before the page is rendered.
+
+visjs lays a diagram out in the browser by simulating physics until the
+nodes settle, which for diagrams of thousands of nodes can freeze the page
+for minutes. rdfdig can compute the positions itself, with a fixed number
+of iterations, and render the page with physics turned off.
+
+the force layout uses numpy, which is an optional dependency, install it
+with pip install rdfdig[numpy]. the layered layout does not.
+"""
+
+import logging
+from collections import deque
+from typing import Iterable
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# the layouts of a visjs diagram. browser leaves it to visjs, auto lays out
+# diagrams of AUTO_NODES or more nodes with force, or layered without numpy
+LAYOUTS = ("auto", "browser", "force", "layered")
+AUTO_NODES = 300
+# the default number of iterations of the force layout
+ITERATIONS = 100
+# the distance between connected nodes, in visjs canvas units
+SPACING = 150.0
+# the number of nodes each node is pushed away from in an iteration of the
+# force layout. larger diagrams sample this many nodes instead of all of them
+REPULSION_SAMPLE = 512
+
+Position = tuple[float, float]
+
+
+def _neighbours(
+    node_ids: list[int], edges: Iterable[tuple[int, int]]
+) -> dict[int, list[int]]:
+    """the nodes connected to each node, in either direction"""
+    neighbours: dict[int, list[int]] = {node_id: [] for node_id in node_ids}
+    for from_id, to_id in edges:
+        if from_id != to_id and from_id in neighbours and to_id in neighbours:
+            neighbours[from_id].append(to_id)
+            neighbours[to_id].append(from_id)
+    return neighbours
+
+
+def layered_layout(
+    node_ids: list[int], edges: Iterable[tuple[int, int]]
+) -> dict[int, Position]:
+    """lay nodes out in rows by their distance from the best connected node
+
+    each connected component is laid out on its own, starting with the
+    largest, and placed to the right of the one before.
+
+    :param edges: (from id, to id) pairs.
+    """
+    neighbours = _neighbours(node_ids, edges)
+    positions: dict[int, Position] = {}
+    left = 0.0
+    for root in sorted(neighbours, key=lambda n: len(neighbours[n]), reverse=True):
+        if root in positions:
+            continue
+        rows: list[list[int]] = []
+        depth = {root: 0}
+        queue = deque([root])
+        while queue:
+            node = queue.popleft()
+            if depth[node] == len(rows):
+                rows.append([])
+            rows[depth[node]].append(node)
+            for neighbour in neighbours[node]:
+                if neighbour not in depth:
+                    depth[neighbour] = depth[node] + 1
+                    queue.append(neighbour)
+        width = max(len(row) for row in rows)
+        for y, row in enumerate(rows):
+            offset = left + (width - len(row)) * SPACING / 2
+            for x, node in enumerate(row):
+                positions[node] = (offset + x * SPACING, y * SPACING)
+        left += (width + 1) * SPACING
+    return positions
+
+
+def force_layout(
+    node_ids: list[int],
+    edges: Iterable[tuple[int, int]],
+    iterations: int = ITERATIONS,
+    seed: int = 0,
+) -> dict[int, Position]:
+    """lay nodes out with the Fruchterman-Reingold force directed algorithm
+
+    every node pushes the others away and every edge pulls its ends
+    together, moving each node no further than a temperature that cools
+    to nothing over the iterations. so the time taken is set by the
+    iterations rather than by when the layout settles. each iteration is
+    done with numpy over every node at once, pushing each node away from a
+    sample of REPULSION_SAMPLE nodes when there are more than that.
+
+    :param edges: (from id, to id) pairs.
+    :param seed: seeds the starting positions and samples, the same seed
+        gives the same layout.
+    :raises ImportError: if numpy is not installed.
+    """
+    if np is None:
+        raise ImportError(
+            "the force layout needs numpy, install it with pip install rdfdig[numpy]"
+        )
+    size = len(node_ids)
+    if size == 0:
+        return {}
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    pairs = [
+        (index[f], index[t]) for f, t in edges if f != t and f in index and t in index
+    ]
+    ends = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+    rng = np.random.default_rng(seed)
+    k = SPACING
+    extent = k * np.sqrt(size)
+    # positions are complex numbers, x + yj, so that the push of every
+    # other node, delta * k**2 / abs(delta)**2, is k**2 / conj(delta)
+    pos = rng.uniform(-extent / 2, extent / 2, size=(size, 2)) @ np.array([1, 1j])
+    temperatures = np.linspace(extent / 10, 0, iterations, endpoint=False)
+    for temperature in temperatures:
+        if size > REPULSION_SAMPLE:
+            others = pos[rng.choice(size, REPULSION_SAMPLE, replace=False)]
+            scale = size / REPULSION_SAMPLE
+        else:
+            others, scale = pos, 1.0
+        delta = pos[:, None] - others[None, :]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.reciprocal(delta, out=delta)
+        # a node does not push itself
+        delta[~np.isfinite(delta)] = 0
+        displacement = np.conj(delta.sum(axis=1)) * (k**2 * scale)
+        # the ends of each edge pull together with distance**2 / k
+        delta = pos[ends[:, 0]] - pos[ends[:, 1]]
+        force = delta * np.abs(delta) / k
+        np.subtract.at(displacement, ends[:, 0], force)
+        np.add.at(displacement, ends[:, 1], force)
+        # a little gravity keeps unconnected parts from drifting apart
+        displacement -= pos * np.abs(pos) * (0.01 / k)
+        length = np.maximum(np.abs(displacement), 1e-9)
+        pos += displacement * (np.minimum(length, temperature) / length)
+    return {node_id: (p.real, p.imag) for node_id, p in zip(node_ids, pos.tolist())}
+
+
+def layout(
+    nodes: list[dict],
+    edges: list[dict],
+    name: str = "auto",
+    iterations: int = ITERATIONS,
+) -> dict[int, Position] | None:
+    """the positions of serialized nodes, or None to lay them out in the browser
+
+    :param name: one of LAYOUTS.
+    :param iterations: the number of iterations of the force layout.
+    :raises ValueError: if name is not one of LAYOUTS.
+    """
+    if name not in LAYOUTS:
+        raise ValueError(f"unknown layout {name}, expected one of {LAYOUTS}")
+    if name == "auto":
+        if len(nodes) < AUTO_NODES:
+            return None
+        name = "force" if np is not None else "layered"
+    if name == "browser":
+        return None
+    node_ids = [node["id"] for node in nodes]
+    pairs = [(edge["from"], edge["to"]) for edge in edges]
+    logger.info(f"laying out {len(node_ids)} nodes with the {name} layout")
+    if name == "force":
+        return force_layout(node_ids, pairs, iterations=iterations)
+    return layered_layout(node_ids, pairs)
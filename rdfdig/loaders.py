@@ -1,35 +1,597 @@
+import asyncio
 import getpass
+import hashlib
+import json
 import logging
+import random
+import shutil
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import find_spec
 from pathlib import Path
 
 import httpx
-from rdflib import Graph
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.exceptions import ParserError
+from rdflib.plugins.parsers.ntriples import (
+    W3CNTriplesParser,
+    r_nodeid,
+    r_tail,
+    r_wspace,
+)
+from rdflib.term import Identifier
+
+from rdfdig.cache import ParseCache, ResponseCache
 
 logger = logging.getLogger(__name__)
 
+# HTTP/2 needs the optional h2 package, i.e. pip install httpx[http2]
+HTTP2 = find_spec("h2") is not None
+
+# file suffixes of formats that hold exactly one statement per line
+LINE_FORMATS = (".nt", ".nq")
+
+
+class _LineParser(W3CNTriplesParser):
+    """parses single N-Triples or N-Quads lines to triples.
+
+    blank node labels are scoped to the document by prefixing them with
+    scope, so the same line always yields the same BNode no matter how
+    many times, or in which process, it is parsed.
+    """
 
-def load_file(path: Path) -> Graph:
-    """load RDF from path input format is automatically determined"""
-    graph = Graph()
+    def __init__(self, scope: str):
+        super().__init__()
+        self.scope = scope
+
+    def nodeid(self, bnode_context=None) -> BNode | bool:
+        if self.peek("_"):
+            return BNode(self.scope + self.eat(r_nodeid).group(1))
+        return False
+
+    def parse_line(self, line: str) -> tuple | None:
+        """parse a line to a (subject, predicate, object, graph) tuple
+
+        :returns: None for blank lines and comments
+        """
+        self.line = line
+        self.eat(r_wspace)
+        if (not self.line) or self.line.startswith("#"):
+            return None
+        subj = self.subject()
+        self.eat(r_wspace)
+        pred = self.predicate()
+        self.eat(r_wspace)
+        obj = self.object()
+        self.eat(r_wspace)
+        context = self.uriref() or self.nodeid()
+        self.eat(r_tail)
+        if self.line:
+            raise ParserError(f"Trailing garbage: {self.line}")
+        return subj, pred, obj, context or None
+
+
+def load_file(
+    path: Path, cache: ParseCache | None = None, graph: Graph | None = None
+) -> Graph:
+    """load RDF from path input format is automatically determined
+
+    :param cache: if given, load the parsed file from this cache when possible.
+    :param graph: the graph to add the statements and namespace bindings to,
+        a new one if None.
+    """
+    if cache is not None:
+        return cache.parse(path, graph=graph)
+    if graph is None:
+        graph = Graph()
     logger.info(f"parsing rdf from {path.name}")
     graph.parse(path)
     return graph
 
 
-def load_dir(path: Path, graph: Graph | None = None) -> Graph:
-    """load RDF from files in path input format is automatically determined"""
+def _parse_file(path: Path, cache: ParseCache | None) -> tuple[list, list, str | None]:
+    """parse a file in a worker process
+
+    :returns: the triples, the namespace bindings and an error message if
+        the file could not be parsed.
+    """
+    try:
+        if cache is not None:
+            graph = cache.parse(path)
+        else:
+            graph = Graph()
+            graph.parse(path)
+    except Exception as e:
+        return [], [], str(e)
+    return list(graph), list(graph.namespace_manager.namespaces()), None
+
+
+def _find_files(path: Path) -> list[Path]:
+    return [
+        file
+        for subpath in path.iterdir()
+        for file in (_find_files(subpath) if subpath.is_dir() else [subpath])
+    ]
+
+
+def load_dir(
+    path: Path,
+    graph: Graph | None = None,
+    jobs: int = 1,
+    cache: ParseCache | None = None,
+) -> Graph:
+    """load RDF from files in path input format is automatically determined
+
+    files that cannot be parsed are reported and skipped. each file is parsed
+    straight into graph, so in a serial load the statements of a file read
+    before its error are kept. a file parsed by a worker process is added
+    whole or not at all.
+
+    :param graph: the graph to add the statements and namespace bindings
+        to, a new one if None.
+    :param jobs: number of processes to parse files with. the triples and
+        namespace bindings of each file are merged into graph in the same
+        order as a serial load.
+    :param cache: if given, load parsed files from this cache when possible.
+    """
     if graph is None:
         graph = Graph()
-    for subpath in path.iterdir():
-        if subpath.is_dir():
-            load_dir(subpath, graph)
-        else:
-            logger.info(f"parsing rdf from {subpath.name}")
-            graph.parse(subpath)
+    files = _find_files(path)
+    if jobs > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(
+                _parse_file, files, [cache] * len(files), chunksize=8
+            )
+            failed = [
+                file
+                for file, result in zip(files, results)
+                if not _merge_parsed(graph, file, *result)
+            ]
+    else:
+        failed = []
+        for file in files:
+            try:
+                load_file(file, cache=cache, graph=graph)
+            except Exception as e:
+                logger.error(f"could not parse rdf from {file}. message: {e}")
+                failed.append(file)
+    if failed:
+        logger.warning(f"skipped {len(failed)} of {len(files)} files in {path}")
     return graph
 
 
-def load_sparql(
+def _merge_parsed(
+    graph: Graph,
+    path: Path,
+    triples: list,
+    namespaces: list,
+    error: str | None,
+) -> bool:
+    """add the result of _parse_file to graph
+
+    blank nodes are given fresh identifiers as worker processes can
+    generate the same identifiers as each other.
+    """
+    if error is not None:
+        logger.error(f"could not parse rdf from {path}. message: {error}")
+        return False
+    logger.info(f"parsed rdf from {path.name}")
+    bnodes: dict[BNode, BNode] = defaultdict(BNode)
+    graph.addN(
+        (
+            bnodes[subj] if isinstance(subj, BNode) else subj,
+            pred,
+            bnodes[obj] if isinstance(obj, BNode) else obj,
+            graph,
+        )
+        for subj, pred, obj in triples
+    )
+    for prefix, namespace in namespaces:
+        graph.namespace_manager.bind(prefix=prefix, namespace=namespace)
+    return True
+
+
+def find_line_files(path: Path) -> list[Path]:
+    """find the line oriented RDF files at path, searching folders recursively
+
+    :raises: ValueError if a file is not in a line oriented format
+    """
+    if path.is_dir():
+        return [
+            file
+            for subpath in sorted(path.iterdir())
+            for file in find_line_files(subpath)
+        ]
+    if path.suffix.lower() not in LINE_FORMATS:
+        raise ValueError(
+            f"{path} cannot be streamed. Supported formats are: {', '.join(LINE_FORMATS)}"
+        )
+    return [path]
+
+
+def split_file(path: Path, shard_size: int) -> list[tuple[int, int]]:
+    """split a line oriented file into (start, end) byte ranges of about shard_size
+
+    ranges always begin at the start of a line and end after a line break.
+    """
+    size = path.stat().st_size
+    bounds = [0]
+    with path.open("rb") as file:
+        while bounds[-1] + shard_size < size:
+            file.seek(bounds[-1] + shard_size)
+            file.readline()
+            if file.tell() >= size:
+                break
+            bounds.append(file.tell())
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def stream_file(
+    path: Path,
+    scope: str = "",
+    graph: str | None = None,
+    contains: str | None = None,
+    start: int = 0,
+    end: int | None = None,
+):
+    """yield triples from a N-Triples or N-Quads file one line at a time
+
+    the file is never held in memory.
+
+    :param scope: prefix for blank node identifiers, should be unique per file.
+    :param graph: only yield N-Quads statements from this named graph.
+    :param contains: skip lines that do not contain this text without parsing them.
+    :param start: byte offset of the first line to read.
+    :param end: stop reading at this byte offset. defaults to the end of the file.
+    """
+    parser = _LineParser(scope=scope)
+    needle = contains.encode("utf-8") if contains else None
+    with path.open("rb") as file:
+        file.seek(start)
+        position = start
+        for line in file:
+            if end is not None and position >= end:
+                break
+            position += len(line)
+            if needle and needle not in line:
+                continue
+            try:
+                quad = parser.parse_line(line.decode("utf-8").rstrip("\r\n"))
+            except ParserError as e:
+                raise ParserError(
+                    f"{path.name} byte {position - len(line)}: {e}"
+                ) from e
+            if quad is None:
+                continue
+            if graph and (quad[3] is None or str(quad[3]) != graph):
+                continue
+            yield quad[:3]
+
+
+def sparql_password(username: str | None, password: str | None) -> str | None:
+    """the password to use, prompting for one if a username is given without one"""
+    if username and not password:
+        return getpass.getpass("password: ")
+    return password
+
+
+def sparql_auth(username: str | None, password: str | None) -> httpx.BasicAuth | None:
+    """HTTP Basic authentication for a SPARQL endpoint, if a username is given
+
+    if a username is given without a password then the user is prompted for one.
+    """
+    if not username:
+        return None
+    password = sparql_password(username, password)
+    return httpx.BasicAuth(username=username, password=password)
+
+
+def _binding_term(binding: dict | None) -> Identifier | None:
+    """convert a SPARQL JSON results binding to an rdflib term"""
+    if binding is None:
+        return None
+    if binding["type"] == "uri":
+        return URIRef(binding["value"])
+    if binding["type"] == "bnode":
+        return BNode(binding["value"])
+    return Literal(
+        binding["value"],
+        lang=binding.get("xml:lang"),
+        datatype=binding.get("datatype"),
+    )
+
+
+def construct_query(iri: str | None, graph: str | None, limit: int, offset: int) -> str:
+    """the CONSTRUCT query for one page of statements, optionally about iri"""
+    # fetch bnode properties to a depth of two
+    return f"""
+    construct {{
+     ?s ?p ?o .
+     ?o ?p1 ?o1 .
+     ?o1 ?p2 ?o2 .
+    }}
+    {f"from <{graph}>" if graph else ""}
+    where {{
+        {f"values (?s ?o) {{(<{iri}> UNDEF) (UNDEF <{iri}>)}}" if iri else ""}
+        ?s ?p ?o .
+        optional {{
+            ?o ?p1 ?o1 .
+            filter (isblank(?o))
+            optional {{
+                ?o1 ?p2 ?o2 .
+                filter (isblank(?o1))
+            }}
+        }}
+    }}
+    limit {limit}
+    offset {offset}
+    """
+
+
+def async_sparql_client(
+    username: str | None,
+    password: str | None,
+    timeout: int = 5,
+    concurrency: int = 4,
+) -> httpx.AsyncClient:
+    """create a pooled asynchronous HTTP client for a SPARQL endpoint
+
+    HTTP/2 is negotiated if the optional h2 package is installed.
+    """
+    return httpx.AsyncClient(
+        auth=sparql_auth(username, password),
+        timeout=httpx.Timeout(timeout=timeout),
+        limits=httpx.Limits(max_connections=concurrency),
+        http2=HTTP2,
+    )
+
+
+async def async_sparql_request(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    query: str,
+    accept: str,
+    cache: ResponseCache | None = None,
+) -> httpx.Response:
+    """send query to endpoint, by POST with a fallback to GET on 405
+
+    :param cache: answer from, and store successful responses in, this cache.
+    """
+    headers = {"Content-Type": "application/sparql-query", "Accept": accept}
+    cached = cache.get(endpoint, query, accept) if cache else None
+    if cached:
+        if cached.fresh:
+            return cached.response
+        headers.update(cached.validators)
+    response = await client.post(endpoint, headers=headers, content=query)
+    if response.status_code == 405:
+        response = await client.get(endpoint, headers=headers, params={"query": query})
+    if cached and response.status_code == 304:
+        cache.refresh(cached)
+        return cached.response
+    response.raise_for_status()
+    if cache:
+        cache.put(cache.key(endpoint, query, accept), response)
+    return response
+
+
+async def async_sparql_select(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    query: str,
+    cache: ResponseCache | None = None,
+    retries: int = 3,
+) -> list[dict]:
+    """run a SELECT query and return its bindings as rdflib terms
+
+    :returns: a list of rows, mapping each variable to a term or None if unbound.
+    """
+    logger.debug(query)
+    response = await retry_request(
+        lambda: async_sparql_request(
+            client,
+            endpoint,
+            query,
+            accept="application/sparql-results+json",
+            cache=cache,
+        ),
+        retries=retries,
+    )
+    results = response.json()
+    variables = results["head"]["vars"]
+    return [
+        {var: _binding_term(row.get(var)) for var in variables}
+        for row in results["results"]["bindings"]
+    ]
+
+
+# media types requested for CONSTRUCT results, in order of preference, and the
+# rdflib parser for each. line based N-Triples is much cheaper to parse than JSON-LD
+CONSTRUCT_FORMATS = {
+    "application/n-triples": "nt",
+    "text/plain": "nt",
+    "application/ld+json": "json-ld",
+}
+CONSTRUCT_ACCEPT = "application/n-triples, text/plain;q=0.9, application/ld+json;q=0.5"
+
+
+def response_format(response: httpx.Response) -> str:
+    """the rdflib format of a CONSTRUCT response, JSON-LD if it is not declared"""
+    media_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+    return CONSTRUCT_FORMATS.get(media_type, "json-ld")
+
+
+class _CountingGraph(Graph):
+    """a view of a graph that counts the statements parsed into it
+
+    statements go straight into the store of the graph. it says it is
+    context aware, with itself as the default context, so that the JSON-LD
+    parser adds to it rather than to a graph of its own over the store.
+    """
+
+    def __init__(self, graph: Graph):
+        super().__init__(
+            store=graph.store,
+            identifier=graph.identifier,
+            namespace_manager=graph.namespace_manager,
+        )
+        self.context_aware = True
+        self.count = 0
+
+    @property
+    def default_context(self) -> Graph:
+        return self
+
+    def add(self, triple):
+        self.count += 1
+        return super().add(triple)
+
+    def addN(self, quads):
+        def counted():
+            for quad in quads:
+                self.count += 1
+                yield quad
+
+        return super().addN(counted())
+
+
+def _parse_response(g: Graph, response: httpx.Response) -> int:
+    """parse a CONSTRUCT response straight into g
+
+    :returns: the number of triples in the response, counted as they are
+        parsed, as some of them may be in g already.
+    """
+    page = _CountingGraph(g)
+    try:
+        page.parse(data=response.content, format=response_format(response))
+    except Exception as e:
+        logger.error(
+            f"could not parse response from SPARQL endpoint.\nerror message: {e.args[0]}\nresponse content:\n{response.text}"
+        )
+    return page.count
+
+
+# HTTP status codes worth retrying a request for
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+async def retry_request(
+    send, retries: int = 3, backoff: float = 0.5, retry_timeouts: bool = True
+) -> httpx.Response:
+    """await send() retrying transient failures with exponential backoff
+
+    connection errors, timeouts and transient HTTP statuses are retried,
+    waiting for the Retry-After header of the response if one is given.
+
+    :param send: a coroutine function that sends the request.
+    :param retry_timeouts: if False timeouts are raised immediately.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return await send()
+        except httpx.TimeoutException:
+            if not retry_timeouts or attempt == retries:
+                raise
+            delay = backoff * 2**attempt
+            error = "timeout"
+        except httpx.TransportError as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2**attempt
+            error = str(e)
+        except httpx.HTTPStatusError as e:
+            if (
+                e.response.status_code not in TRANSIENT_STATUS_CODES
+                or attempt == retries
+            ):
+                raise
+            retry_after = e.response.headers.get("Retry-After", "")
+            delay = (
+                float(retry_after) if retry_after.isdigit() else backoff * 2**attempt
+            )
+            error = f"HTTP {e.response.status_code}"
+        delay *= 1 + random.random() / 2
+        logger.warning(f"retrying SPARQL request in {delay:.1f}s after {error}")
+        await asyncio.sleep(delay)
+
+
+class PageSizer:
+    """picks SPARQL page sizes from the latency and size of previous pages
+
+    pages are grown or shrunk, at most two fold at a time, so that each takes
+    about a quarter of the timeout and stays under max_bytes.
+
+    :param limit: the initial page size. sizes are kept between limit / 16 and limit * 16.
+    """
+
+    def __init__(self, limit: int, timeout: float, max_bytes: int = 16 * 1024**2):
+        self.size = limit
+        self.min_size = max(1, limit // 16)
+        self.max_size = limit * 16
+        self.target = timeout / 4
+        self.max_bytes = max_bytes
+
+    def observe(self, size: int, elapsed: float, nbytes: int):
+        """adjust the page size after a page of size took elapsed seconds and nbytes"""
+        factor = self.target / max(elapsed, 0.001)
+        if nbytes:
+            factor = min(factor, self.max_bytes / nbytes)
+        factor = min(2.0, max(0.5, factor))
+        self.size = min(self.max_size, max(self.min_size, int(size * factor)))
+
+    def shrink(self):
+        """halve the page size after a page timed out"""
+        self.size = max(self.min_size, self.size // 2)
+
+
+class Checkpoint:
+    """the progress of a paged SPARQL fetch, saved so a rerun can resume it
+
+    each page is saved as the body the endpoint sent, in its own file so
+    blank node labels stay scoped to their page, alongside the number of
+    pages saved, the next offset and the page size.
+
+    :param key: the arguments that identify the fetch.
+    """
+
+    def __init__(self, directory: Path, key: dict):
+        name = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+        self.path = directory / name[:32]
+        self.state_path = self.path / "state.json"
+
+    def load(self, g: Graph) -> dict | None:
+        """parse the saved pages into g and return the saved state, if any"""
+        if not self.state_path.exists():
+            return None
+        state = json.loads(self.state_path.read_text())
+        for page, fmt in enumerate(state["formats"]):
+            g.parse(self.path / f"{page}.page", format=fmt)
+        logger.info(
+            f"resuming from checkpoint with {len(g):,} triples at offset {state['offset']:,}"
+        )
+        return state
+
+    def save(self, responses: list[httpx.Response], offset: int, page_size: int):
+        """record the responses for a page and the offset of the page after it"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        state = {"offset": 0, "page_size": 0, "formats": []}
+        if self.state_path.exists():
+            state = json.loads(self.state_path.read_text())
+        for response in responses:
+            page = len(state["formats"])
+            (self.path / f"{page}.page").write_bytes(response.content)
+            state["formats"].append(response_format(response))
+        state["offset"], state["page_size"] = offset, page_size
+        tmp_path = self.state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state))
+        tmp_path.replace(self.state_path)
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+async def aload_sparql(
     endpoint: str,
     iri: str | None,
     graph: str | None,
@@ -39,83 +601,174 @@ def load_sparql(
     offset: int = 0,
     cutoff: int = 10000,
     timeout: int = 5,
-):
-    """load RDF from a remote SPARQL endpoint"""
-    if username:
-        if not password:
-            password = getpass.getpass("password: ")
-        auth = httpx.BasicAuth(username=username, password=password)
-        client = httpx.Client(auth=auth, timeout=httpx.Timeout(timeout=timeout))
-    else:
-        client = httpx.Client(timeout=httpx.Timeout(timeout=timeout))
-    g = Graph()
-    if not iri:
-        # first check how many triples there are
-        headers = {
-            "Content-Type": "application/sparql-query",
-            "Accept": "application/json",
-        }
-        query = f"select (count(?s) as ?n) {f'from <{graph}>' if graph else ''} where {{?s ?p ?o}}"
-        response = client.post(endpoint, headers=headers, data=query)
-        if response.status_code == 405:
-            response = client.get(endpoint, headers=headers, params={"query": query})
-        response.raise_for_status()
-        try:
-            n_triples = int(response.json()["results"]["bindings"][0]["n"]["value"])
-        except Exception as e:
-            logging.error(
-                f"could not count triples in remote endpoint. message: {e.args[0]}"
-            )
-            n_triples = 0
-        if n_triples > cutoff:
-            logger.warning(
-                f"Warning remote dataset contains {n_triples:,} triples. Only the first {cutoff:,} will be fetched.\n"
-                "This behaviour can be overriden by setting the 'cutoff' parameter."
+    concurrency: int = 4,
+    retries: int = 3,
+    checkpoint_dir: Path | None = None,
+    cache: ResponseCache | None = None,
+    into: Graph | None = None,
+) -> Graph:
+    """load RDF from a remote SPARQL endpoint, fetching pages concurrently
+
+    up to concurrency pages are requested at once over one pooled client.
+    N-Triples is requested in preference to JSON-LD. each page is parsed
+    straight into the graph, in order, in a worker thread while the
+    following pages are still being fetched. its triples are counted as
+    they are parsed and as soon as a page comes back short the pages still
+    in flight are cancelled.
+
+    the page size starts at limit and adapts to the endpoint, see PageSizer.
+    transient failures are retried, see retry_request, and a page that times
+    out is split in two. if checkpoint_dir is given, progress is saved there
+    after every page and a later call with the same arguments resumes from it.
+    if cache is given, responses are reused from it, see ResponseCache.
+    if into is given, pages are parsed into it rather than a new graph.
+    """
+    g = Graph() if into is None else into
+    sizer = PageSizer(limit, timeout)
+    next_offset = offset
+    checkpoint = None
+    if checkpoint_dir is not None:
+        checkpoint = Checkpoint(
+            checkpoint_dir,
+            key={
+                "endpoint": endpoint,
+                "iri": iri,
+                "graph": graph,
+                "username": username,
+                "offset": offset,
+                "cutoff": cutoff,
+            },
+        )
+        state = checkpoint.load(g)
+        if state is not None:
+            next_offset, sizer.size = state["offset"], state["page_size"]
+    async with async_sparql_client(
+        username=username, password=password, timeout=timeout, concurrency=concurrency
+    ) as client:
+        if not iri:
+            # first check how many triples there are
+            query = f"select (count(?s) as ?n) {f'from <{graph}>' if graph else ''} where {{?s ?p ?o}}"
+            response = await retry_request(
+                lambda: async_sparql_request(
+                    client, endpoint, query, accept="application/json", cache=cache
+                ),
+                retries=retries,
             )
-    while True:
-        # fetch bnode properties to a depth of two
-        query = f"""
-        construct {{
-         ?s ?p ?o .
-         ?o ?p1 ?o1 .
-         ?o1 ?p2 ?o2 .
-        }}
-        {f"from <{graph}>" if graph else ""}
-        where {{
-            {f"values (?s ?o) {{(<{iri}> UNDEF) (UNDEF <{iri}>)}}" if iri else ""}
-            ?s ?p ?o .
-            optional {{
-                ?o ?p1 ?o1 .
-                filter (isblank(?o))
-                optional {{
-                    ?o1 ?p2 ?o2 .
-                    filter (isblank(?o1))
-                }}
-            }}
-        }}
-        limit {limit}
-        offset {offset}
-        """
-        logger.debug(query)
-        headers = {
-            "Content-Type": "application/sparql-query",
-            "Accept": "application/ld+json",
-        }
-        response = client.post(endpoint, headers=headers, data=query)
-        if response.status_code == 405:
-            response = client.get(endpoint, headers=headers, params={"query": query})
-        response.raise_for_status()
-        g_part = Graph()
+            try:
+                n_triples = int(response.json()["results"]["bindings"][0]["n"]["value"])
+            except Exception as e:
+                logging.error(
+                    f"could not count triples in remote endpoint. message: {e.args[0]}"
+                )
+                n_triples = 0
+            if n_triples > cutoff:
+                logger.warning(
+                    f"Warning remote dataset contains {n_triples:,} triples. Only the first {cutoff:,} will be fetched.\n"
+                    "This behaviour can be overriden by setting the 'cutoff' parameter."
+                )
+        loop = asyncio.get_running_loop()
+
+        async def fetch(page_offset: int, size: int) -> list[httpx.Response]:
+            query = construct_query(iri, graph, limit=size, offset=page_offset)
+            logger.debug(query)
+            started = loop.time()
+            try:
+                response = await retry_request(
+                    lambda: async_sparql_request(
+                        client, endpoint, query, accept=CONSTRUCT_ACCEPT, cache=cache
+                    ),
+                    retries=retries,
+                    retry_timeouts=size <= sizer.min_size,
+                )
+            except httpx.TimeoutException:
+                # pages of the smallest size have had their retries already
+                if size <= sizer.min_size or size < 2:
+                    raise
+                sizer.shrink()
+                half = size // 2
+                logger.warning(f"page of {size:,} timed out, splitting it in two")
+                return await fetch(page_offset, half) + await fetch(
+                    page_offset + half, size - half
+                )
+            sizer.observe(size, loop.time() - started, len(response.content))
+            return [response]
+
+        # the first page is always fetched, then every page that starts before the cutoff
+        pending: deque[tuple[int, int, asyncio.Task]] = deque()
+
+        def schedule(first: bool = False):
+            nonlocal next_offset
+            if first or next_offset <= cutoff:
+                size = sizer.size
+                task = asyncio.create_task(fetch(next_offset, size))
+                pending.append((next_offset, size, task))
+                next_offset += size
+
+        schedule(first=True)
+        for _ in range(concurrency - 1):
+            schedule()
         try:
-            g_part.parse(data=response.content, format="application/ld+json")
-        except Exception as e:
-            logger.error(
-                f"could not parse response from SPARQL endpoint.\nerror message: {e.args[0]}\nresponse content:\n{response.text}"
+            while pending:
+                page_offset, size, task = pending.popleft()
+                responses = await task
+                parsed = 0
+                for response in responses:
+                    parsed += await loop.run_in_executor(
+                        None, _parse_response, g, response
+                    )
+                if checkpoint is not None:
+                    checkpoint.save(responses, page_offset + size, sizer.size)
+                # pages are counted as they are parsed, not by the growth of
+                # g, as g may hold some of their triples already
+                if parsed < size:
+                    break
+                schedule()
+        finally:
+            for _, _, task in pending:
+                task.cancel()
+            await asyncio.gather(
+                *(task for _, _, task in pending), return_exceptions=True
             )
-        g += g_part
-        if len(g_part) < limit:
-            break
-        offset += limit
-        if offset > cutoff:
-            break
+    if checkpoint is not None:
+        checkpoint.clear()
     return g
+
+
+def load_sparql(
+    endpoint: str,
+    iri: str | None,
+    graph: str | None,
+    username: str | None,
+    password: str | None,
+    limit: int = 1000,
+    offset: int = 0,
+    cutoff: int = 10000,
+    timeout: int = 5,
+    concurrency: int = 4,
+    retries: int = 3,
+    checkpoint_dir: Path | None = None,
+    cache: ResponseCache | None = None,
+    into: Graph | None = None,
+) -> Graph:
+    """load RDF from a remote SPARQL endpoint
+
+    a blocking wrapper around aload_sparql.
+    """
+    return asyncio.run(
+        aload_sparql(
+            endpoint=endpoint,
+            iri=iri,
+            graph=graph,
+            username=username,
+            password=password,
+            limit=limit,
+            offset=offset,
+            cutoff=cutoff,
+            timeout=timeout,
+            concurrency=concurrency,
+            retries=retries,
+            checkpoint_dir=checkpoint_dir,
+            cache=cache,
+            into=into,
+        )
+    )
@@ -0,0 +1,273 @@
+"""Reduce the serialization of a large diagram to a size that can be rendered.
+
+browsers and mermaid.js cannot draw diagrams of many thousands of nodes. a
+diagram with more nodes than Thresholds.max_nodes is reduced, in order, by
+
+    collapsing the literals of a resource with the same datatype into one node
+    folding the leaves of a node into one "+N more" node
+    keeping the Thresholds.top_k best connected resource or class nodes
+    bundling the edges between the same two nodes into one
+
+stopping once the diagram is small enough, except that edges are always
+bundled. collapsed and folded nodes are clusters, the nodes and edges they
+stand for are kept in the "clusters" of the reduced serialization so they
+can be shown again, as the visjs page does when one is double clicked.
+clusters have negative ids, which serialized nodes never have.
+"""
+
+import logging
+from collections import defaultdict
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# the most labels of bundled edges to show, the rest are counted
+BUNDLE_LABELS = 3
+
+
+class Thresholds(NamedTuple):
+    """when and how far a diagram is reduced before it is rendered
+
+    :param max_nodes: diagrams with more nodes than this are reduced.
+    :param top_k: the number of resource or class nodes kept when folding
+        is not enough, the ones with the most edges.
+    :param fold_min: the fewest leaves of a node to fold into a cluster.
+    """
+
+    max_nodes: int = 2000
+    top_k: int = 500
+    fold_min: int = 3
+
+
+def literal_datatype(label: str) -> str:
+    """the datatype of a literal from its label in an instance diagram"""
+    _, _, suffix = label.rpartition('"')
+    if suffix.startswith("^^"):
+        return suffix[2:]
+    if suffix.startswith("@"):
+        return "rdf:langString"
+    return "xsd:string"
+
+
+class Reduction:
+    """the nodes and edges of a serialization as they are reduced"""
+
+    def __init__(self, serialization: dict):
+        self.nodes = {node["id"]: node for node in serialization["nodes"]}
+        self.edges: list[dict] = serialization["edges"]
+        self.clusters: dict[int, dict] = {}
+        self.omitted = 0
+
+    def _cluster(
+        self, label: str, nodes: list[dict], edges: list[dict], isliteral: bool
+    ) -> int:
+        """add a node standing for nodes and edges, and return its id"""
+        cluster_id = -1 - len(self.clusters)
+        self.nodes[cluster_id] = {
+            "id": cluster_id,
+            "label": label,
+            "isliteral": isliteral,
+            "isblank": False,
+            "cluster": True,
+        }
+        self.clusters[cluster_id] = {"nodes": nodes, "edges": edges}
+        return cluster_id
+
+    def collapse_literals(self):
+        """replace the literals of each resource with one node per datatype
+
+        only literals of instance diagrams, which are quoted, are collapsed
+        and only when a resource has more than one of the same datatype.
+        edges to nodes that are not in the diagram, such as the untyped
+        objects of a class diagram, are left as they are.
+        """
+        groups: dict[tuple[int, str], list[dict]] = defaultdict(list)
+        for edge in self.edges:
+            node = self.nodes.get(edge["to"])
+            if node is None:
+                continue
+            if node["isliteral"] and node["label"].startswith('"'):
+                groups[edge["from"], literal_datatype(node["label"])].append(edge)
+        for (from_id, datatype), edges in groups.items():
+            if len(edges) < 2:
+                continue
+            cluster_id = self._cluster(
+                f"{datatype} ({len(edges)})",
+                [self.nodes[edge["to"]] for edge in edges],
+                edges,
+                isliteral=True,
+            )
+            for edge in edges:
+                edge["collapsed"] = cluster_id
+        self._rewire("collapsed")
+
+    def fold_leaves(self, fold_min: int):
+        """replace the leaves of each node, when it has fold_min or more, with one
+
+        only nodes in the diagram are folded.
+        """
+        leaves: dict[int, list[dict]] = defaultdict(list)
+        for node_id, edges in self._incident().items():
+            if len(edges) == 1 and node_id >= 0 and node_id in self.nodes:
+                edge = edges[0]
+                other = edge["to"] if edge["from"] == node_id else edge["from"]
+                leaves[other].append(edge)
+        folded_ids: set[int] = set()
+        for node_id, edges in leaves.items():
+            if len(edges) < fold_min or node_id in folded_ids:
+                continue
+            folded = [
+                self.nodes[edge["to"] if edge["from"] == node_id else edge["from"]]
+                for edge in edges
+            ]
+            folded_ids.update(node["id"] for node in folded)
+            cluster_id = self._cluster(
+                f"+{len(folded)} more",
+                folded,
+                edges,
+                isliteral=all(node["isliteral"] for node in folded),
+            )
+            for edge in edges:
+                edge["collapsed"] = cluster_id
+        self._rewire("collapsed")
+
+    def keep_top(self, top_k: int):
+        """keep the top_k resource or class nodes with the most edges
+
+        literal and cluster nodes are kept while they are connected to a
+        node that is kept.
+        """
+        incident = self._incident()
+        ranked = sorted(
+            (
+                node_id
+                for node_id, node in self.nodes.items()
+                if not node["isliteral"] and node_id >= 0
+            ),
+            key=lambda node_id: (-len(incident.get(node_id, ())), node_id),
+        )
+        kept, dropped = set(ranked[:top_k]), set(ranked[top_k:])
+        self.edges = [
+            edge
+            for edge in self.edges
+            if edge["from"] not in dropped and edge["to"] not in dropped
+        ]
+        connected = {edge["from"] for edge in self.edges}
+        connected.update(edge["to"] for edge in self.edges)
+        for node_id in list(self.nodes):
+            if node_id not in kept and (node_id in dropped or node_id not in connected):
+                del self.nodes[node_id]
+                self.omitted += 1
+
+    def bundle_edges(self):
+        """replace the edges between the same two nodes, in the same direction, with one
+
+        the bundle is labelled with the first BUNDLE_LABELS labels and has
+        the number of edges it stands for as its weight.
+        """
+        bundles: dict[tuple[int, int], list[dict]] = defaultdict(list)
+        for edge in self.edges:
+            bundles[edge["from"], edge["to"]].append(edge)
+        self.edges = []
+        for (from_id, to_id), edges in bundles.items():
+            if len(edges) == 1:
+                self.edges.append(edges[0])
+                continue
+            labels = list(dict.fromkeys(edge["label"] for edge in edges))
+            label = ", ".join(labels[:BUNDLE_LABELS])
+            if len(labels) > BUNDLE_LABELS:
+                label += f" +{len(labels) - BUNDLE_LABELS} more"
+            self.edges.append(
+                {
+                    "from": from_id,
+                    "to": to_id,
+                    "label": label,
+                    "labels": labels,
+                    "weight": len(edges),
+                }
+            )
+
+    def _incident(self) -> dict[int, list[dict]]:
+        """the edges of each node, other than edges from a node to itself"""
+        incident: dict[int, list[dict]] = defaultdict(list)
+        for edge in self.edges:
+            if edge["from"] != edge["to"]:
+                incident[edge["from"]].append(edge)
+                incident[edge["to"]].append(edge)
+        return incident
+
+    def _rewire(self, key: str):
+        """point the edges marked with key at their cluster instead
+
+        the nodes that are only reached through marked edges are removed.
+        """
+        edges, rewired = [], set()
+        for edge in self.edges:
+            cluster_id = edge.pop(key, None)
+            if cluster_id is None:
+                edges.append(edge)
+                continue
+            cluster = self.clusters[cluster_id]
+            from_id, to_id = edge["from"], edge["to"]
+            inner = {node["id"] for node in cluster["nodes"]}
+            if from_id in inner:
+                from_id = cluster_id
+            else:
+                to_id = cluster_id
+            rewired.add((from_id, to_id, edge["label"]))
+        connected = set()
+        for edge in edges:
+            connected.update((edge["from"], edge["to"]))
+        for cluster in self.clusters.values():
+            for node in cluster["nodes"]:
+                if node["id"] not in connected:
+                    self.nodes.pop(node["id"], None)
+        self.edges = edges + [
+            {"from": from_id, "to": to_id, "label": label}
+            for from_id, to_id, label in sorted(rewired)
+        ]
+
+    def serialization(self, size: int) -> dict:
+        """the reduced serialization
+
+        :param size: the number of nodes before the diagram was reduced.
+        """
+        return {
+            "nodes": list(self.nodes.values()),
+            "edges": self.edges,
+            "clusters": self.clusters,
+            "reduced": {"nodes": size, "omitted": self.omitted},
+        }
+
+
+def reduce_diagram(serialization: dict, thresholds: Thresholds = Thresholds()) -> dict:
+    """the serialization of a diagram, reduced if it has too many nodes to render
+
+    the serialization is returned as it is if it is small enough.
+    otherwise the reduced serialization has "clusters", the nodes and edges
+    that each cluster node stands for by its id, and "reduced", the number
+    of nodes before it was reduced and the number omitted entirely.
+    """
+    size = len(serialization["nodes"])
+    if size <= thresholds.max_nodes:
+        return serialization
+    reduction = Reduction(
+        {
+            "nodes": [dict(node) for node in serialization["nodes"]],
+            "edges": [dict(edge) for edge in serialization["edges"]],
+        }
+    )
+    steps = (
+        reduction.collapse_literals,
+        lambda: reduction.fold_leaves(thresholds.fold_min),
+        lambda: reduction.keep_top(thresholds.top_k),
+    )
+    for step in steps:
+        if len(reduction.nodes) <= thresholds.max_nodes:
+            break
+        step()
+    reduction.bundle_edges()
+    logger.info(
+        f"reduced a diagram of {size} nodes to {len(reduction.nodes)} for rendering"
+    )
+    return reduction.serialization(size)
@@ -1,18 +1,68 @@
 import html
 import json
 import webbrowser
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
 from tempfile import NamedTemporaryFile
+from typing import Iterable, Iterator
 
 from jinja2 import Template
 
+from rdfdig.labels import truncate
+from rdfdig.layout import ITERATIONS, Position, layout
 
-def render_visjs(serialization: dict, overrides: dict) -> None:
+
+def render_visjs(
+    serialization: dict,
+    overrides: dict,
+    layout_name: str = "auto",
+    iterations: int = ITERATIONS,
+) -> None:
     """render the serialization of a Diagram instance using visjs
 
     The rendered template is written to a temp file and opened in
     the default web browser.
     """
+    _open_html(visjs_chunks(serialization, overrides, None, layout_name, iterations))
+
+
+def visjs_html(
+    serialization: dict,
+    overrides: dict,
+    expand_url: str | None = None,
+    layout_name: str = "auto",
+    iterations: int = ITERATIONS,
+) -> str:
+    """the HTML page for the serialization of a Diagram instance using visjs
+
+    see visjs_chunks for the parameters.
+    """
+    return "".join(
+        visjs_chunks(serialization, overrides, expand_url, layout_name, iterations)
+    )
+
+
+def visjs_chunks(
+    serialization: dict,
+    overrides: dict,
+    expand_url: str | None = None,
+    layout_name: str = "auto",
+    iterations: int = ITERATIONS,
+) -> Iterator[str]:
+    """the HTML page of visjs_html, a piece at a time
+
+    :param expand_url: if given, double clicking a node requests the
+        nodes and edges to add from this url with the id of the node as a
+        query parameter, see rdfdig.server.
+    :param layout_name: how to lay the nodes out, one of
+        rdfdig.layout.LAYOUTS. when the nodes are laid out by rdfdig the
+        page is rendered with physics turned off, so it opens settled.
+    :param iterations: the number of iterations of the force layout.
+
+    the clusters of a reduced serialization, see rdfdig.reduction, are
+    shown in place of their node when it is double clicked.
+    """
     options = {
         "edges": {
             "color": {
@@ -57,108 +107,152 @@ def render_visjs(serialization: dict, overrides: dict) -> None:
             },
         },
     }
+    positions = layout(
+        serialization["nodes"], serialization["edges"], layout_name, iterations
+    )
+    if positions is not None:
+        options["physics"] = {"enabled": False}
+        options["layout"] = {"improvedLayout": False}
     for key, value in overrides.items():
         options[key] = value
-    nodes = []
-    for node in serialization["nodes"]:
+    template = _template("visjs.html")
+    return template.generate(
+        nodes=json_array(visjs_nodes(serialization["nodes"], positions)),
+        edges=json_array(visjs_edges(serialization["edges"])),
+        clusters=json.dumps(
+            {
+                cluster_id: {
+                    "nodes": list(visjs_nodes(cluster["nodes"])),
+                    "edges": list(visjs_edges(cluster["edges"])),
+                }
+                for cluster_id, cluster in serialization.get("clusters", {}).items()
+            }
+        ),
+        options=json.dumps(options),
+        expand_url=json.dumps(expand_url),
+    )
+
+
+def visjs_nodes(
+    nodes: Iterable[dict], positions: dict[int, Position] | None = None
+) -> Iterator[dict]:
+    """convert serialized nodes to visjs nodes, one at a time
+
+    :param positions: the x and y of each node, if they have been laid out.
+    """
+    for node in nodes:
         if node["isblank"]:
             group = "bnode"
         elif node["isliteral"]:
             group = "literal"
         else:
             group = "default"
-        nodes.append(
-            {
-                "id": node["id"],
-                "label": (
-                    node["label"]
-                    if len(node["label"]) < 45
-                    else (node["label"][:45] + "...")
-                ),
-                "title": node["label"],
-                "group": group,
-            }
-        )
-    edges = []
+        vis_node = {
+            "id": node["id"],
+            "label": truncate(node["label"]),
+            "title": node["label"],
+            "group": group,
+        }
+        if positions is not None:
+            vis_node["x"], vis_node["y"] = positions[node["id"]]
+        yield vis_node
+
+
+def visjs_edges(edges: Iterable[dict]) -> Iterator[dict]:
+    """convert serialized edges to visjs edges, one at a time
+
+    the labels of edges between the same pair of nodes are combined.
+    """
     pairs = {}
-    for edge in serialization["edges"]:
+    for edge in edges:
         pair = hash(edge["from"]) + hash(edge["to"])
         title, width = pairs.get(pair, ("", 1))
         if title:
             title += "\n"
         title += edge["label"]
-        width += 0.5
-        edges.append(
-            {
-                "from": edge["from"],
-                "to": edge["to"],
-                "title": title,
-                "physics": {"enabled": False},
-                "width": width,
-            }
-        )
+        width += 0.5 * edge.get("weight", 1)
         pairs[pair] = (title, width)
-    template_path = Path(__file__).parent / "templates" / "visjs.html"
-    template = Template(template_path.read_text())
-    tempfile = NamedTemporaryFile(mode="w", suffix=".html", delete=False)
-    tempfile.write(
-        template.render(
-            nodes=json.dumps(nodes),
-            edges=json.dumps(edges),
-            options=json.dumps(options),
-        )
-    )
-    tempfile.close()
-    webbrowser.open_new_tab(f"file:///{tempfile.name}")
-    return
+        yield {
+            "from": edge["from"],
+            "to": edge["to"],
+            "title": title,
+            "physics": {"enabled": False},
+            "width": width,
+        }
 
 
 def render_mermaid(serialization: dict, overrides: dict) -> None:
-    options = {}
-    for key, value in overrides:
-        options[key] = value
-    mermaid = """
-    %%{init: {"flowchart": {"defaultRenderer": "elk"}} }%%
-    flowchart LR
-        classDef default fill:#efefef,stroke:#808080
-        classDef bnode fill:#ffffff,stroke:#808080
-        classDef literal fill:#ffffff,stroke:#808080
+    """render the serialization of a Diagram instance using mermaid
+
+    The rendered template is written to a temp file and opened in
+    the default web browser.
     """
+    _open_html(mermaid_chunks(serialization, overrides))
+
+
+def mermaid_html(serialization: dict, overrides: dict) -> str:
+    """the HTML page for the serialization of a Diagram instance using mermaid"""
+    return "".join(mermaid_chunks(serialization, overrides))
 
-    def id_str(id: int) -> str:
-        if id > 0:
-            return "A" + str(id)
-        return "B" + str(id)[1:]
 
+def mermaid_chunks(serialization: dict, overrides: dict) -> Iterator[str]:
+    """the HTML page of mermaid_html, a piece at a time"""
+    template = _template("mermaid.html")
+    lines = mermaid_text(serialization)
+    return template.generate(mermaid=(html.escape(line, quote=False) for line in lines))
+
+
+def _mermaid_id(node_id: int) -> str:
+    if node_id > 0:
+        return "A" + str(node_id)
+    return "B" + str(node_id)[1:]
+
+
+def _mermaid_label(label: str) -> str:
+    return label.replace('"', "#quot;")
+
+
+def mermaid_text(serialization: dict) -> Iterator[str]:
+    """the mermaid flowchart of the serialization of a Diagram, a line at a time"""
+    yield '%%{init: {"flowchart": {"defaultRenderer": "elk"}} }%%\n'
+    yield "flowchart LR\n"
+    yield "    classDef default fill:#efefef,stroke:#808080\n"
+    yield "    classDef bnode fill:#ffffff,stroke:#808080\n"
+    yield "    classDef literal fill:#ffffff,stroke:#808080\n"
     for node in serialization["nodes"]:
-        node_id = id_str(node["id"])
-        label = html.escape(node["label"]).replace("&quot;", "#quot;")
+        node_id = _mermaid_id(node["id"])
+        label = _mermaid_label(node["label"])
         if node["isblank"]:
-            mermaid += f"""
-            {node_id}(("bnode"))
-            class {node_id} bnode
-            """
+            yield f'    {node_id}(("bnode"))\n    class {node_id} bnode\n'
         elif node["isliteral"]:
-            mermaid += f"""
-            {node_id}["{label}"]
-            class {node_id} literal
-            """
+            yield f'    {node_id}["{label}"]\n    class {node_id} literal\n'
         else:
-            mermaid += f"""
-            {node_id}("{label}")
-            class {node_id} default
-            """
+            yield f'    {node_id}("{label}")\n    class {node_id} default\n'
     for edge in serialization["edges"]:
-        from_id = id_str(edge["from"])
-        to_id = id_str(edge["to"])
-        label = html.escape(edge["label"])
-        mermaid += f"""
-        {from_id} -->|"{label}"|{to_id}
-        """
-    template_path = Path(__file__).parent / "templates" / "mermaid.html"
-    template = Template(template_path.read_text())
-    tempfile = NamedTemporaryFile(mode="w", suffix=".html", delete=False)
-    tempfile.write(template.render(mermaid=mermaid))
-    tempfile.close()
+        from_id, to_id = _mermaid_id(edge["from"]), _mermaid_id(edge["to"])
+        yield f'    {from_id} -->|"{_mermaid_label(edge["label"])}"|{to_id}\n'
+
+
+@lru_cache(maxsize=None)
+def _template(name: str) -> Template:
+    """the compiled template of the file name in rdfdig/templates, compiled once"""
+    return Template((Path(__file__).parent / "templates" / name).read_text())
+
+
+def json_array(items: Iterable, batch: int = 1000) -> Iterator[str]:
+    """the JSON array of items, batch items at a time, as json.dumps writes it"""
+    yield "["
+    items = iter(items)
+    separator = ""
+    while group := list(islice(items, batch)):
+        # dump a batch at once and drop its brackets
+        yield separator + json.dumps(group)[1:-1]
+        separator = ", "
+    yield "]"
+
+
+def _open_html(chunks: Iterable[str]) -> None:
+    """write a page to a temp file and open it in the default web browser"""
+    with NamedTemporaryFile(mode="w", suffix=".html", delete=False) as tempfile:
+        tempfile.writelines(chunks)
     webbrowser.open_new_tab(f"file:///{tempfile.name}")
-    return
@@ -0,0 +1,314 @@
+import gzip
+import json
+import logging
+import threading
+import time
+import webbrowser
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+from urllib.parse import parse_qs, urlparse
+
+from rdfdig.core import Diagram
+from rdfdig.renderers import visjs_edges, visjs_html, visjs_nodes
+
+logger = logging.getLogger(__name__)
+
+
+class DiagramServer(ThreadingHTTPServer):
+    """serves a parsed Diagram from a local rdfdig process
+
+    :param diagram: the diagram to serve.
+    :param lock: held while the diagram is read or changed, as the store
+        is not safe to use from many request threads at once.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], diagram: Diagram):
+        super().__init__(address, DiagramHandler)
+        self.diagram = diagram
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # keep connections open between requests
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        route = self.routes.get(url.path)
+        if route is None:
+            self.send_error(404)
+            return
+        try:
+            route(self, params)
+        except (KeyError, ValueError) as e:
+            self.send_error(400, explain=f"invalid request: {e}")
+
+    def send_body(
+        self,
+        body: bytes,
+        content_type: str,
+        encoding: str | None = None,
+        vary: str | None = None,
+    ):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+        if vary is not None:
+            # the request headers body was chosen by, so caches keep apart
+            # the variants of a URL
+            self.send_header("Vary", vary)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class DiagramHandler(_Handler):
+    """answers requests to a DiagramServer
+
+    GET /               the diagram as a visjs page that expands nodes on double click
+    GET /expand?id=N    the visjs nodes and edges to add when node N is expanded
+    """
+
+    server: DiagramServer
+
+    def send_page(self, params: dict[str, str]):
+        diagram = self.server.diagram
+        with self.server.lock:
+            diagram.serialize()
+            page = visjs_html(
+                diagram.reduced(),
+                diagram.overrides,
+                "/expand",
+                layout_name=diagram.layout,
+                iterations=diagram.layout_iterations,
+            )
+        self.send_body(page.encode(), "text/html; charset=utf-8")
+
+    def send_expansion(self, params: dict[str, str]):
+        node_id = int(params["id"])
+        depth = int(params.get("depth", 1))
+        with self.server.lock:
+            try:
+                delta = self.server.diagram.expand(node_id, depth=depth)
+            except KeyError:
+                self.send_error(404, explain=f"no instance node with id {node_id}")
+                return
+        body = {
+            "nodes": list(visjs_nodes(delta["nodes"])),
+            "edges": list(visjs_edges(delta["edges"])),
+        }
+        self.send_body(json.dumps(body).encode(), "application/json")
+
+    routes = {"/": send_page, "/expand": send_expansion}
+
+
+def explore(diagram: Diagram, port: int = 0, open_browser: bool = True):
+    """serve an instance diagram locally and open it in the browser
+
+    double clicking a node in the page adds its neighbourhood to the
+    diagram, see Diagram.expand. blocks until interrupted.
+
+    :param port: the port to listen on, any free port if 0.
+    """
+    server = DiagramServer(("127.0.0.1", port), diagram)
+    logger.warning(f"serving diagram at {server.url}, press Ctrl+C to stop")
+    if open_browser:
+        webbrowser.open_new_tab(server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """whether an Accept-Encoding header accepts a gzip body
+
+    gzip is accepted if it, or failing that *, is listed with a q-value
+    above 0. a coding without a q-value has a q-value of 1.
+    """
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+# the content type of each rendered view
+VIEW_FORMATS = {
+    "json": "application/json",
+    "compact": "application/json",
+    "visjs": "text/html; charset=utf-8",
+    "mermaid": "text/html; charset=utf-8",
+}
+
+
+class ViewServer(ThreadingHTTPServer):
+    """serves class and instance views of data that is loaded once
+
+    rendered views are kept in a least recently used cache of views, which
+    is emptied when the data is reloaded.
+
+    :param load: returns a class Diagram of the sources, called at start
+        up and on every reload.
+    :param max_views: the number of rendered views to keep.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        load: Callable[[], Diagram],
+        max_views: int = 256,
+    ):
+        super().__init__(address, ViewHandler)
+        self.load = load
+        self.max_views = max_views
+        self.views: OrderedDict[tuple, bytes] = OrderedDict()
+        self.views_lock = threading.Lock()
+        # held while the store is read or changed, views are rendered one at a time
+        self.lock = threading.Lock()
+        self.diagram = load()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reload(self):
+        """load the sources again and forget the rendered views
+
+        no views are rendered while the sources are loaded, as a store
+        database is emptied before it is loaded again, but cached views are
+        still served. the store of the previous diagram is closed.
+        """
+        with self.lock:
+            diagram = self.load()
+            with self.views_lock:
+                previous, self.diagram = self.diagram, diagram
+                self.views.clear()
+            previous.close()
+        logger.info("reloaded sources")
+
+    def view(
+        self,
+        format: str,
+        iri: str | None = None,
+        depth: int = 1,
+        max_nodes: int | None = None,
+        max_edges: int | None = None,
+        compress: bool = False,
+    ) -> bytes:
+        """the class view, or the instance view of iri, rendered in format
+
+        :param compress: gzip the view, it is cached gzipped.
+        """
+        if format not in VIEW_FORMATS:
+            raise ValueError(f"unknown format {format}")
+        key = (format, iri, depth, max_nodes, max_edges, compress)
+        with self.views_lock:
+            body = self.views.get(key)
+            if body is not None:
+                self.views.move_to_end(key)
+                return body
+        # cached views are still served while this one is rendered
+        with self.lock:
+            diagram = self.diagram
+            if iri:
+                diagram = diagram.focus(
+                    iri, depth=depth, max_nodes=max_nodes, max_edges=max_edges
+                )
+            body = "".join(diagram.chunks(format)).encode()
+            if compress:
+                body = gzip.compress(body)
+            with self.views_lock:
+                self.views[key] = body
+                if len(self.views) > self.max_views:
+                    self.views.popitem(last=False)
+        return body
+
+
+class ViewHandler(_Handler):
+    """answers requests to a ViewServer
+
+    GET /json, /compact, /visjs     a view. the class view by default, or the
+        or /mermaid                 instance view of the iri query parameter,
+                                    with optional depth, max_nodes and max_edges.
+                                    gzipped if the client accepts it.
+    POST /reload                    load the sources again.
+    """
+
+    server: ViewServer
+
+    def send_view(self, params: dict[str, str]):
+        format = self.path.split("?")[0].strip("/")
+        max_nodes, max_edges = params.get("max_nodes"), params.get("max_edges")
+        compress = accepts_gzip(self.headers.get("Accept-Encoding", ""))
+        body = self.server.view(
+            format,
+            iri=params.get("iri"),
+            depth=int(params.get("depth", 1)),
+            max_nodes=int(max_nodes) if max_nodes else None,
+            max_edges=int(max_edges) if max_edges else None,
+            compress=compress,
+        )
+        self.send_body(
+            body,
+            VIEW_FORMATS[format],
+            "gzip" if compress else None,
+            vary="Accept-Encoding",
+        )
+
+    routes = dict.fromkeys([f"/{format}" for format in VIEW_FORMATS], send_view)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/reload":
+            self.send_error(404)
+            return
+        started = time.perf_counter()
+        self.server.reload()
+        body = json.dumps({"seconds": round(time.perf_counter() - started, 3)})
+        self.send_body(body.encode(), "application/json")
+
+
+def serve(
+    load: Callable[[], Diagram],
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    max_views: int = 256,
+):
+    """load a diagram once and serve views of it over HTTP until interrupted
+
+    see ViewHandler for the requests that are answered.
+    """
+    server = ViewServer((host, port), load, max_views=max_views)
+    logger.warning(f"serving diagrams at {server.url}, press Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,284 @@
+"""An rdflib store kept in a SQLite database on disk.
+
+lets rdfdig diagram data that does not fit in memory, and reopen data that
+has already been loaded without parsing it again. a database is emptied
+before sources are loaded into it again, so it only ever holds the
+statements of the last sources loaded. otherwise the statements about
+blank nodes, which are named afresh by each parse, would be added again
+every time.
+"""
+
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.store import NO_STORE, VALID_STORE, Store
+from rdflib.term import Node as Term
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+create table if not exists terms (
+    id integer primary key,
+    kind text not null,
+    value text not null,
+    datatype text not null,
+    lang text not null,
+    unique (value, kind, datatype, lang)
+);
+create table if not exists triples (
+    s integer not null,
+    p integer not null,
+    o integer not null,
+    primary key (s, p, o)
+) without rowid;
+create index if not exists triples_pos on triples (p, o, s);
+create index if not exists triples_osp on triples (o, s, p);
+create table if not exists namespaces (
+    prefix text primary key,
+    namespace text not null
+);
+"""
+
+# number of statements added in each transaction by addN
+BATCH_SIZE = 50_000
+
+
+class SQLiteStore(Store):
+    """A triple store in a SQLite database, indexed by subject, predicate and object.
+
+    terms are held once each in a terms table and statements as rows of
+    three term ids, with indexes on (s, p, o), (p, o, s) and (o, s, p) so
+    that any pattern is answered by an index. statements are held in a
+    single graph. the store says it is context aware so that parsers of
+    quad formats, such as JSON-LD, can add to it, but the context of a
+    statement is not kept.
+
+    a connection is only used by one thread at a time, as with the in
+    memory store the caller must not use it from several threads at once.
+
+    :param configuration: the path of the database file.
+    :param cache_size: number of term ids to keep in memory while adding.
+    """
+
+    context_aware = True
+    formula_aware = False
+    graph_aware = False
+    transaction_aware = False
+
+    def __init__(self, configuration: str | Path | None = None, cache_size=100_000):
+        self._connection: sqlite3.Connection | None = None
+        self.path: Path | None = None
+        self._ids: dict[tuple[str, str, str, str], int] = {}
+        self._cache_size = cache_size
+        # the number of statements, counted when first asked for
+        self._count: int | None = None
+        # statements added but not yet written, see add()
+        self._pending: list[tuple[Term, Term, Term]] = []
+        super().__init__(configuration)
+
+    def open(self, configuration: str | Path, create: bool = True) -> int | None:
+        """open the database at configuration, creating it if create is True"""
+        path = Path(configuration)
+        if not create and not path.exists():
+            return NO_STORE
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(
+            "pragma journal_mode = wal; pragma synchronous = normal;" + SCHEMA
+        )
+        return VALID_STORE
+
+    def clear(self):
+        """remove every statement and term, the namespace bindings are kept"""
+        self._pending = []
+        with self._connection:
+            self._connection.execute("delete from triples")
+            self._connection.execute("delete from terms")
+        self._ids.clear()
+        self._count = 0
+
+    def close(self, commit_pending_transaction: bool = False):
+        if self._connection is not None:
+            self.commit()
+            self._connection.close()
+            self._connection = None
+
+    @staticmethod
+    def _key(term: Term) -> tuple[str, str, str, str]:
+        """the (value, kind, datatype, lang) row of term in the terms table"""
+        if isinstance(term, Literal):
+            return str(term), "l", str(term.datatype or ""), term.language or ""
+        if isinstance(term, BNode):
+            return str(term), "b", "", ""
+        return str(term), "u", "", ""
+
+    @staticmethod
+    def _term(value: str, kind: str, datatype: str, lang: str) -> Term:
+        if kind == "l":
+            return Literal(value, lang=lang or None, datatype=datatype or None)
+        if kind == "b":
+            return BNode(value)
+        return URIRef(value)
+
+    def _lookup(self, term: Term) -> int | None:
+        """the id of term or None if it is not in the store"""
+        key = self._key(term)
+        term_id = self._ids.get(key)
+        if term_id is None:
+            row = self._connection.execute(
+                "select id from terms where value = ? and kind = ? and datatype = ? "
+                "and lang = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            term_id = self._remember(key, row[0])
+        return term_id
+
+    def _encode(self, term: Term) -> int:
+        """the id of term, adding it to the terms table if needed"""
+        term_id = self._lookup(term)
+        if term_id is None:
+            key = self._key(term)
+            cursor = self._connection.execute(
+                "insert into terms (value, kind, datatype, lang) values (?, ?, ?, ?)",
+                key,
+            )
+            term_id = self._remember(key, cursor.lastrowid)
+        return term_id
+
+    def _remember(self, key: tuple[str, str, str, str], term_id: int) -> int:
+        if len(self._ids) >= self._cache_size:
+            self._ids.clear()
+        self._ids[key] = term_id
+        return term_id
+
+    def add(self, triple, context, quoted: bool = False):
+        """add a statement. it is written with the next BATCH_SIZE statements"""
+        self._pending.append(triple)
+        if len(self._pending) >= BATCH_SIZE:
+            self.commit()
+
+    def addN(self, quads: Iterable):
+        """add statements in transactions of BATCH_SIZE"""
+        for subj, pred, obj, _ in quads:
+            self._pending.append((subj, pred, obj))
+            if len(self._pending) >= BATCH_SIZE:
+                self.commit()
+        self.commit()
+
+    def commit(self):
+        """write the statements that have been added but not yet written"""
+        if not self._pending:
+            return
+        encode = self._encode
+        with self._connection:
+            cursor = self._connection.executemany(
+                "insert or ignore into triples values (?, ?, ?)",
+                [(encode(s), encode(p), encode(o)) for s, p, o in self._pending],
+            )
+        if self._count is not None:
+            self._count += cursor.rowcount
+        self._pending = []
+
+    def _where(self, triple_pattern, table: str = "") -> tuple[str, list[int]] | None:
+        """the where clause and parameters of a pattern, None if it cannot match"""
+        clauses, params = [], []
+        for column, term in zip("spo", triple_pattern):
+            if term is None:
+                continue
+            term_id = self._lookup(term)
+            if term_id is None:
+                return None
+            clauses.append(f"{table}{column} = ?")
+            params.append(term_id)
+        return (" where " + " and ".join(clauses) if clauses else ""), params
+
+    def remove(self, triple_pattern, context=None):
+        self.commit()
+        where = self._where(triple_pattern)
+        if where is None:
+            return
+        clause, params = where
+        with self._connection:
+            cursor = self._connection.execute(f"delete from triples{clause}", params)
+        if self._count is not None:
+            self._count -= cursor.rowcount
+
+    def triples(self, triple_pattern, context=None) -> Iterator:
+        self.commit()
+        where = self._where(triple_pattern, table="t.")
+        if where is None:
+            return
+        clause, params = where
+        cursor = self._connection.execute(
+            "select s.value, s.kind, s.datatype, s.lang, "
+            "p.value, p.kind, p.datatype, p.lang, "
+            "o.value, o.kind, o.datatype, o.lang "
+            "from triples t join terms s on s.id = t.s join terms p on p.id = t.p "
+            f"join terms o on o.id = t.o{clause}",
+            params,
+        )
+        for row in cursor:
+            triple = tuple(
+                term if term is not None else self._term(*row[i * 4 : i * 4 + 4])
+                for i, term in enumerate(triple_pattern)
+            )
+            yield triple, iter(())
+
+    def __len__(self, context=None) -> int:
+        self.commit()
+        if self._count is None:
+            query = "select count(*) from triples"
+            self._count = self._connection.execute(query).fetchone()[0]
+        return self._count
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix: str, namespace: URIRef, override: bool = True):
+        bound = self.prefix(namespace), self.namespace(prefix)
+        if not override and bound != (None, None):
+            return
+        with self._connection:
+            self._connection.execute(
+                "delete from namespaces where namespace = ?", (str(namespace),)
+            )
+            self._connection.execute(
+                "insert or replace into namespaces values (?, ?)",
+                (prefix, str(namespace)),
+            )
+
+    def namespace(self, prefix: str) -> URIRef | None:
+        row = self._connection.execute(
+            "select namespace from namespaces where prefix = ?", (prefix,)
+        ).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def prefix(self, namespace: URIRef) -> str | None:
+        row = self._connection.execute(
+            "select prefix from namespaces where namespace = ?", (str(namespace),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def namespaces(self) -> Iterator[tuple[str, URIRef]]:
+        rows = self._connection.execute("select prefix, namespace from namespaces")
+        for prefix, namespace in rows.fetchall():
+            yield prefix, URIRef(namespace)
+
+
+def open_store(path: Path, clear: bool = False) -> Graph:
+    """a graph kept in a SQLite database at path, with the statements it holds
+
+    :param clear: remove the statements it holds, to load sources into it again.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    logger.info(f"opening store at {path}")
+    store = SQLiteStore(path)
+    if clear:
+        logger.info(f"removing the statements in {path}")
+        store.clear()
+    return Graph(store=store)
@@ -0,0 +1,655 @@
+import asyncio
+import hashlib
+import heapq
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.namespace import RDF, XSD
+from rdflib.term import Node as Term
+
+from rdfdig.cache import ResponseCache
+from rdfdig.loaders import (
+    async_sparql_client,
+    async_sparql_select,
+    split_file,
+    stream_file,
+)
+
+logger = logging.getLogger(__name__)
+
+BNODE_KLASS = URIRef("bnode")
+
+# the implementations of class summaries. numpy is rdfdig.columnar
+BACKENDS = ("python", "numpy")
+
+
+class Support(NamedTuple):
+    """The number of statements behind a connection of a sampled summary.
+
+    :param count: the number of statements, estimated from the sample if
+        not exhaustive.
+    :param exhaustive: True if every instance of the class was looked at.
+    """
+
+    count: int
+    exhaustive: bool
+
+
+# maps a resource to the tuple of its rdf:type's, in the order the store yields them.
+# the first type is the one used when the resource is on the "other" end of a statement.
+TypeIndex = dict[Term, tuple[Term, ...]]
+
+
+class ClassSummary:
+    """Class level connections accumulated from a stream of triples.
+
+    classes, datatypes and predicates are held as rdflib terms rather than
+    Node and Edge objects so that partial summaries can be built separately
+    and merged with update() before they are labelled by a Diagram.
+
+    :param klasses: objects of rdf:type statements. shown as default nodes.
+    :param datatypes: datatypes of literal objects. shown as literal nodes.
+    :param blank: True if an untyped blank node was connected to a class.
+    :param connections: (from class, predicate, to class) triples.
+    :param support: the Support of each connection. only for sampled summaries.
+    """
+
+    def __init__(self):
+        self.klasses: set[Term] = set()
+        self.datatypes: set[URIRef] = set()
+        self.blank: bool = False
+        self.connections: set[tuple[Term | None, URIRef, Term | None]] = set()
+        self.support: dict[tuple[Term | None, URIRef, Term | None], Support] = {}
+
+    def add(self, subj: Term, pred: URIRef, obj: Term, types: TypeIndex):
+        """summarize a single statement using the given type index"""
+        if pred == RDF.type:
+            self.klasses.add(obj)
+        subj_types = types.get(subj, ())
+        # outgoing connection from each class of the subject
+        if subj_types and pred != RDF.type:
+            if isinstance(obj, Literal):
+                obj_klass = obj.datatype if obj.datatype else XSD.string
+                self.datatypes.add(obj_klass)
+            else:
+                obj_klass = self._klass_of(obj, types)
+            for klass in subj_types:
+                self.connections.add((klass, pred, obj_klass))
+        # incoming connection to each class of the object
+        obj_types = types.get(obj, ())
+        if obj_types:
+            subj_klass = self._klass_of(subj, types)
+            for klass in obj_types:
+                self.connections.add((subj_klass, pred, klass))
+
+    def _klass_of(self, term: Term, types: TypeIndex) -> Term | None:
+        """the class a resource is shown as when it is not the focus of a statement"""
+        term_types = types.get(term)
+        if term_types:
+            return term_types[0]
+        if isinstance(term, BNode):
+            self.blank = True
+            return BNODE_KLASS
+        return None
+
+    def update(self, other: "ClassSummary"):
+        """merge another summary into this one"""
+        self.klasses |= other.klasses
+        self.datatypes |= other.datatypes
+        self.blank = self.blank or other.blank
+        self.connections |= other.connections
+        for connection, support in other.support.items():
+            self.add_support(connection, support)
+
+    def add_support(self, connection: tuple, support: Support):
+        """record the support of a connection seen from one of its classes
+
+        a connection between two classes is seen from both when both are
+        sampled. an exhaustive count is kept over an estimate, otherwise
+        the larger estimate is kept.
+        """
+        self.connections.add(connection)
+        current = self.support.get(connection)
+        if current is None or (support.exhaustive, support.count) > (
+            current.exhaustive,
+            current.count,
+        ):
+            self.support[connection] = support
+
+
+def build_type_index(graph: Graph) -> TypeIndex:
+    """index the rdf:type's of every typed resource in graph
+
+    identical type tuples are shared between resources to keep the index small.
+    """
+    interned: dict[tuple[Term, ...], tuple[Term, ...]] = {}
+    index: TypeIndex = {}
+    for subj in graph.subjects(RDF.type, unique=True):
+        subj_types = tuple(graph.objects(subj, RDF.type))
+        index[subj] = interned.setdefault(subj_types, subj_types)
+    return index
+
+
+def index_types(triples: Iterable[tuple[Term, URIRef, Term]]) -> TypeIndex:
+    """index the rdf:type's of every typed resource in a stream of triples
+
+    types are kept in the order they are first seen, which is the order an
+    in memory store would yield them in after loading the same stream.
+    """
+    interned: dict[tuple[Term, ...], tuple[Term, ...]] = {}
+    index: TypeIndex = {}
+    for subj, pred, obj in triples:
+        if pred != RDF.type:
+            continue
+        subj_types = index.get(subj, ())
+        if obj not in subj_types:
+            subj_types = subj_types + (obj,)
+            index[subj] = interned.setdefault(subj_types, subj_types)
+    return index
+
+
+def summarize(
+    triples: Iterable[tuple[Term, URIRef, Term]], types: TypeIndex
+) -> ClassSummary:
+    """summarize triples to class level connections in a single pass"""
+    summary = ClassSummary()
+    for subj, pred, obj in triples:
+        summary.add(subj, pred, obj, types)
+    return summary
+
+
+def summarize_graph(
+    graph: Graph, backend: str = "python", sample: int | None = None
+) -> ClassSummary:
+    """build a type index for graph and then summarize all of its triples
+
+    :param backend: one of BACKENDS.
+    :param sample: look at no more than this many instances of each class,
+        see summarize_sample. the backend is not used when sampling.
+    """
+    if sample is not None:
+        return summarize_sample(graph, sample)
+    if backend == "numpy":
+        from rdfdig.columnar import graph_triples, summarize_columnar
+
+        return summarize_columnar(graph_triples(graph))
+    return summarize(graph.triples((None, None, None)), build_type_index(graph))
+
+
+def sample_key(term: Term) -> bytes:
+    """the order instances are sampled in, the same in every run for IRIs"""
+    return hashlib.blake2b(str(term).encode(), digest_size=8).digest()
+
+
+def check_sample(sample: int):
+    """:raises ValueError: if sample is not a number of instances to look at"""
+    if sample < 1:
+        raise ValueError(f"sample must be at least 1, not {sample}")
+
+
+def sample_instances(graph: Graph, sample: int) -> dict[Term, tuple[int, list[Term]]]:
+    """choose up to sample instances of each class in graph
+
+    the instances with the smallest sample_key are chosen, so the same
+    instances are chosen for the same data. only the rdf:type statements
+    are read.
+
+    :returns: the number of instances of each class and those chosen.
+    :raises ValueError: if sample is less than 1.
+    """
+    check_sample(sample)
+    # a max heap, by negated key, of the chosen instances of each class
+    chosen: dict[Term, list[tuple[bytes, Term]]] = {}
+    counts: dict[Term, int] = {}
+    for instance, _, klass in graph.triples((None, RDF.type, None)):
+        counts[klass] = counts.get(klass, 0) + 1
+        heap = chosen.setdefault(klass, [])
+        key = bytes(255 - b for b in sample_key(instance))
+        if len(heap) < sample:
+            heapq.heappush(heap, (key, instance))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, instance))
+    return {
+        klass: (counts[klass], [instance for _, instance in heap])
+        for klass, heap in chosen.items()
+    }
+
+
+def summarize_sample(graph: Graph, sample: int) -> ClassSummary:
+    """summarize the statements about up to sample instances of each class
+
+    gives a sketch of the class diagram in time bounded by the number of
+    classes rather than the size of the data. the statements of each chosen
+    instance are found by index lookups, and the class of the resource on
+    the other end of each statement is looked up as it is needed.
+
+    every connection is given a Support, which is exhaustive if every
+    instance of the class was chosen, otherwise the count of statements
+    seen scaled up by the fraction of instances chosen. with sample at
+    least the size of the largest class the connections are the same as
+    summarize_graph gives.
+
+    :raises ValueError: if sample is less than 1.
+    """
+    summary = ClassSummary()
+    first_types: dict[Term, Term | None] = {}
+
+    def klass_of(term: Term) -> Term | None:
+        if term not in first_types:
+            first_types[term] = next(graph.objects(term, RDF.type), None)
+        klass = first_types[term]
+        if klass is None and isinstance(term, BNode):
+            summary.blank = True
+            return BNODE_KLASS
+        return klass
+
+    for klass, (count, instances) in sample_instances(graph, sample).items():
+        summary.klasses.add(klass)
+        seen: dict[tuple, int] = {}
+        for instance in instances:
+            # outgoing connections from the class
+            for pred, obj in graph.predicate_objects(instance):
+                if pred == RDF.type:
+                    continue
+                if isinstance(obj, Literal):
+                    obj_klass = obj.datatype if obj.datatype else XSD.string
+                    summary.datatypes.add(obj_klass)
+                else:
+                    obj_klass = klass_of(obj)
+                connection = (klass, pred, obj_klass)
+                seen[connection] = seen.get(connection, 0) + 1
+            # incoming connections to the class
+            for subj, pred in graph.subject_predicates(instance):
+                connection = (klass_of(subj), pred, klass)
+                seen[connection] = seen.get(connection, 0) + 1
+        exhaustive = len(instances) == count
+        for connection, n in seen.items():
+            estimate = round(n * count / len(instances))
+            summary.add_support(connection, Support(estimate, exhaustive))
+    return summary
+
+
+def merge_type_indexes(indexes: Iterable[TypeIndex]) -> TypeIndex:
+    """merge partial type indexes, in order, as if they had been built from one stream"""
+    interned: dict[tuple[Term, ...], tuple[Term, ...]] = {}
+    merged: TypeIndex = {}
+    for index in indexes:
+        for subj, subj_types in index.items():
+            existing = merged.get(subj)
+            if existing is not None:
+                subj_types = existing + tuple(
+                    t for t in subj_types if t not in existing
+                )
+            merged[subj] = interned.setdefault(subj_types, subj_types)
+    return merged
+
+
+class _Shard(NamedTuple):
+    path: Path
+    scope: str
+    start: int
+    end: int | None
+
+    def stream(self, graph: str | None, contains: str | None = None):
+        return stream_file(
+            self.path,
+            scope=self.scope,
+            graph=graph,
+            contains=contains,
+            start=self.start,
+            end=self.end,
+        )
+
+
+# the merged type index, handed to each worker process by _init_worker
+_worker_types: TypeIndex = {}
+
+
+def _init_worker(types: TypeIndex):
+    global _worker_types
+    _worker_types = types
+
+
+def _index_shard(shard: _Shard, graph: str | None) -> TypeIndex:
+    return index_types(shard.stream(graph, contains=RDF.type.n3()))
+
+
+def _summarize_shard(shard: _Shard, graph: str | None) -> ClassSummary:
+    return summarize(shard.stream(graph), _worker_types)
+
+
+def summarize_files(
+    paths: list[Path],
+    graph: str | None = None,
+    jobs: int = 1,
+    shard_size: int = 64 * 1024**2,
+    backend: str = "python",
+) -> ClassSummary:
+    """summarize N-Triples or N-Quads files without loading them into memory
+
+    the files are read twice. once for the rdf:type statements, to build the
+    type index, and then again to summarize every statement. only the type
+    index and the summary are held in memory.
+
+    with more than one job the files are split into shards of about
+    shard_size bytes, on line boundaries, and each pass is spread over a pool
+    of processes. the partial type indexes are merged in file order before
+    the second pass so types declared in one shard apply in every other
+    shard, and the result is identical to summarizing with a single job.
+
+    with the numpy backend the files are read once, in this process, into
+    integer columns. see rdfdig.columnar.
+
+    :param graph: restrict N-Quads files to statements in this named graph.
+    :param jobs: number of processes to use. not used by the numpy backend.
+    :param shard_size: approximate size in bytes of the shards given to each process.
+    :param backend: one of BACKENDS.
+    """
+    if backend == "numpy":
+        from rdfdig.columnar import summarize_columnar
+
+        logger.info(f"encoding statements in {len(paths)} file(s)")
+        return summarize_columnar(
+            chain.from_iterable(
+                stream_file(path, scope=f"f{i}b", graph=graph)
+                for i, path in enumerate(paths)
+            )
+        )
+    shards = [
+        _Shard(path, f"f{i}b", start, end)
+        for i, path in enumerate(paths)
+        for start, end in (split_file(path, shard_size) if jobs > 1 else [(0, None)])
+    ]
+    logger.info(f"indexing rdf:type statements in {len(paths)} file(s)")
+    if jobs <= 1:
+        types = merge_type_indexes(_index_shard(shard, graph) for shard in shards)
+        logger.info(f"summarizing statements about {len(types):,} typed resources")
+        return summarize(
+            chain.from_iterable(shard.stream(graph) for shard in shards), types
+        )
+    graphs = [graph] * len(shards)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        types = merge_type_indexes(executor.map(_index_shard, shards, graphs))
+    logger.info(
+        f"summarizing statements about {len(types):,} typed resources in {len(shards)} shards"
+    )
+    summary = ClassSummary()
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(types,)
+    ) as executor:
+        for partial in executor.map(_summarize_shard, shards, graphs):
+            summary.update(partial)
+    return summary
+
+
+# aggregate queries that summarize a SPARQL endpoint in place of the local
+# type index. each yields rows of (?sType ?p ?oType), where an unbound class
+# is an untyped resource. {from_clause} restricts them to a named graph.
+SPARQL_SUMMARY_QUERIES = {
+    "classes": """
+        select distinct ?oType {from_clause}
+        where {{ ?s a ?oType . }}
+    """,
+    "typed": """
+        select distinct ?sType ?p ?oType {from_clause}
+        where {{ ?s a ?sType ; ?p ?o . ?o a ?oType . }}
+    """,
+    "datatypes": """
+        select distinct ?sType ?p ?oType {from_clause}
+        where {{
+            ?s a ?sType ; ?p ?o .
+            filter (isliteral(?o))
+            bind (datatype(?o) as ?oType)
+        }}
+    """,
+    "untyped objects": """
+        select distinct ?sType ?p ?isblank {from_clause}
+        where {{
+            ?s a ?sType ; ?p ?o .
+            filter (!isliteral(?o) && ?p != rdf:type)
+            filter not exists {{ ?o a ?oType }}
+            bind (isblank(?o) as ?isblank)
+        }}
+    """,
+    "untyped subjects": """
+        select distinct ?p ?oType ?isblank {from_clause}
+        where {{
+            ?s ?p ?o .
+            ?o a ?oType .
+            filter not exists {{ ?s a ?sType }}
+            bind (isblank(?s) as ?isblank)
+        }}
+    """,
+}
+
+
+# queries for a sampled summary of a SPARQL endpoint. "class counts" counts
+# the instances of each class, the others count the statements about up to
+# {sample} instances of the class {klass}, grouped by the class of the other end.
+SPARQL_SAMPLE_QUERIES = {
+    "class counts": """
+        select ?klass (count(distinct ?s) as ?n) {from_clause}
+        where {{ ?s a ?klass . }}
+        group by ?klass
+    """,
+    "outgoing": """
+        select ?p ?oType ?isliteral ?isblank (count(*) as ?n) {from_clause}
+        where {{
+            {{ select distinct ?s where {{ ?s a {klass} . }} limit {sample} }}
+            ?s ?p ?o .
+            filter (?p != rdf:type)
+            optional {{ ?o a ?type . }}
+            bind (if(isliteral(?o), datatype(?o), ?type) as ?oType)
+            bind (isliteral(?o) as ?isliteral)
+            bind (isblank(?o) as ?isblank)
+        }}
+        group by ?p ?oType ?isliteral ?isblank
+    """,
+    "incoming": """
+        select ?p ?sType ?isblank (count(*) as ?n) {from_clause}
+        where {{
+            {{ select distinct ?o where {{ ?o a {klass} . }} limit {sample} }}
+            ?s ?p ?o .
+            optional {{ ?s a ?sType . }}
+            bind (isblank(?s) as ?isblank)
+        }}
+        group by ?p ?sType ?isblank
+    """,
+}
+
+
+async def asummarize_sparql(
+    endpoint: str,
+    graph: str | None,
+    username: str | None,
+    password: str | None,
+    timeout: int = 5,
+    cache: ResponseCache | None = None,
+    retries: int = 3,
+    sample: int | None = None,
+    concurrency: int = 4,
+) -> ClassSummary:
+    """summarize a SPARQL endpoint with aggregate queries run by the endpoint
+
+    instead of fetching the statements, a handful of distinct class level
+    result sets are fetched, so the cost is bounded by the number of
+    classes and predicates rather than the size of the dataset. the
+    queries are sent at the same time.
+
+    unlike the local summary, where a resource with many types is shown as
+    its first type on the other end of a statement, every type of the
+    resource is connected here as SPARQL results have no order to pick one by.
+
+    :param sample: look at no more than this many instances of each class,
+        see asample_sparql.
+    :param concurrency: number of queries to send at once when sampling.
+    """
+    from_clause = f"from <{graph}>" if graph else ""
+    if sample is not None:
+        return await asample_sparql(
+            endpoint,
+            from_clause,
+            sample,
+            username=username,
+            password=password,
+            timeout=timeout,
+            cache=cache,
+            retries=retries,
+            concurrency=concurrency,
+        )
+    summary = ClassSummary()
+    async with async_sparql_client(
+        username, password, timeout=timeout, concurrency=len(SPARQL_SUMMARY_QUERIES)
+    ) as client:
+
+        async def select(name: str) -> list[dict]:
+            logger.info(f"fetching {name} summary from {endpoint}")
+            query = "prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>\n"
+            return await async_sparql_select(
+                client,
+                endpoint,
+                query + SPARQL_SUMMARY_QUERIES[name].format(from_clause=from_clause),
+                cache=cache,
+                retries=retries,
+            )
+
+        results = dict(
+            zip(
+                SPARQL_SUMMARY_QUERIES,
+                await asyncio.gather(*map(select, SPARQL_SUMMARY_QUERIES)),
+            )
+        )
+    for row in results["classes"]:
+        summary.klasses.add(row["oType"])
+    for row in results["typed"]:
+        summary.connections.add((row["sType"], row["p"], row["oType"]))
+    for row in results["datatypes"]:
+        # SPARQL 1.1 gives language tagged strings a datatype, rdflib does not
+        datatype = XSD.string if row["oType"] == RDF.langString else row["oType"]
+        summary.datatypes.add(datatype)
+        summary.connections.add((row["sType"], row["p"], datatype))
+    for row in results["untyped objects"]:
+        to_klass = _untyped_klass(summary, row["isblank"])
+        summary.connections.add((row["sType"], row["p"], to_klass))
+    for row in results["untyped subjects"]:
+        from_klass = _untyped_klass(summary, row["isblank"])
+        summary.connections.add((from_klass, row["p"], row["oType"]))
+    return summary
+
+
+async def asample_sparql(
+    endpoint: str,
+    from_clause: str,
+    sample: int,
+    username: str | None,
+    password: str | None,
+    timeout: int = 5,
+    cache: ResponseCache | None = None,
+    retries: int = 3,
+    concurrency: int = 4,
+) -> ClassSummary:
+    """summarize the statements about up to sample instances of each class
+
+    the instances of every class are counted first, then two grouped
+    queries per class count the statements to and from up to sample of its
+    instances, chosen by the endpoint. the work done by the endpoint for
+    each class is bounded by sample rather than the size of the class.
+    every connection is given a Support, see summarize_sample.
+
+    :raises ValueError: if sample is less than 1.
+    """
+    check_sample(sample)
+    summary = ClassSummary()
+    async with async_sparql_client(
+        username, password, timeout=timeout, concurrency=concurrency
+    ) as client:
+
+        async def select(name: str, klass: URIRef | None = None) -> list[dict]:
+            query = "prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>\n"
+            query += SPARQL_SAMPLE_QUERIES[name].format(
+                from_clause=from_clause,
+                klass=klass.n3() if klass is not None else "",
+                sample=sample,
+            )
+            return await async_sparql_select(
+                client, endpoint, query, cache=cache, retries=retries
+            )
+
+        logger.info(f"counting the instances of each class at {endpoint}")
+        counts = {
+            row["klass"]: int(row["n"])
+            for row in await select("class counts")
+            if isinstance(row["klass"], URIRef)
+        }
+        logger.info(f"sampling up to {sample:,} instances of {len(counts):,} classes")
+        results = await asyncio.gather(
+            *(
+                select(name, klass)
+                for klass in counts
+                for name in ("outgoing", "incoming")
+            )
+        )
+    for i, klass in enumerate(counts):
+        summary.klasses.add(klass)
+        outgoing, incoming = results[2 * i], results[2 * i + 1]
+        scale = counts[klass] / min(sample, counts[klass])
+        exhaustive = counts[klass] <= sample
+        for row in outgoing:
+            to_klass = row["oType"]
+            if row["isliteral"].toPython() is True:
+                # SPARQL 1.1 gives language tagged strings a datatype, rdflib does not
+                if to_klass is None or to_klass == RDF.langString:
+                    to_klass = XSD.string
+                summary.datatypes.add(to_klass)
+            elif to_klass is None:
+                to_klass = _untyped_klass(summary, row["isblank"])
+            support = Support(round(int(row["n"]) * scale), exhaustive)
+            summary.add_support((klass, row["p"], to_klass), support)
+        for row in incoming:
+            from_klass = row["sType"]
+            if from_klass is None:
+                from_klass = _untyped_klass(summary, row["isblank"])
+            support = Support(round(int(row["n"]) * scale), exhaustive)
+            summary.add_support((from_klass, row["p"], klass), support)
+    return summary
+
+
+def summarize_sparql(
+    endpoint: str,
+    graph: str | None,
+    username: str | None,
+    password: str | None,
+    timeout: int = 5,
+    cache: ResponseCache | None = None,
+    retries: int = 3,
+    sample: int | None = None,
+    concurrency: int = 4,
+) -> ClassSummary:
+    """summarize a SPARQL endpoint with aggregate queries run by the endpoint
+
+    a blocking wrapper around asummarize_sparql.
+    """
+    return asyncio.run(
+        asummarize_sparql(
+            endpoint=endpoint,
+            graph=graph,
+            username=username,
+            password=password,
+            timeout=timeout,
+            cache=cache,
+            retries=retries,
+            sample=sample,
+            concurrency=concurrency,
+        )
+    )
+
+
+def _untyped_klass(summary: ClassSummary, isblank: Literal) -> URIRef | None:
+    if isblank.toPython() is True:
+        summary.blank = True
+        return BNODE_KLASS
+    return None
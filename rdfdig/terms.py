@@ -0,0 +1,201 @@
+import hashlib
+from array import array
+from typing import Iterator, NamedTuple
+
+from rdflib import BNode, Literal
+from rdflib.term import Node as Term
+
+
+class Node(NamedTuple):
+    id: int
+    label: str
+    isliteral: bool = False
+    isblank: bool = False
+
+
+class Edge(NamedTuple):
+    from_id: int
+    to_id: int
+    label: str
+
+
+class TermIds:
+    """Assigns integer ids to rdflib terms.
+
+    By default ids are dense, 0, 1, 2, ... in the order terms are first seen,
+    and are only meaningful within one diagram. With deterministic=True the
+    id of a term is taken from a hash of its content, so a term has the same
+    id in every run and in every diagram. Blank nodes are named afresh each
+    time data is parsed so their ids are only stable within a run.
+
+    Deterministic ids are kept below 2**53 so they survive being read as
+    javascript numbers.
+
+    None, which stands for an untyped resource in class diagrams, has an id too.
+    """
+
+    def __init__(self, deterministic: bool = False):
+        self.deterministic = deterministic
+        self._ids: dict[Term | None, int] = {}
+        self._terms: dict[int, Term | None] = {}
+
+    def __getitem__(self, term: Term | None) -> int:
+        """the id of term, assigning one if it has not been seen"""
+        term_id = self._ids.get(term)
+        if term_id is None:
+            term_id = self._content_id(term) if self.deterministic else len(self._ids)
+            # resolve the (very unlikely) collision of two content hashes
+            while term_id in self._terms:
+                term_id = (term_id + 1) % 2**53
+            self._ids[term] = term_id
+            self._terms[term_id] = term
+        return term_id
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def term(self, term_id: int) -> Term | None:
+        """the term with term_id
+
+        :raises KeyError: if no term has been given term_id.
+        """
+        return self._terms[term_id]
+
+    @staticmethod
+    def _content_id(term: Term | None) -> int:
+        if term is None:
+            key = "n"
+        elif isinstance(term, Literal):
+            key = f"l{term}\0{term.language or ''}\0{term.datatype or ''}"
+        elif isinstance(term, BNode):
+            key = f"b{term}"
+        else:
+            key = f"u{term}"
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") >> 11
+
+
+class NodeTable:
+    """The nodes of a diagram, held in columns with one row per node id.
+
+    Iterating yields Node tuples, which are built on the fly.
+    """
+
+    LITERAL, BLANK = 1, 2
+
+    def __init__(self):
+        self.ids = array("q")
+        self.labels: list[str] = []
+        self.flags = bytearray()
+        self._rows: dict[int, int] = {}
+
+    def add(
+        self, node_id: int, label: str, isliteral: bool = False, isblank: bool = False
+    ) -> bool:
+        """add a node unless there is one with node_id already
+
+        :returns: True if the node was added.
+        """
+        if node_id in self._rows:
+            return False
+        self._rows[node_id] = len(self.ids)
+        self.ids.append(node_id)
+        self.labels.append(label)
+        self.flags.append(self.LITERAL * isliteral | self.BLANK * isblank)
+        return True
+
+    def __contains__(self, node_id: int) -> bool:
+        return node_id in self._rows
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[Node]:
+        for node_id, label, flags in zip(self.ids, self.labels, self.flags):
+            isliteral, isblank = bool(flags & self.LITERAL), bool(flags & self.BLANK)
+            yield Node(node_id, label, isliteral, isblank)
+
+    def sorted(self) -> Iterator[Node]:
+        """the nodes in order of id, as sorted() would give them
+
+        only the row numbers are sorted, each Node is built as it is yielded.
+        """
+        ids, labels, flags = self.ids, self.labels, self.flags
+        for row in sorted(range(len(ids)), key=ids.__getitem__):
+            isliteral = bool(flags[row] & self.LITERAL)
+            yield Node(ids[row], labels[row], isliteral, bool(flags[row] & self.BLANK))
+
+    def copy(self) -> "NodeTable":
+        table = NodeTable()
+        table.ids = array("q", self.ids)
+        table.labels = list(self.labels)
+        table.flags = bytearray(self.flags)
+        table._rows = dict(self._rows)
+        return table
+
+
+class EdgeTable:
+    """The edges of a diagram, held in columns with one row per distinct edge.
+
+    Edge labels are stored once each and referred to by index.
+    Iterating yields Edge tuples, which are built on the fly.
+    """
+
+    def __init__(self):
+        self.from_ids = array("q")
+        self.to_ids = array("q")
+        self.label_ids = array("l")
+        self.labels: list[str] = []
+        self._label_ids: dict[str, int] = {}
+        # each edge packed into one int, to find duplicates
+        self._keys: set[int] = set()
+
+    def add(self, from_id: int, to_id: int, label: str) -> bool:
+        """add an edge unless there is an identical one already
+
+        :returns: True if the edge was added.
+        """
+        label_id = self._label_ids.get(label)
+        if label_id is None:
+            label_id = self._label_ids[label] = len(self.labels)
+            self.labels.append(label)
+        key = (from_id << 64 | to_id) << 32 | label_id
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        self.from_ids.append(from_id)
+        self.to_ids.append(to_id)
+        self.label_ids.append(label_id)
+        return True
+
+    def __len__(self) -> int:
+        return len(self.from_ids)
+
+    def __iter__(self) -> Iterator[Edge]:
+        labels = self.labels
+        for from_id, to_id, label_id in zip(self.from_ids, self.to_ids, self.label_ids):
+            yield Edge(from_id, to_id, labels[label_id])
+
+    def sorted(self) -> Iterator[Edge]:
+        """the edges in the order sorted() would give them
+
+        only the row numbers are sorted, each Edge is built as it is yielded.
+        """
+        from_ids, to_ids, label_ids = self.from_ids, self.to_ids, self.label_ids
+        labels = self.labels
+        rows = sorted(
+            range(len(from_ids)),
+            key=lambda row: (from_ids[row], to_ids[row], labels[label_ids[row]]),
+        )
+        for row in rows:
+            yield Edge(from_ids[row], to_ids[row], labels[label_ids[row]])
+
+    def copy(self) -> "EdgeTable":
+        table = EdgeTable()
+        table.from_ids = array("q", self.from_ids)
+        table.to_ids = array("q", self.to_ids)
+        table.label_ids = array("l", self.label_ids)
+        table.labels = list(self.labels)
+        table._label_ids = dict(self._label_ids)
+        table._keys = set(self._keys)
+        return table
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from rdflib import URIRef
@@ -14,6 +15,32 @@ format_help_message = "The output format of the diagram.\n"
 for format, description in formats.items():
     format_help_message += f"\n{format}: {description}"
 
+# the formats a diagram can be written in, see rdfdig.writers
+write_formats = {
+    "json": "The serialized nodes and edges, as JSON (the default)",
+    "compact": "The nodes and edges as arrays of integers with a shared label table",
+    "visjs": "An interactive visjs.org HTML page",
+    "mermaid": "A mermaid.js.org HTML page",
+    "mermaid-text": "A mermaid flowchart",
+    "dot": "A Graphviz DOT digraph",
+    "graphml": "A GraphML document",
+}
+write_format_help_message = (
+    "The format to write the diagram in. The HTML formats are reduced first, "
+    "see --reduce-above, the others are written in full.\n"
+)
+for format, description in write_formats.items():
+    write_format_help_message += f"\n{format}: {description}"
+
+
+def default_cache_dir() -> Path:
+    """the folder rdfdig keeps its caches and checkpoints in
+
+    $XDG_CACHE_HOME/rdfdig if set, otherwise ~/.cache/rdfdig
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "rdfdig"
+
 
 def expand_uri(iri: str, nm: NamespaceManager) -> URIRef:
     """Safely expand a prefixed IRI
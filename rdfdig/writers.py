@@ -0,0 +1,253 @@
+"""Write diagrams to a file or stdout a piece at a time.
+
+each format is a function from the serialization of a Diagram to an
+iterator of strings, which are written as they are made so that writing
+a large diagram takes time in proportion to its size and little memory
+beyond the serialization itself. the nodes and edges of the
+serialization may be iterators, which are read once.
+"""
+
+import gzip
+import io
+import logging
+import sys
+from array import array
+from itertools import chain, islice
+from pathlib import Path
+from typing import Iterable, Iterator
+from xml.sax.saxutils import escape
+
+from rdfdig.layout import ITERATIONS
+from rdfdig.renderers import json_array, mermaid_chunks, mermaid_text, visjs_chunks
+from rdfdig.terms import NodeTable
+from rdfdig.utils import write_formats
+
+logger = logging.getLogger(__name__)
+
+# the formats a diagram can be written in, see rdfdig.utils.write_formats.
+# the html formats are reduced first, see rdfdig.reduction
+WRITE_FORMATS = tuple(write_formats)
+HTML_FORMATS = {"visjs", "mermaid"}
+
+
+def _dot_string(text: str) -> str:
+    """text as a quoted DOT string"""
+    text = text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{text}"'
+
+
+def dot_text(serialization: dict) -> Iterator[str]:
+    """the Graphviz DOT digraph of the serialization of a Diagram, a line at a time"""
+    yield "digraph rdfdig {\n"
+    yield '    node [shape=box, style="rounded,filled", fillcolor="#efefef"];\n'
+    for node in serialization["nodes"]:
+        label = _dot_string(node["label"])
+        if node["isblank"]:
+            attributes = 'shape=circle, label="", fillcolor="#ffffff"'
+        elif node["isliteral"]:
+            attributes = f'label={label}, style=filled, fillcolor="#ffffff"'
+        else:
+            attributes = f"label={label}"
+        yield f'    "{node["id"]}" [{attributes}];\n'
+    for edge in serialization["edges"]:
+        label = _dot_string(edge["label"])
+        yield f'    "{edge["from"]}" -> "{edge["to"]}" [label={label}];\n'
+    yield "}\n"
+
+
+def graphml_text(serialization: dict) -> Iterator[str]:
+    """the GraphML document of the serialization of a Diagram, a line at a time
+
+    nodes have a label and a kind, one of resource, literal or blank, and
+    edges have a label.
+    """
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+    yield '  <key id="label" for="node" attr.name="label" attr.type="string"/>\n'
+    yield '  <key id="kind" for="node" attr.name="kind" attr.type="string"/>\n'
+    yield '  <key id="predicate" for="edge" attr.name="label" attr.type="string"/>\n'
+    yield '  <graph id="rdfdig" edgedefault="directed">\n'
+    for node in serialization["nodes"]:
+        if node["isblank"]:
+            kind = "blank"
+        elif node["isliteral"]:
+            kind = "literal"
+        else:
+            kind = "resource"
+        yield (
+            f'    <node id="n{node["id"]}">'
+            f'<data key="label">{escape(node["label"])}</data>'
+            f'<data key="kind">{kind}</data></node>\n'
+        )
+    for edge in serialization["edges"]:
+        yield (
+            f'    <edge source="n{edge["from"]}" target="n{edge["to"]}">'
+            f'<data key="predicate">{escape(edge["label"])}</data></edge>\n'
+        )
+    yield "  </graph>\n"
+    yield "</graphml>\n"
+
+
+def json_text(serialization: dict) -> Iterator[str]:
+    """the JSON of the serialization of a Diagram, as Diagram.serialize gives it
+
+    the text is the same byte for byte. format_chunks adds the line break
+    that ends a written file.
+    """
+    yield '{"nodes": '
+    yield from json_array(serialization["nodes"])
+    yield ', "edges": '
+    yield from json_array(serialization["edges"])
+    yield "}"
+
+
+# the version of the compact format, see compact_text
+COMPACT_VERSION = 1
+
+
+def _int_array(values: Iterable[int], batch: int = 10000) -> Iterator[str]:
+    """the JSON array of integers, batch integers at a time"""
+    yield "["
+    values = iter(values)
+    separator = ""
+    while group := list(islice(values, batch)):
+        yield separator + ",".join(map(str, group))
+        separator = ","
+    yield "]"
+
+
+def compact_text(serialization: dict) -> Iterator[str]:
+    """the serialization of a Diagram as compact JSON, a piece at a time
+
+    each label is written once, to "labels", and the nodes, edges and
+    support are flat arrays of integers:
+
+        nodes:   id, label, flags for each node, flags as in NodeTable
+        edges:   from, to, label for each edge, from and to are node ids
+        support: edge, count, exhaustive for each edge with known support
+
+    where label is the index of the label in labels. see expand_compact.
+    """
+    labels: dict[str, int] = {}
+    support = array("q")
+    literal, blank = NodeTable.LITERAL, NodeTable.BLANK
+
+    def node_values() -> Iterator[int]:
+        for node in serialization["nodes"]:
+            yield node["id"]
+            yield labels.setdefault(node["label"], len(labels))
+            yield literal * node["isliteral"] | blank * node["isblank"]
+
+    def edge_values() -> Iterator[int]:
+        for index, edge in enumerate(serialization["edges"]):
+            yield edge["from"]
+            yield edge["to"]
+            yield labels.setdefault(edge["label"], len(labels))
+            if "support" in edge:
+                support.extend((index, edge["support"], edge["exhaustive"]))
+
+    yield f'{{"version": {COMPACT_VERSION}, "nodes": '
+    yield from _int_array(node_values())
+    yield ', "edges": '
+    yield from _int_array(edge_values())
+    yield ', "support": '
+    yield from _int_array(support)
+    # the labels are written last, once every label has been seen
+    yield ', "labels": '
+    yield from json_array(labels)
+    yield "}"
+
+
+def expand_compact(compact: dict) -> dict:
+    """the serialization of a Diagram from the loaded JSON of compact_text
+
+    :raises ValueError: if compact is not of a version that can be read.
+    """
+    if compact.get("version") != COMPACT_VERSION:
+        raise ValueError(f"unknown compact version {compact.get('version')}")
+    labels, nodes, edges = compact["labels"], compact["nodes"], compact["edges"]
+    serialization = {
+        "nodes": [
+            {
+                "id": node_id,
+                "label": labels[label],
+                "isliteral": bool(flags & NodeTable.LITERAL),
+                "isblank": bool(flags & NodeTable.BLANK),
+            }
+            for node_id, label, flags in zip(nodes[0::3], nodes[1::3], nodes[2::3])
+        ],
+        "edges": [
+            {"from": from_id, "to": to_id, "label": labels[label]}
+            for from_id, to_id, label in zip(edges[0::3], edges[1::3], edges[2::3])
+        ],
+    }
+    support = compact["support"]
+    for index, count, exhaustive in zip(support[0::3], support[1::3], support[2::3]):
+        edge = serialization["edges"][index]
+        edge["support"], edge["exhaustive"] = count, bool(exhaustive)
+    return serialization
+
+
+def write_chunks(
+    chunks: Iterable[str], path: Path | None = None, compress: bool = False
+):
+    """write chunks to the file at path, or to stdout if path is None
+
+    :param compress: gzip what is written.
+    """
+    if path is None:
+        if compress:
+            binary = gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb")
+            # closing the wrapper closes the GzipFile but not stdout
+            with io.TextIOWrapper(binary, encoding="utf-8") as file:
+                file.writelines(chunks)
+            sys.stdout.buffer.flush()
+            return
+        sys.stdout.writelines(chunks)
+        sys.stdout.flush()
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if compress:
+        file = gzip.open(path, "wt", encoding="utf-8")
+    else:
+        file = open(path, "w", encoding="utf-8")
+    with file:
+        file.writelines(chunks)
+    logger.info(f"wrote diagram to {path}")
+
+
+def format_chunks(
+    serialization: dict,
+    format: str,
+    overrides: dict | None = None,
+    layout_name: str = "auto",
+    iterations: int = ITERATIONS,
+) -> Iterator[str]:
+    """the serialization of a Diagram in format, one of WRITE_FORMATS, a piece at a time
+
+    :param overrides: visjs options, see rdfdig.renderers.visjs_html.
+    :param layout_name: the layout of the visjs format.
+    :param iterations: the iterations of the force layout of the visjs format.
+    :raises ValueError: if format is not one of WRITE_FORMATS.
+
+    every format ends with a line break, so json is serialize() and a line
+    break.
+    """
+    if format == "visjs":
+        return visjs_chunks(
+            serialization, overrides or {}, None, layout_name, iterations
+        )
+    if format == "mermaid":
+        return mermaid_chunks(serialization, overrides or {})
+    if format == "mermaid-text":
+        return mermaid_text(serialization)
+    if format == "dot":
+        return dot_text(serialization)
+    if format == "graphml":
+        return graphml_text(serialization)
+    # the JSON formats end with a line break when written, as the others do
+    if format == "json":
+        return chain(json_text(serialization), ["\n"])
+    if format == "compact":
+        return chain(compact_text(serialization), ["\n"])
+    raise ValueError(f"unknown format {format}, expected one of {WRITE_FORMATS}")
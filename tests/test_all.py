@@ -1,36 +1,143 @@
+import asyncio
+import getpass
+import gzip
+import io
 import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import xml.etree.ElementTree as ElementTree
+from functools import partial
 from pathlib import Path
+from urllib.request import Request, urlopen
 
+import httpx
 import pytest
+from rdflib import Graph, URIRef
+from rdflib.compare import isomorphic
+from rdflib.namespace import RDF
+from rdflib.namespace import SDO as SCHEMA
+from rdflib.namespace import XSD
 
+import rdfdig.__main__
+import rdfdig.cache
+from rdfdig.__main__ import build_parser, serve_main
+from rdfdig.batch import iri_filename, read_iris, write_batch
+from rdfdig.cache import ParseCache
 from rdfdig.core import Diagram
+from rdfdig.labels import Labeller
+from rdfdig.layout import force_layout
+from rdfdig.loaders import load_dir, load_file, load_sparql
+from rdfdig.reduction import Thresholds, reduce_diagram
+from rdfdig.renderers import mermaid_html, visjs_html
+from rdfdig.server import DiagramServer, ViewServer, accepts_gzip
+from rdfdig.summarizers import (
+    Support,
+    summarize_files,
+    summarize_graph,
+    summarize_sparql,
+)
+from rdfdig.terms import EdgeTable, NodeTable
+from rdfdig.writers import WRITE_FORMATS, expand_compact, json_text
+
+ENDPOINT = "http://sparql.test/sparql"
+
+
+class MockEndpoint:
+    """answers SPARQL requests from store
+
+    :param queries: every query received, including failed ones.
+    :param faults: HTTP status codes to fail the next requests with.
+    :param fail_after: fail CONSTRUCT queries with a 400 after this many.
+    :param ntriples: answer CONSTRUCT queries with N-Triples if accepted.
+    :param etag: send this ETag and answer matching If-None-Match with a 304.
+    """
+
+    def __init__(self):
+        self.store = Graph()
+        self.queries: list[str] = []
+        self.faults: list[int] = []
+        self.fail_after: int | None = None
+        self.ntriples = True
+        self.etag: str | None = None
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        response = self.respond(request)
+        if self.etag and response.status_code == 200:
+            if request.headers.get("If-None-Match") == self.etag:
+                return httpx.Response(304, headers={"ETag": self.etag})
+            response.headers["ETag"] = self.etag
+        return response
+
+    def respond(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            query = request.content.decode()
+        else:
+            query = request.url.params["query"]
+        self.queries.append(query)
+        if self.faults:
+            return httpx.Response(self.faults.pop(0), headers={"Retry-After": "0"})
+        result = self.store.query(query)
+        if result.type == "CONSTRUCT":
+            constructs = sum("construct" in query for query in self.queries)
+            if self.fail_after is not None and constructs > self.fail_after:
+                return httpx.Response(400)
+            if self.ntriples and "application/n-triples" in request.headers["Accept"]:
+                return httpx.Response(
+                    200,
+                    headers={"Content-Type": "application/n-triples"},
+                    content=result.graph.serialize(format="nt"),
+                )
+            return httpx.Response(
+                200,
+                headers={"Content-Type": "application/ld+json"},
+                content=result.graph.serialize(format="json-ld"),
+            )
+        return httpx.Response(200, content=result.serialize(format="json"))
+
+
+@pytest.fixture
+def sparql_endpoint(monkeypatch) -> MockEndpoint:
+    """serve a MockEndpoint at ENDPOINT"""
+    endpoint = MockEndpoint()
+    transport = httpx.MockTransport(endpoint.handler)
+    monkeypatch.setattr(
+        httpx, "AsyncClient", partial(httpx.AsyncClient, transport=transport)
+    )
+    return endpoint
 
 
 def test_file_loader():
     """Test that data can be loaded from a file."""
     file = Path(__file__).parent / "data" / "lawson.ttl"
     diagram = Diagram()
-    diagram.parse(source=file)
+    diagram.parse(sources=[file])
 
 
 def test_folder_loader():
     """Test that data can be loaded from a folder."""
     folder = Path(__file__).parent / "data"
     diagram = Diagram()
-    diagram.parse(source=folder)
+    diagram.parse(sources=[folder])
 
 
-@pytest.mark.skip(reason="not implemented")
-def test_sparql_loader():
+def test_sparql_loader(sparql_endpoint):
     """Test that data can be loaded from a sparql endpoint."""
-    assert True
+    sparql_endpoint.store.parse(Path(__file__).parent / "data" / "edmond.ttl")
+    diagram = Diagram()
+    diagram.parse(sources=[ENDPOINT], iri="http://example.org/kurrawong")
+    nodes_edges_str = diagram.serialize()
+    assert "Edmond" in nodes_edges_str
+    assert "Kurrawong AI" in nodes_edges_str
 
 
 def test_serialization():
     """Test that data can be serialized to JSON."""
     file = Path(__file__).parent / "data" / "lawson.ttl"
     diagram = Diagram()
-    diagram.parse(source=file)
+    diagram.parse(sources=[file])
     nodes_edges_str = diagram.serialize()
     _ = json.loads(nodes_edges_str)
 
@@ -39,7 +146,7 @@ def test_class_serialization():
     """Test that all classes are retrieved from test data"""
     file = Path(__file__).parent / "data" / "edmond.ttl"
     diagram = Diagram()
-    diagram.parse(source=file)
+    diagram.parse(sources=[file])
     nodes_edges_str = diagram.serialize()
     assert "schema:Person" in nodes_edges_str
     assert "schema:Organisation" in nodes_edges_str
@@ -49,7 +156,7 @@ def test_instance_serialization():
     """Test that all instances are retrieved from test data"""
     file = Path(__file__).parent / "data" / "edmond.ttl"
     diagram = Diagram()
-    diagram.parse(source=file, iri="http://example.org/kurrawong")
+    diagram.parse(sources=[file], iri="http://example.org/kurrawong")
     nodes_edges_str = diagram.serialize()
     assert "Edmond" in nodes_edges_str
     assert "Kurrawong AI" in nodes_edges_str
@@ -59,4 +166,877 @@ def test_prefix_expansion():
     """Test that a prefix can be expanded."""
     file = Path(__file__).parent / "data" / "lawson.ttl"
     diagram = Diagram()
-    diagram.parse(source=file, iri="schema:Person")
+    diagram.parse(sources=[file], iri="schema:Person")
+
+
+def labelled_edges(diagram: Diagram) -> set[tuple]:
+    """reduce the edges of a diagram to (from label, edge label, to label)"""
+    labels = {node.id: node.label for node in diagram.nodes}
+    return {
+        (labels.get(edge.from_id), edge.label, labels.get(edge.to_id))
+        for edge in diagram.edges
+    }
+
+
+def test_class_summary_multiple_types():
+    """Test that each class of a resource is connected in a class diagram."""
+    file = Path(__file__).parent / "data" / "lawson.ttl"
+    diagram = Diagram()
+    diagram.parse(sources=[file])
+    diagram._store.parse(
+        data="""
+        @prefix : <http://example.org/> .
+        @prefix schema: <https://schema.org/> .
+        :lawson a schema:Employee ;
+            schema:address [ schema:postalCode "2000" ] .
+        """,
+        format="turtle",
+    )
+    diagram.nodes, diagram.edges = NodeTable(), EdgeTable()
+    diagram._parse_classes()
+    edges = labelled_edges(diagram)
+    for klass in ("schema:Person", "schema:Employee"):
+        assert (klass, "schema:affiliation", "schema:Organisation") in edges
+        assert (klass, "schema:name", "xsd:string") in edges
+        assert (klass, "schema:address", "<bnode>") in edges
+    assert ("<bnode>", "schema:postalCode", "xsd:string") not in edges
+
+
+def test_stream_matches_in_memory(tmp_path):
+    """Test that streaming line based files gives the same class diagram as loading them."""
+    for name in ("edmond", "lawson"):
+        graph = Graph().parse(Path(__file__).parent / "data" / f"{name}.ttl")
+        graph.parse(
+            data=f"<http://example.org/{name}> <https://schema.org/knows> [ <https://schema.org/name> '{name}' ] .",
+            format="turtle",
+        )
+        graph.serialize(tmp_path / f"{name}.nt", format="nt")
+    loaded = Diagram(deterministic_ids=True)
+    loaded.parse(sources=[tmp_path])
+    streamed = Diagram(deterministic_ids=True)
+    streamed.parse(sources=[tmp_path], stream=True)
+    assert set(streamed.nodes) == set(loaded.nodes)
+    assert set(streamed.edges) == set(loaded.edges)
+    with pytest.raises(ValueError):
+        Diagram().parse(sources=[Path(__file__).parent / "data"], stream=True)
+
+
+def test_sharded_stream_matches_single_process(tmp_path):
+    """Test that summarizing shards in parallel gives the same summary as one process."""
+    graph = Graph()
+    for file in (Path(__file__).parent / "data").glob("*.ttl"):
+        graph.parse(file)
+    graph.parse(
+        data="""
+        @prefix : <http://example.org/> .
+        @prefix schema: <https://schema.org/> .
+        :lawson a schema:Employee ; schema:knows [ schema:name "someone" ] .
+        [ a schema:Place ] schema:containedIn [ a schema:Place ; schema:knows :lawson ] .
+        """,
+        format="turtle",
+    )
+    graph.serialize(tmp_path / "data.nt", format="nt")
+    single = summarize_files([tmp_path / "data.nt"])
+    sharded = summarize_files([tmp_path / "data.nt"], jobs=2, shard_size=256)
+    assert sharded.klasses == single.klasses
+    assert sharded.datatypes == single.datatypes
+    assert sharded.blank == single.blank
+    assert sharded.connections == single.connections
+    assert single.connections
+
+
+def test_parallel_folder_loader(tmp_path, caplog):
+    """Test that a folder loaded in parallel matches a serial load and skips bad files."""
+    folder = Path(__file__).parent / "data"
+    # a file that fails part way through is skipped
+    (tmp_path / "broken.nt").write_text(
+        "<urn:a> <urn:b> <urn:c> .\nthis is not n-triples\n"
+    )
+    (tmp_path / "lawson.ttl").write_text((folder / "lawson.ttl").read_text())
+    serial = load_dir(folder)
+    parallel = load_dir(folder, jobs=2)
+    assert isomorphic(serial, parallel)
+    assert ("schema", URIRef("https://schema.org/")) in parallel.namespaces()
+    for jobs in (1, 2):
+        caplog.clear()
+        with caplog.at_level(logging.ERROR):
+            graph = load_dir(tmp_path, jobs=jobs)
+        assert set(Graph().parse(folder / "lawson.ttl")) <= set(graph)
+        assert "broken.nt" in caplog.text
+    # a worker's file is added whole or not at all
+    assert len(graph) == len(Graph().parse(folder / "lawson.ttl"))
+
+
+def test_sparql_aggregate_matches_local(sparql_endpoint):
+    """Test that a summary aggregated by the endpoint matches a local summary."""
+    for file in (Path(__file__).parent / "data").glob("*.ttl"):
+        sparql_endpoint.store.parse(file)
+    sparql_endpoint.store.parse(
+        data="""
+        @prefix : <http://example.org/> .
+        @prefix schema: <https://schema.org/> .
+        :lawson schema:knows [ schema:name "someone"@en ], :nobody .
+        [ schema:worksFor :kurrawong ] .
+        """,
+        format="turtle",
+    )
+    local = summarize_graph(sparql_endpoint.store)
+    remote = summarize_sparql(ENDPOINT, graph=None, username=None, password=None)
+    assert remote.klasses == local.klasses
+    assert remote.datatypes == local.datatypes
+    assert remote.blank == local.blank
+    assert remote.connections == local.connections
+    diagram = Diagram()
+    diagram.parse(sources=[ENDPOINT], aggregate=True)
+    assert ("schema:Person", "schema:name", "xsd:string") in labelled_edges(diagram)
+
+
+def test_concurrent_sparql_pages(sparql_endpoint):
+    """Test that fetching pages concurrently loads the same data as one at a time."""
+    sparql_endpoint.store.parse(Path(__file__).parent / "data" / "lawson.ttl")
+    kwargs = dict(iri=None, graph=None, username=None, password=None, limit=2)
+    serial = load_sparql(ENDPOINT, concurrency=1, **kwargs)
+    concurrent = load_sparql(ENDPOINT, concurrency=3, **kwargs)
+    assert len(serial) == len(sparql_endpoint.store)
+    assert isomorphic(serial, concurrent)
+
+
+def test_sparql_retries_transient_errors(sparql_endpoint):
+    """Test that transient HTTP errors are retried."""
+    sparql_endpoint.store.parse(Path(__file__).parent / "data" / "lawson.ttl")
+    sparql_endpoint.faults = [503, 429]
+    g = load_sparql(ENDPOINT, iri=None, graph=None, username=None, password=None)
+    assert len(g) == len(sparql_endpoint.store)
+    sparql_endpoint.faults = [503]
+    with pytest.raises(httpx.HTTPStatusError):
+        load_sparql(
+            ENDPOINT, iri=None, graph=None, username=None, password=None, retries=0
+        )
+
+
+def test_sparql_timeouts_surface(monkeypatch):
+    """Test that pages which time out at the smallest size raise the timeout."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    transport = httpx.MockTransport(handler)
+    monkeypatch.setattr(
+        httpx, "AsyncClient", partial(httpx.AsyncClient, transport=transport)
+    )
+    with pytest.raises(httpx.TimeoutException):
+        load_sparql(
+            ENDPOINT,
+            iri="http://example.org/a",
+            graph=None,
+            username=None,
+            password=None,
+            limit=32,
+            retries=0,
+        )
+    # 32 is split down to pages of 2, the smallest size
+    assert len(requests) < 64
+
+
+def test_sparql_checkpoint_resume(sparql_endpoint, tmp_path):
+    """Test that a failed SPARQL load resumes from its checkpoint."""
+    sparql_endpoint.store.parse(Path(__file__).parent / "data" / "lawson.ttl")
+    sparql_endpoint.fail_after = 1
+    kwargs = dict(
+        iri=None,
+        graph=None,
+        username=None,
+        password=None,
+        limit=2,
+        concurrency=1,
+        retries=0,
+        checkpoint_dir=tmp_path,
+    )
+    with pytest.raises(httpx.HTTPStatusError):
+        load_sparql(ENDPOINT, **kwargs)
+    assert list(tmp_path.glob("*/state.json"))
+    sparql_endpoint.fail_after = None
+    sparql_endpoint.queries = []
+    g = load_sparql(ENDPOINT, **kwargs)
+    assert len(g) == len(sparql_endpoint.store)
+    assert "offset 0" not in "".join(sparql_endpoint.queries)
+    assert not list(tmp_path.iterdir())
+
+
+def test_sparql_wire_formats(sparql_endpoint):
+    """Test that N-Triples is preferred and JSON-LD is still understood."""
+    sparql_endpoint.store.parse(Path(__file__).parent / "data" / "lawson.ttl")
+    kwargs = dict(iri=None, graph=None, username=None, password=None)
+    ntriples = load_sparql(ENDPOINT, **kwargs)
+    sparql_endpoint.ntriples = False
+    jsonld = load_sparql(ENDPOINT, **kwargs)
+    assert len(ntriples) == len(sparql_endpoint.store)
+    assert isomorphic(ntriples, jsonld)
+
+
+def test_parse_cache(tmp_path, monkeypatch):
+    """Test that cached files load the same graph and that the cache is bounded."""
+    folder = Path(__file__).parent / "data"
+    cache = ParseCache(tmp_path / "cache")
+    parsed = load_dir(folder, cache=cache)
+    cached = load_dir(folder, cache=cache)
+    assert isomorphic(parsed, cached)
+    assert ("schema", URIRef("https://schema.org/")) in cached.namespaces()
+    data = tmp_path / "data.ttl"
+    for name in ("lawson", "edmond"):
+        data.write_text((folder / f"{name}.ttl").read_text())
+        assert isomorphic(cache.parse(data), load_file(folder / f"{name}.ttl"))
+    # a file that is not cached is parsed straight into an empty graph
+    target = Graph()
+    data.write_text("<urn:a> <urn:b> <urn:c> .\n")
+    assert cache.parse(data, graph=target) is target
+    assert isomorphic(cache.parse(data), target)
+    monkeypatch.setattr(rdfdig.cache, "STATS_MAX_SIZE", 0)
+    ParseCache(tmp_path / "cache", max_size=0).evict()
+    assert not list((tmp_path / "cache" / "entries").iterdir())
+    assert not list((tmp_path / "cache" / "stats").iterdir())
+    # files are only cached when asked to
+    assert build_parser().parse_args([str(data)]).cache_dir is None
+
+
+def test_sparql_response_cache(sparql_endpoint, tmp_path):
+    """Test that cached SPARQL responses are reused and revalidated."""
+    sparql_endpoint.store.parse(Path(__file__).parent / "data" / "lawson.ttl")
+    sparql_endpoint.etag = '"v1"'
+    expected = Diagram()
+    expected.parse(sources=[ENDPOINT], http_cache_dir=tmp_path)
+    sent = len(sparql_endpoint.queries)
+    cached = Diagram()
+    cached.parse(sources=[ENDPOINT], http_cache_dir=tmp_path)
+    assert len(sparql_endpoint.queries) == sent
+    assert labelled_edges(cached) == labelled_edges(expected)
+    # once stale, the responses are revalidated rather than fetched again
+    revalidated = Diagram()
+    revalidated.parse(sources=[ENDPOINT], http_cache_dir=tmp_path, http_cache_ttl=0)
+    assert len(sparql_endpoint.queries) == 2 * sent
+    assert labelled_edges(revalidated) == labelled_edges(expected)
+    # a different user does not see the cached responses
+    other = Diagram()
+    other.parse(
+        sources=[ENDPOINT],
+        username="other",
+        password="secret",
+        http_cache_dir=tmp_path,
+    )
+    assert len(sparql_endpoint.queries) == 3 * sent
+    # responses are only cached when a folder is given
+    assert build_parser().parse_args([ENDPOINT]).http_cache_dir is None
+
+
+CHAIN = """
+    @prefix ex: <http://example.org/> .
+    ex:a ex:next ex:b ; ex:loop _:x .
+    ex:b ex:next ex:c .
+    ex:c ex:next ex:d .
+    _:x ex:loop _:y .
+    _:y ex:loop _:x .
+"""
+
+
+def node_id(diagram: Diagram, iri: str) -> int:
+    label = URIRef(iri).n3(diagram._store.namespace_manager)
+    return next(node.id for node in diagram.nodes if node.label == label)
+
+
+def test_instance_expansion(tmp_path):
+    """Test that instance diagrams expand breadth first to a depth and budget."""
+    file = tmp_path / "chain.ttl"
+    file.write_text(CHAIN)
+
+    def labels(**kwargs) -> set[str]:
+        diagram = Diagram()
+        diagram.parse(sources=[file], iri="http://example.org/a", **kwargs)
+        return {node.label for node in diagram.nodes if not node.isblank}
+
+    # cyclic blank nodes are expanded once
+    assert labels() == {"ex:a", "ex:b"}
+    assert labels(depth=2) == {"ex:a", "ex:b", "ex:c"}
+    assert labels(depth=3) == {"ex:a", "ex:b", "ex:c", "ex:d"}
+    diagram = Diagram()
+    diagram.parse(sources=[file], iri="http://example.org/a", depth=3, max_nodes=3)
+    assert len(diagram.nodes) == 3
+
+
+def test_expand_node(tmp_path, sparql_endpoint):
+    """Test that nodes can be expanded from a file or a SPARQL endpoint."""
+    file = tmp_path / "chain.ttl"
+    file.write_text(CHAIN)
+    sparql_endpoint.store.parse(data=CHAIN, format="turtle")
+    for source in [file, ENDPOINT]:
+        diagram = Diagram()
+        diagram.parse(sources=[source], iri="http://example.org/a")
+        b = node_id(diagram, "http://example.org/b")
+        delta = diagram.expand(b)
+        assert [node["id"] for node in delta["nodes"]] == [
+            node_id(diagram, "http://example.org/c")
+        ]
+        assert len(delta["edges"]) == 1
+        assert diagram.expand(b) == {"nodes": [], "edges": []}
+    # the endpoint is only asked about each resource once
+    first_pages = [q for q in sparql_endpoint.queries if "offset 0" in q]
+    assert sum("<http://example.org/b>" in q for q in first_pages) == 1
+    # an endpoint loaded without a diagram is only asked about focused resources
+    sparql_endpoint.queries.clear()
+    diagram = Diagram()
+    diagram.parse(sources=[ENDPOINT], load_only=True)
+    assert sparql_endpoint.queries == []
+    focused = diagram.focus("http://example.org/b")
+    assert node_id(focused, "http://example.org/c") in focused.nodes
+    assert all("<http://example.org/" in q for q in sparql_endpoint.queries)
+
+
+def test_explore_server(tmp_path):
+    """Test that a served diagram expands nodes over HTTP."""
+    file = tmp_path / "chain.ttl"
+    file.write_text(CHAIN)
+    diagram = Diagram()
+    diagram.parse(sources=[file], iri="http://example.org/a")
+    server = DiagramServer(("127.0.0.1", 0), diagram)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with urlopen(server.url) as response:
+            assert b"ex:b" in response.read()
+        b = node_id(diagram, "http://example.org/b")
+        with urlopen(f"{server.url}/expand?id={b}") as response:
+            delta = json.load(response)
+        assert [node["label"] for node in delta["nodes"]] == ["ex:c"]
+        assert delta["edges"][0]["title"] == "ex:next"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_view_server(tmp_path):
+    """Test that views are served from a bounded cache that reloads empty."""
+    file = tmp_path / "chain.ttl"
+    file.write_text(CHAIN)
+
+    def load() -> Diagram:
+        diagram = Diagram()
+        diagram.parse(sources=[file])
+        return diagram
+
+    server = ViewServer(("127.0.0.1", 0), load, max_views=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with urlopen(f"{server.url}/json") as response:
+            classes = json.load(response)
+        assert classes["nodes"] == []
+        iri = "http://example.org/a"
+        with urlopen(f"{server.url}/json?iri={iri}&depth=2") as response:
+            instances = json.load(response)
+        assert "ex:c" in {node["label"] for node in instances["nodes"]}
+        with urlopen(f"{server.url}/visjs?iri={iri}") as response:
+            assert response.headers["Content-Type"].startswith("text/html")
+        assert len(server.views) == 2
+        assert ("json", iri, 2, None, None, False) in server.views
+        with urlopen(Request(f"{server.url}/reload", method="POST")) as response:
+            assert "seconds" in json.load(response)
+        assert len(server.views) == 0
+        request = Request(
+            f"{server.url}/compact?iri={iri}&depth=2",
+            headers={"Accept-Encoding": "gzip"},
+        )
+        with urlopen(request) as response:
+            assert response.headers["Content-Encoding"] == "gzip"
+            assert response.headers["Vary"] == "Accept-Encoding"
+            compact = expand_compact(json.loads(gzip.decompress(response.read())))
+        # terms are given new ids and blank nodes new labels by a reload
+        assert len(compact["nodes"]) == len(instances["nodes"])
+        labels = sorted(edge["label"] for edge in compact["edges"])
+        assert labels == sorted(edge["label"] for edge in instances["edges"])
+        request.headers["Accept-encoding"] = "br, gzip;q=0"
+        with urlopen(request) as response:
+            assert response.headers["Content-Encoding"] is None
+            assert response.headers["Vary"] == "Accept-Encoding"
+            json.load(response)
+        assert accepts_gzip("deflate, gzip;q=0.5")
+        assert accepts_gzip("br, *")
+        assert not accepts_gzip("GZIP;q=0, *")
+        assert not accepts_gzip("")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_serve_prompts_once(sparql_endpoint, monkeypatch):
+    """Test that rdfdig serve prompts for a password once, not on each reload."""
+    sparql_endpoint.store.parse(Path(__file__).parent / "data" / "lawson.ttl")
+    prompts = []
+
+    def prompt(text: str) -> str:
+        prompts.append(text)
+        return "secret"
+
+    monkeypatch.setattr(getpass, "getpass", prompt)
+    diagrams = []
+
+    def serve(load, **kwargs):
+        diagrams.extend([load(), load()])
+
+    monkeypatch.setattr(rdfdig.__main__, "serve", serve)
+    serve_main([ENDPOINT, "--username", "someone", "--quiet"])
+    assert len(prompts) == 1
+    assert len(diagrams[0].nodes) == len(diagrams[1].nodes) > 0
+
+
+def test_aparse(sparql_endpoint, monkeypatch):
+    """Test that diagrams can be parsed on an event loop, and cancelled."""
+    file = Path(__file__).parent / "data" / "lawson.ttl"
+    sparql_endpoint.store.parse(file)
+    expected = Diagram()
+    expected.parse(sources=[file])
+
+    async def parse_many() -> list[Diagram]:
+        diagrams = [Diagram() for _ in range(3)]
+        await asyncio.gather(
+            diagrams[0].aparse(sources=[file]),
+            diagrams[1].aparse(sources=[ENDPOINT]),
+            diagrams[2].aparse(sources=[ENDPOINT], aggregate=True),
+        )
+        return diagrams
+
+    for diagram in asyncio.run(parse_many()):
+        assert labelled_edges(diagram) == labelled_edges(expected)
+    with pytest.raises(ValueError):
+        asyncio.run(Diagram().aparse(sources=[ENDPOINT], username="user"))
+    iri = "http://example.org/lawson"
+    for source in (file, ENDPOINT):
+        loaded, staged = Diagram(), Diagram()
+        loaded.parse(sources=[source], load_only=True)
+        asyncio.run(staged.aparse(sources=[source], load_only=True))
+        assert not staged.nodes
+        focused = labelled_edges(staged.focus(iri))
+        assert focused == labelled_edges(loaded.focus(iri))
+
+    async def slow(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(10)
+
+    transport = httpx.MockTransport(slow)
+    monkeypatch.setattr(
+        httpx, "AsyncClient", partial(httpx.AsyncClient, transport=transport)
+    )
+    diagram = Diagram()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(diagram.aparse(sources=[ENDPOINT]), 0.2))
+    assert not diagram.nodes
+
+
+def test_term_ids():
+    """Test that node ids are dense, or reproducible across runs if deterministic."""
+    file = Path(__file__).parent / "data" / "edmond.ttl"
+    diagram = Diagram()
+    diagram.parse(sources=[file])
+    ids = sorted(node.id for node in diagram.nodes)
+    assert ids == list(range(len(ids)))
+    outputs = set()
+    for seed in ("1", "2"):
+        result = subprocess.run(
+            [sys.executable, "-m", "rdfdig", str(file), "-q", "--no-cache"]
+            + ["--deterministic-ids"],
+            capture_output=True,
+            check=True,
+            env={**os.environ, "PYTHONHASHSEED": seed},
+        )
+        outputs.add(result.stdout)
+    assert len(outputs) == 1
+    deterministic = Diagram(deterministic_ids=True)
+    deterministic.parse(sources=[file])
+    assert deterministic.serialize().encode() in outputs.pop()
+
+
+def test_labeller_matches_n3():
+    """Test that memoized labels are the same as rdflib's n3 labels."""
+    folder = Path(__file__).parent / "data"
+    graph = load_dir(folder)
+    graph.bind("ex", "http://example.org/")
+    graph.bind("hash", "http://example.org/vocab#")
+    graph.bind("nosep", "http://example.org/nosep")
+    tricky = [
+        "http://example.org/a/b",
+        "http://example.org/1st",
+        "http://example.org/a.b",
+        "http://example.org/a%20b",
+        "http://example.org/",
+        "http://example.org/vocab#term",
+        "http://example.org/vocab#",
+        "http://example.org/nosepLocal",
+        "http://example.org/ünïcode",
+        "http://www.w3.org/XML/1998/namespacelang",
+        "urn:isbn:0451450523",
+    ]
+    terms = set(graph.all_nodes()) | set(graph.predicates()) | set(map(URIRef, tricky))
+    expected = {term: term.n3(graph.namespace_manager) for term in terms}
+    label = Labeller(graph.namespace_manager, max_literals=2)
+    for _ in range(2):
+        assert {term: label(term) for term in terms} == expected
+    assert len(label.literals) <= 2
+
+
+def test_numpy_backend_matches_python(tmp_path):
+    """Test that the numpy backend gives the same class diagrams as the python one."""
+    pytest.importorskip("numpy")
+    graph = Graph()
+    for file in (Path(__file__).parent / "data").glob("*.ttl"):
+        graph.parse(file)
+    graph.parse(
+        data="""
+        @prefix : <http://example.org/> .
+        @prefix schema: <https://schema.org/> .
+        :lawson a schema:Employee ; schema:knows [ schema:name "someone" ] .
+        [ a schema:Place ] schema:containedIn [ a schema:Place ; schema:knows :lawson ] .
+        schema:Place a schema:Class ; schema:knows :nobody .
+        :nobody schema:knows :lawson ; schema:age 3 .
+        """,
+        format="turtle",
+    )
+    graph.serialize(tmp_path / "data.nt", format="nt")
+    expected = summarize_graph(graph)
+    summaries = [
+        summarize_graph(graph, backend="numpy"),
+        summarize_files([tmp_path / "data.nt"], backend="numpy"),
+    ]
+    for summary in summaries:
+        assert summary.klasses == expected.klasses
+        assert summary.datatypes == expected.datatypes
+        assert summary.blank == expected.blank
+        assert summary.connections == expected.connections
+    diagrams = []
+    for backend in ("python", "numpy"):
+        for stream in (False, True):
+            diagram = Diagram(deterministic_ids=True)
+            diagram.parse(sources=[tmp_path], stream=stream, backend=backend)
+            diagrams.append(diagram.serialize())
+    assert len(set(diagrams)) == 1
+
+
+def test_disk_store(tmp_path):
+    """Test that a disk store gives the same diagrams as memory and can be reopened."""
+    folder = Path(__file__).parent / "data"
+    store_path = tmp_path / "store.db"
+
+    def unnamed(edges: set[tuple]) -> set[tuple]:
+        """blank nodes are named afresh by each parse"""
+        return {
+            tuple("_:" if term.startswith("_:") else term for term in edge)
+            for edge in edges
+        }
+
+    for iri in (None, "http://example.org/kurrawong"):
+        memory = Diagram()
+        memory.parse(sources=[folder], iri=iri, depth=2)
+        stored = Diagram()
+        stored.parse(sources=[folder], iri=iri, depth=2, store_path=store_path)
+        assert unnamed(labelled_edges(stored)) == unnamed(labelled_edges(memory))
+        stored._store.close()
+        store_path.unlink()
+    memory = Diagram(deterministic_ids=True)
+    memory.parse(sources=[folder])
+    loaded = Diagram(deterministic_ids=True)
+    loaded.parse(sources=[folder], store_path=store_path)
+    statements = len(loaded._store)
+    loaded._store.close()
+    reopened = Diagram(deterministic_ids=True)
+    reopened.parse(sources=[], store_path=store_path)
+    assert len(reopened._store) == statements
+    assert reopened.serialize() == memory.serialize()
+    result = subprocess.run(
+        [sys.executable, "-m", "rdfdig", "--store", str(store_path), "-q"]
+        + ["--deterministic-ids", "--no-cache"],
+        capture_output=True,
+        check=True,
+    )
+    assert json.loads(result.stdout) == json.loads(memory.serialize())
+    # loading the sources again, with their blank nodes, replaces the statements
+    reloaded = Diagram()
+    for _ in range(2):
+        reloaded.parse(sources=[folder], store_path=store_path)
+        assert len(reloaded._store) == statements
+    reloaded.close()
+    reloaded = Diagram()
+    reloaded.parse(sources=[folder], store_path=store_path)
+    assert len(reloaded._store) == statements
+    reloaded.close()
+    # streaming does not touch a store, so it cannot be given one
+    with pytest.raises(ValueError):
+        Diagram().parse(sources=[folder], stream=True, store_path=store_path)
+    reopened = Diagram()
+    reopened.parse(sources=[], store_path=store_path)
+    assert len(reopened._store) == statements
+    reopened.close()
+
+
+def test_loaders_fill_target_graph(sparql_endpoint, tmp_path):
+    """Test that loaders add statements and bindings straight into a given graph."""
+    folder = Path(__file__).parent / "data"
+    sparql_endpoint.store.parse(folder / "lawson.ttl")
+    cache = ParseCache(tmp_path / "cache")
+    loads = [
+        lambda graph: load_file(folder / "lawson.ttl", graph=graph),
+        lambda graph: load_file(folder / "lawson.ttl", cache=cache, graph=graph),
+        lambda graph: load_file(folder / "lawson.ttl", cache=cache, graph=graph),
+        lambda graph: load_dir(folder, graph=graph),
+        lambda graph: load_sparql(
+            ENDPOINT, iri=None, graph=None, username=None, password=None, into=graph
+        ),
+    ]
+    for i, load in enumerate(loads):
+        target = Graph()
+        target.add((URIRef("urn:a"), URIRef("urn:b"), URIRef("urn:c")))
+        assert load(target) is target
+        assert (URIRef("urn:a"), URIRef("urn:b"), URIRef("urn:c")) in target
+        assert len(target) > 1
+        # N-Triples from the endpoint has no prefixes
+        if i < len(loads) - 1:
+            assert ("", URIRef("http://example.org/")) in target.namespaces()
+    # a page whose triples are in the target already is not the last page
+    ex = "http://example.org/"
+    for i in range(20):
+        sparql_endpoint.store.add((URIRef(f"{ex}s{i}"), RDF.type, URIRef(f"{ex}C")))
+    for ntriples in (True, False):
+        sparql_endpoint.ntriples = ntriples
+        target = Graph()
+        for triple in sparql_endpoint.store:
+            target.add(triple)
+            if len(target) == 10:
+                break
+        load_sparql(
+            ENDPOINT,
+            iri=None,
+            graph=None,
+            username=None,
+            password=None,
+            limit=4,
+            into=target,
+        )
+        assert set(target) == set(sparql_endpoint.store)
+
+
+def test_sampled_class_summary(sparql_endpoint):
+    """Test that sampled summaries report support and match when nothing is left out."""
+    for file in (Path(__file__).parent / "data").glob("*.ttl"):
+        sparql_endpoint.store.parse(file)
+    sparql_endpoint.store.parse(
+        data="""
+        @prefix : <http://example.org/> .
+        @prefix schema: <https://schema.org/> .
+        :lawson schema:knows [ schema:name "someone"@en ], :nobody .
+        [ schema:worksFor :kurrawong ] .
+        :a a schema:Person ; schema:name "a" ; schema:knows :kurrawong .
+        :b a schema:Person ; schema:name "b" .
+        """,
+        format="turtle",
+    )
+    store = sparql_endpoint.store
+    for exact, sampled in (
+        (summarize_graph(store), summarize_graph(store, sample=1000)),
+        (
+            summarize_sparql(ENDPOINT, graph=None, username=None, password=None),
+            summarize_sparql(
+                ENDPOINT, graph=None, username=None, password=None, sample=1000
+            ),
+        ),
+    ):
+        assert sampled.klasses == exact.klasses
+        assert sampled.datatypes == exact.datatypes
+        assert sampled.blank == exact.blank
+        assert sampled.connections == exact.connections
+        assert all(support.exhaustive for support in sampled.support.values())
+    # every person has a name, and one person in four is sampled
+    name = (SCHEMA.Person, SCHEMA.name, XSD.string)
+    people = len(set(store.subjects(RDF.type, SCHEMA.Person)))
+    for sampled in (
+        summarize_graph(store, sample=1),
+        summarize_sparql(ENDPOINT, graph=None, username=None, password=None, sample=1),
+    ):
+        assert sampled.connections <= exact.connections
+        assert set(sampled.support) == sampled.connections
+        assert sampled.support[name] == Support(count=people, exhaustive=False)
+    for sample in (0, -1):
+        with pytest.raises(ValueError):
+            summarize_graph(store, sample=sample)
+        with pytest.raises(ValueError):
+            summarize_sparql(
+                ENDPOINT, graph=None, username=None, password=None, sample=sample
+            )
+        with pytest.raises(SystemExit):
+            build_parser().parse_args([ENDPOINT, "--sample", str(sample)])
+    diagram = Diagram()
+    diagram.parse(sources=[ENDPOINT], aggregate=True, sample=1000)
+    serialization = json.loads(diagram.serialize())
+    edges = serialization["edges"]
+    assert all(edge["exhaustive"] and edge["support"] >= 1 for edge in edges)
+    compact = json.loads("".join(diagram.chunks("compact")))
+    assert expand_compact(compact) == serialization
+
+
+def test_precomputed_layout():
+    """Test that laid out diagrams place every node and turn physics off."""
+    diagram = Diagram()
+    diagram.parse(sources=[Path(__file__).parent / "data"])
+    serialization = json.loads(diagram.serialize())
+    page = visjs_html(serialization, {}, layout_name="browser")
+    assert '"physics": {"enabled": true' in page
+    assert '"x":' not in page
+    for name in ("layered", "force"):
+        if name == "force":
+            pytest.importorskip("numpy")
+        page = visjs_html(serialization, {}, layout_name=name)
+        assert '"physics": {"enabled": false' in page
+        assert page.count('"x":') == len(serialization["nodes"])
+    ids = list(range(50))
+    edges = [(i, i // 2) for i in ids]
+    positions = force_layout(ids, edges, iterations=20)
+    assert positions == force_layout(ids, edges, iterations=20)
+    assert len(set(positions.values())) == len(ids)
+
+
+def test_reduce_diagram():
+    """Test that large diagrams are reduced and what was reduced can be found."""
+    nodes = [
+        {"id": 0, "label": "ex:hub", "isliteral": False, "isblank": False},
+        {"id": 1, "label": "ex:other", "isliteral": False, "isblank": False},
+    ]
+    edges = [
+        {"from": 0, "to": 1, "label": "ex:p"},
+        {"from": 0, "to": 1, "label": "ex:q"},
+        {"from": 1, "to": 0, "label": "ex:p"},
+    ]
+    for i in range(10, 20):
+        nodes.append(
+            {"id": i, "label": f'"{i}"@en', "isliteral": True, "isblank": False}
+        )
+        edges.append({"from": 1, "to": i, "label": "ex:name"})
+    for i in range(20, 30):
+        nodes.append(
+            {"id": i, "label": f"ex:r{i}", "isliteral": False, "isblank": False}
+        )
+        edges.append({"from": i, "to": 0, "label": "ex:link"})
+    serialization = {"nodes": nodes, "edges": edges}
+    assert reduce_diagram(serialization) is serialization
+    reduced = reduce_diagram(serialization, Thresholds(max_nodes=5))
+    labels = {node["label"] for node in reduced["nodes"]}
+    assert labels == {"ex:hub", "ex:other", "rdf:langString (10)", "+10 more"}
+    ids = {node["id"] for node in reduced["nodes"]}
+    assert all(edge["from"] in ids and edge["to"] in ids for edge in reduced["edges"])
+    bundle = next(edge for edge in reduced["edges"] if edge.get("weight"))
+    assert (bundle["from"], bundle["to"]) == (0, 1)
+    assert bundle["labels"] == ["ex:p", "ex:q"]
+    # everything that was collapsed or folded is kept in a cluster
+    clustered = {
+        node["id"]
+        for cluster in reduced["clusters"].values()
+        for node in cluster["nodes"]
+    }
+    assert clustered == set(range(10, 30))
+    thresholds = Thresholds(max_nodes=1, top_k=1, fold_min=20)
+    reduced = reduce_diagram(serialization, thresholds)
+    assert [node["label"] for node in reduced["nodes"]] == ["ex:hub"]
+    # ex:other, ex:r20 to ex:r29 and the collapsed literals of ex:other
+    assert reduced["reduced"] == {"nodes": 22, "omitted": 12}
+
+
+def test_reduce_class_diagram(tmp_path):
+    """Test that class diagrams, with edges to untyped objects, are reduced."""
+    file = tmp_path / "classes.ttl"
+    file.write_text(
+        "@prefix ex: <http://example.org/> .\n"
+        + "".join(
+            f"ex:i{i} a ex:C{i} ; ex:link ex:untyped ; ex:next ex:i{(i + 1) % 30} .\n"
+            for i in range(30)
+        )
+    )
+    diagram = Diagram()
+    diagram.parse(sources=[file])
+    diagram.thresholds = Thresholds(10, 5, 3)
+    reduced = diagram.reduced()
+    assert reduced["reduced"]["nodes"] == 30
+    assert len(reduced["nodes"]) < 30
+    assert "".join(diagram.chunks("visjs")).startswith("<html>")
+
+
+def test_writers(tmp_path, capsys):
+    """Test that diagrams are written in every format to a path or stdout."""
+    diagram = Diagram()
+    diagram.parse(sources=[Path(__file__).parent / "data"])
+    serialization = json.loads(diagram.serialize())
+    nodes, edges = len(serialization["nodes"]), len(serialization["edges"])
+    for format in WRITE_FORMATS:
+        diagram.write(format, tmp_path / format)
+        diagram.write(format)
+        assert capsys.readouterr().out == (tmp_path / format).read_text()
+    assert json.loads((tmp_path / "json").read_text()) == serialization
+    assert (tmp_path / "visjs").read_text() == visjs_html(serialization, {})
+    assert (tmp_path / "mermaid").read_text() == mermaid_html(serialization, {})
+    mermaid = (tmp_path / "mermaid-text").read_text()
+    assert mermaid.count(" -->|") == edges
+    dot = (tmp_path / "dot").read_text()
+    assert dot.startswith("digraph") and dot.count(" -> ") == edges
+    graph = ElementTree.parse(tmp_path / "graphml").getroot()[-1]
+    assert len(graph) == nodes + edges
+
+
+def test_streamed_serialization(tmp_path, capsys):
+    """Test that the streamed formats match serialize and can be gzipped."""
+    diagram = Diagram()
+    diagram.parse(
+        sources=[Path(__file__).parent / "data"],
+        iri="http://example.org/lawson",
+        depth=2,
+    )
+    serialized = diagram.serialize()
+    assert "".join(json_text(diagram.serialization)) == serialized
+    assert "".join(diagram.chunks("json")) == serialized + "\n"
+    compact = "".join(diagram.chunks("compact"))
+    assert len(compact) < len(serialized)
+    assert expand_compact(json.loads(compact)) == json.loads(serialized)
+    diagram.write("compact", tmp_path / "diagram.json.gz", compress=True)
+    assert gzip.decompress((tmp_path / "diagram.json.gz").read_bytes()).decode() == (
+        compact
+    )
+    with pytest.raises(ValueError):
+        expand_compact({**json.loads(compact), "version": 0})
+
+
+def test_batch(tmp_path):
+    """Test that a batch writes the diagram of each IRI, in worker processes."""
+    iris = io.StringIO(
+        "http://example.org/lawson\n# a comment\n\nhttp://example.org/kurrawong\n"
+        "ex:unbound\n"
+    )
+    iris = list(read_iris(iris))
+    assert len(iris) == 3
+    for store_path in (None, tmp_path / "store.db"):
+        diagram = Diagram(deterministic_ids=True)
+        diagram.parse(
+            sources=[Path(__file__).parent / "data"],
+            store_path=store_path,
+            load_only=True,
+        )
+        assert len(diagram.nodes) == 0
+        for jobs in (1, 2):
+            out_dir = tmp_path / f"{store_path is None}-{jobs}"
+            manifest = io.StringIO()
+            stats = write_batch(diagram, iris, out_dir, jobs=jobs, manifest=manifest)
+            assert (stats.written, stats.failed) == (2, 1)
+            lines = manifest.getvalue().splitlines()
+            written = dict(line.split("\t") for line in lines)
+            assert set(written) == set(iris[:2])
+            for iri, path in written.items():
+                expected = diagram.focus(iri)
+                expected.serialize()
+                labels = {node["label"] for node in expected.serialization["nodes"]}
+                serialization = json.loads(Path(path).read_text())
+                assert {node["label"] for node in serialization["nodes"]} == labels
+    # IRIs that differ only in replaced characters are given different names
+    names = {iri_filename(f"http://example.org/a{c}b", "json") for c in "?#/ "}
+    assert len(names) == 4